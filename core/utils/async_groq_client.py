@@ -0,0 +1,436 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Module du client asynchrone pour l'API Groq du POC de chatbot IA AssurSanté.
+Ce module permet d'exécuter plusieurs appels LLM en parallèle depuis une boucle asyncio.
+"""
+
+import asyncio
+import time
+import warnings
+from collections import deque
+from typing import Dict, List, Any, Optional, AsyncIterator, Awaitable, Callable, Set
+import httpx
+from .groq_integration import (
+    GROQ_API_KEY, GROQ_API_BASE, GROQ_MODEL,
+    GROQ_POOL_MAXSIZE, GROQ_CONNECT_TIMEOUT, GROQ_READ_TIMEOUT,
+    InsurancePromptSystem
+)
+from .sse_parser import SSEStreamParser, StreamMetrics, summarize_stream_metrics
+from .rate_limiting import (
+    GroqRateLimiter, get_groq_rate_limiter, estimate_request_tokens, parse_retry_after,
+    RETRYABLE_STATUS_CODES, GROQ_MAX_RETRIES
+)
+
+# Fermetures de réponses abandonnées en cours (référence conservée jusqu'à leur fin)
+_pending_closes: Set["asyncio.Task[None]"] = set()
+
+def _schedule_close(loop: asyncio.AbstractEventLoop, response: httpx.Response) -> None:
+    """Planifie, sur la boucle de la réponse, la fermeture d'une réponse HTTP abandonnée."""
+    task = loop.create_task(response.aclose())
+    _pending_closes.add(task)
+    task.add_done_callback(_pending_closes.discard)
+
+class AsyncCompletionStream:
+    """
+    Itérateur asynchrone des chunks d'une complétion en streaming.
+    Le créneau de concurrence et celui du limiteur sont libérés une seule fois, à la fin du
+    stream, à sa fermeture (aclose()) ou à sa destruction, même s'il n'a jamais été parcouru.
+    Un stream détruit sans être fermé voit sa réponse HTTP fermée sur sa boucle d'origine ;
+    si celle-ci est arrêtée, un ResourceWarning signale la connexion non rendue au pool.
+    """
+
+    _released = True  # Rien à libérer tant que l'initialisation n'est pas terminée
+
+    def __init__(self, chunks: AsyncIterator[Dict[str, Any]], response: httpx.Response,
+                 release: Callable[[], None]):
+        """
+        Initialise l'itérateur.
+
+        Args:
+            chunks: Générateur asynchrone des chunks décodés
+            response: Réponse HTTP en streaming
+            release: Libération des créneaux (concurrence, limiteur) et enregistrement des mesures
+        """
+        self._chunks = chunks
+        self._response = response
+        self._release = release
+        try:
+            self._loop: Optional[asyncio.AbstractEventLoop] = asyncio.get_running_loop()
+        except RuntimeError:
+            self._loop = None
+        self._released = False
+
+    def _release_once(self) -> None:
+        if not self._released:
+            self._released = True
+            self._release()
+
+    def __aiter__(self) -> "AsyncCompletionStream":
+        return self
+
+    async def __anext__(self) -> Dict[str, Any]:
+        try:
+            return await self._chunks.__anext__()
+        except BaseException:
+            await self.aclose()
+            raise
+
+    async def aclose(self) -> None:
+        """Interrompt le stream, libère la connexion et les créneaux réservés."""
+        try:
+            await self._chunks.aclose()
+            await self._response.aclose()
+        finally:
+            self._release_once()
+
+    async def __aenter__(self) -> "AsyncCompletionStream":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.aclose()
+
+    def __del__(self):
+        # Stream abandonné sans être fermé : les créneaux ne doivent pas rester réservés
+        if self._released:
+            # Stream déjà fermé (ou initialisation inachevée)
+            return
+        self._release_once()
+        if self._response.is_closed:
+            return
+
+        # La connexion ne peut être rendue au pool que depuis la boucle qui l'a ouverte
+        loop = self._loop
+        if loop is not None and loop.is_running() and not loop.is_closed():
+            loop.call_soon_threadsafe(_schedule_close, loop, self._response)
+        else:
+            warnings.warn("AsyncCompletionStream détruit sans aclose() : connexion HTTP non libérée",
+                          ResourceWarning, stacklevel=2)
+
+class AsyncGroqClient:
+    """
+    Client asynchrone pour interagir avec l'API Groq.
+    Reprend l'interface de GroqClient.chat_completion avec une concurrence bornée.
+    """
+
+    def __init__(self, api_key: Optional[str] = None, model: Optional[str] = None,
+                 max_concurrency: int = 8,
+                 connect_timeout: float = GROQ_CONNECT_TIMEOUT,
+                 read_timeout: float = GROQ_READ_TIMEOUT,
+                 http_client: Optional[httpx.AsyncClient] = None,
+                 rate_limiter: Optional[GroqRateLimiter] = None,
+                 max_retries: int = GROQ_MAX_RETRIES):
+        """
+        Initialise le client Groq asynchrone.
+
+        Args:
+            api_key: Clé API Groq (utilise la variable d'environnement si non spécifiée)
+            model: Modèle Groq à utiliser (utilise le modèle par défaut si non spécifié)
+            max_concurrency: Nombre maximum d'appels simultanés vers l'API
+            connect_timeout: Timeout d'établissement de connexion (secondes)
+            read_timeout: Timeout de lecture (secondes)
+            http_client: Client HTTP asynchrone à réutiliser (créé si non spécifié)
+            rate_limiter: Limiteur de débit (utilise le limiteur partagé du processus si non spécifié)
+            max_retries: Nombre maximum de nouvelles tentatives sur 429/5xx
+        """
+        self.api_key = api_key or GROQ_API_KEY
+        self.model = model or GROQ_MODEL
+
+        if not self.api_key or self.api_key == 'your_groq_api_key_here':
+            raise ValueError("Clé API Groq non configurée. Veuillez définir la variable d'environnement GROQ_API_KEY.")
+
+        self.headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+
+        self.rate_limiter = rate_limiter or get_groq_rate_limiter()
+        self.max_retries = max_retries
+        self.max_concurrency = max_concurrency
+        self.stream_metrics_history = deque(maxlen=100)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._owns_http_client = http_client is None
+        self.http_client = http_client or httpx.AsyncClient(
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=max(max_concurrency, GROQ_POOL_MAXSIZE),
+                                max_keepalive_connections=max_concurrency)
+        )
+
+    async def __aenter__(self) -> "AsyncGroqClient":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """Ferme le client HTTP s'il a été créé par ce client."""
+        if self._owns_http_client:
+            await self.http_client.aclose()
+
+    async def chat_completion(self,
+                              messages: List[Dict[str, str]],
+                              temperature: float = 0.7,
+                              max_tokens: int = 1024,
+                              stream: bool = False) -> Any:
+        """
+        Envoie une requête de complétion de chat à l'API Groq.
+
+        Args:
+            messages: Liste des messages de la conversation
+            temperature: Température pour le sampling (0.0 à 1.0)
+            max_tokens: Nombre maximum de tokens à générer
+            stream: Si True, retourne un itérateur asynchrone de chunks
+
+        Returns:
+            Réponse de l'API Groq, ou itérateur asynchrone de chunks en mode streaming
+            (AsyncCompletionStream, à consommer entièrement ou à fermer avec aclose())
+        """
+        url = f"{GROQ_API_BASE}/chat/completions"
+
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "stream": stream
+        }
+
+        reserved_tokens = estimate_request_tokens(messages, max_tokens)
+        started_at = time.monotonic()
+
+        await self._semaphore.acquire()
+        response = None
+        handed_over = False
+        try:
+            response = await self._send_with_retries(url, payload, reserved_tokens, stream=stream)
+
+            if stream:
+                # Le créneau de concurrence est libéré à la fin, à la fermeture ou à l'abandon du stream
+                completion_stream = self._process_stream(response, reserved_tokens, started_at)
+                handed_over = True
+                return completion_stream
+
+            tokens_used = None
+            try:
+                await response.aread()
+                result = response.json()
+                tokens_used = result.get('usage', {}).get('total_tokens')
+            finally:
+                self.rate_limiter.release(response.status_code,
+                                          tokens_reserved=reserved_tokens,
+                                          tokens_used=tokens_used)
+            return result
+
+        except httpx.HTTPError as e:
+            print(f"Erreur lors de la requête à l'API Groq: {e}")
+            if isinstance(e, httpx.HTTPStatusError):
+                print(f"Détails de l'erreur: {e.response.text}")
+            raise
+
+        finally:
+            # Libération également en cas d'annulation (asyncio.CancelledError)
+            if not handed_over:
+                if response is not None:
+                    await response.aclose()
+                self._semaphore.release()
+
+    async def _send_with_retries(self, url: str, payload: Dict[str, Any], reserved_tokens: int,
+                                 stream: bool = False) -> httpx.Response:
+        """
+        Envoie une requête en respectant le limiteur de débit partagé.
+        Les réponses 429/5xx et les erreurs de transport sont retentées avec un
+        backoff exponentiel (jitter complet) ; Retry-After est respecté par le limiteur.
+
+        En cas de succès, le créneau du limiteur reste réservé : l'appelant doit
+        appeler rate_limiter.release() une fois la réponse consommée.
+
+        Args:
+            url: URL de la requête
+            payload: Corps JSON de la requête
+            reserved_tokens: Nombre de tokens estimé pour la requête
+            stream: Si True, le corps de la réponse est lu au fil de l'eau
+
+        Returns:
+            Réponse HTTP réussie
+        """
+        attempt = 0
+
+        while True:
+            await self.rate_limiter.acquire_async(reserved_tokens)
+
+            try:
+                request = self.http_client.build_request("POST", url, headers=self.headers, json=payload)
+                response = await self.http_client.send(request, stream=stream)
+            except httpx.TransportError:
+                self.rate_limiter.release(tokens_reserved=reserved_tokens, tokens_used=0)
+                if attempt >= self.max_retries:
+                    raise
+                await asyncio.sleep(self.rate_limiter.retry_delay(attempt))
+                attempt += 1
+                continue
+            except BaseException:
+                self.rate_limiter.release(tokens_reserved=reserved_tokens, tokens_used=0)
+                raise
+
+            if not response.is_error:
+                return response
+
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            self.rate_limiter.release(response.status_code, retry_after=retry_after,
+                                      tokens_reserved=reserved_tokens, tokens_used=0)
+
+            if response.status_code in RETRYABLE_STATUS_CODES and attempt < self.max_retries:
+                await response.aclose()
+                await asyncio.sleep(self.rate_limiter.retry_delay(attempt))
+                attempt += 1
+                continue
+
+            try:
+                await response.aread()
+            finally:
+                await response.aclose()
+            response.raise_for_status()
+
+    def _process_stream(self, response: httpx.Response,
+                        reserved_tokens: int = 0,
+                        started_at: Optional[float] = None) -> AsyncCompletionStream:
+        """
+        Traite une réponse en streaming de l'API Groq.
+
+        Args:
+            response: Réponse de l'API en streaming
+            reserved_tokens: Nombre de tokens réservé auprès du limiteur de débit
+            started_at: Horodatage monotone de l'envoi de la requête
+
+        Returns:
+            Itérateur asynchrone de chunks de réponse
+        """
+        parser = SSEStreamParser(StreamMetrics(started_at))
+
+        async def _chunks():
+            async for data in response.aiter_bytes():
+                for chunk in parser.feed(data):
+                    yield chunk
+                if parser.done:
+                    break
+
+        def _release():
+            self.rate_limiter.release(response.status_code, tokens_reserved=reserved_tokens)
+            self._semaphore.release()
+            self.stream_metrics_history.append(parser.metrics.to_dict())
+
+        return AsyncCompletionStream(_chunks(), response, _release)
+
+    def get_stream_latency_stats(self) -> Dict[str, Any]:
+        """
+        Retourne les latences des dernières réponses en streaming.
+
+        Returns:
+            Nombre de streams mesurés, TTFT médian et p95, latence inter-tokens moyenne
+        """
+        return summarize_stream_metrics(self.stream_metrics_history)
+
+    async def gather_chat_completions(self,
+                                      requests: List[Dict[str, Any]],
+                                      timeout: Optional[float] = None) -> List[Any]:
+        """
+        Exécute plusieurs complétions en parallèle (dans la limite de max_concurrency).
+
+        Args:
+            requests: Liste de paramètres de chat_completion (messages, temperature, max_tokens)
+            timeout: Délai global en secondes ; les appels non terminés sont annulés
+
+        Returns:
+            Liste des réponses dans l'ordre des requêtes (l'exception levée pour les appels en échec)
+        """
+        calls = [self.chat_completion(**{k: v for k, v in request.items() if k != 'stream'})
+                 for request in requests]
+        return await gather_with_deadline(calls, timeout)
+
+async def gather_with_deadline(calls: List[Awaitable[Any]], timeout: Optional[float] = None) -> List[Any]:
+    """
+    Exécute des coroutines en parallèle avec un délai global.
+    Les coroutines non terminées à l'échéance sont annulées et remplacées par asyncio.TimeoutError.
+
+    Args:
+        calls: Coroutines à exécuter
+        timeout: Délai global en secondes (aucun délai si None)
+
+    Returns:
+        Résultats dans l'ordre des coroutines (l'exception levée pour les appels en échec)
+    """
+    tasks = [asyncio.ensure_future(call) for call in calls]
+    if not tasks:
+        return []
+
+    try:
+        await asyncio.wait(tasks, timeout=timeout)
+    except asyncio.CancelledError:
+        for task in tasks:
+            task.cancel()
+        raise
+
+    results = []
+    for task in tasks:
+        if not task.done():
+            task.cancel()
+            results.append(asyncio.TimeoutError())
+        elif task.cancelled():
+            results.append(asyncio.CancelledError())
+        else:
+            results.append(task.exception() or task.result())
+
+    # Attente de la fin effective des annulations
+    pending = [task for task in tasks if not task.done()]
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    return results
+
+# Fonction utilitaire pour tester le client asynchrone
+async def test_async_groq_integration():
+    """
+    Teste le client asynchrone avec plusieurs requêtes simultanées.
+
+    Returns:
+        True si le test est réussi, False sinon
+    """
+    try:
+        async with AsyncGroqClient(max_concurrency=4) as client:
+            system_prompt = InsurancePromptSystem.get_system_prompt()
+            questions = [
+                "Comment fonctionne le remboursement des lunettes chez AssurSanté?",
+                "Comment ajouter un enfant à mon contrat?",
+                "Quels sont les délais de remboursement d'une consultation?"
+            ]
+
+            requests = [
+                {"messages": [{"role": "system", "content": system_prompt},
+                              {"role": "user", "content": question}],
+                 "temperature": 0.7}
+                for question in questions
+            ]
+
+            print(f"Test du client Groq asynchrone (modèle: {client.model})...")
+
+            start_time = time.time()
+            responses = await client.gather_chat_completions(requests, timeout=60)
+            end_time = time.time()
+
+            print(f"{len(responses)} réponses reçues en {end_time - start_time:.2f} secondes")
+            for question, response in zip(questions, responses):
+                print(f"\nRequête: {question}")
+                if isinstance(response, BaseException):
+                    print(f"Erreur: {response!r}")
+                else:
+                    print(response['choices'][0]['message']['content'])
+
+            return True
+
+    except Exception as e:
+        print(f"Erreur lors du test du client Groq asynchrone: {e}")
+        return False
+
+if __name__ == "__main__":
+    asyncio.run(test_async_groq_integration())
@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Module de planification des chaînes de prompts pour le POC de chatbot IA AssurSanté.
+Avant de demander au LLM de décomposer une requête, le planificateur tente de :
+- traiter directement les requêtes simples (une seule intention) en une sous-tâche unique ;
+- réutiliser un plan précompilé pour les combinaisons d'intentions connues ;
+- réutiliser un plan déjà obtenu pour la même requête (ou une requête très proche).
+"""
+
+import os
+import re
+import copy
+import math
+import hashlib
+import logging
+import threading
+from collections import deque
+from itertools import combinations
+from typing import Dict, List, Any, Optional, Tuple, Callable
+from .intent_matcher import IntentMatcher, normalize_text
+from .llm_cache import LRUCache
+from .embeddings import EmbeddingBackend
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Configuration du planificateur
+CHAIN_PLAN_CACHE_SIZE = int(os.getenv('CHAIN_PLAN_CACHE_SIZE', '512'))
+CHAIN_PLAN_SIMILARITY_THRESHOLD = float(os.getenv('CHAIN_PLAN_SIMILARITY_THRESHOLD', '0.92'))
+CHAIN_SIMPLE_QUERY_MAX_WORDS = int(os.getenv('CHAIN_SIMPLE_QUERY_MAX_WORDS', '40'))
+
+# Mots-clés de planification (y compris les intentions absentes de la détection d'intention
+# de l'orchestrateur : modification et prise en charge hospitalière)
+PLANNING_KEYWORDS = {
+    "remboursement": ["remboursement", "rembourser", "remboursé", "frais", "dépense", "facture", "décompte"],
+    "reclamation": ["réclamation", "plainte", "problème", "erreur", "insatisfaction", "contester"],
+    "contrat": ["contrat", "garantie", "couverture", "niveau", "option", "formule", "souscription"],
+    "resiliation": ["résiliation", "résilier", "annuler", "annulation", "mettre fin", "arrêter"],
+    "modification": ["ajouter", "ajout", "modifier", "modification", "changer", "changement", "bénéficiaire"],
+    "prise_en_charge": ["prise en charge", "hospitalisation", "hôpital", "clinique", "opération", "tiers payant"]
+}
+
+# Étapes de plan par intention ({query} est remplacé par la requête de l'utilisateur)
+INTENT_PLAN_STEPS = {
+    "remboursement": {
+        "title": "Identifier les règles de remboursement applicables",
+        "description": "Rechercher, pour les soins évoqués dans la requête, les taux et plafonds de remboursement "
+                       "prévus par le contrat du client et les délais de traitement : {query}",
+        "type": "recherche"
+    },
+    "reclamation": {
+        "title": "Analyser la réclamation du client",
+        "description": "Identifier l'objet de la réclamation, son historique et les engagements de traitement "
+                       "applicables : {query}",
+        "type": "analyse"
+    },
+    "contrat": {
+        "title": "Identifier les garanties du contrat",
+        "description": "Rechercher les garanties, niveaux et options du contrat du client concernés par la requête : "
+                       "{query}",
+        "type": "recherche"
+    },
+    "resiliation": {
+        "title": "Déterminer les conditions de résiliation",
+        "description": "Rechercher les conditions, le préavis et la procédure de résiliation applicables au contrat "
+                       "du client : {query}",
+        "type": "recherche"
+    },
+    "modification": {
+        "title": "Déterminer la procédure de modification du contrat",
+        "description": "Rechercher les conditions, justificatifs et délais de la modification demandée "
+                       "(bénéficiaires, niveau de garantie, coordonnées) : {query}",
+        "type": "recherche"
+    },
+    "prise_en_charge": {
+        "title": "Déterminer la procédure de prise en charge",
+        "description": "Rechercher les conditions et la procédure de prise en charge hospitalière "
+                       "(demande préalable, tiers payant) : {query}",
+        "type": "recherche"
+    }
+}
+
+# Indices d'une requête en plusieurs parties
+_MULTI_PART_MARKERS = re.compile(r"\b(et|ainsi que|puis|aussi|egalement|ensuite|en plus)\b")
+_WORDS = re.compile(r"\w+")
+
+SINGLE_TASK_TITLE = "Traiter la requête complète"
+
+def single_task_plan(query: str) -> List[Dict[str, Any]]:
+    """
+    Plan d'une sous-tâche unique traitant toute la requête.
+
+    Args:
+        query: Requête utilisateur
+
+    Returns:
+        Plan d'une seule sous-tâche
+    """
+    return [{
+        "id": "1",
+        "title": SINGLE_TASK_TITLE,
+        "description": query,
+        "dependencies": [],
+        "type": "analyse"
+    }]
+
+def normalize_query(query: str) -> str:
+    """
+    Normalise une requête pour l'indexation des plans (minuscules, sans accents ni ponctuation).
+
+    Args:
+        query: Requête utilisateur
+
+    Returns:
+        Requête normalisée
+    """
+    return ' '.join(_WORDS.findall(normalize_text(query)))
+
+def build_library_plan(intents: Tuple[str, ...]) -> List[Dict[str, Any]]:
+    """
+    Compose le plan d'une combinaison d'intentions : une étape par intention,
+    puis une étape de réponse dépendant de toutes les autres.
+
+    Args:
+        intents: Intentions, dans l'ordre de INTENT_PLAN_STEPS
+
+    Returns:
+        Plan (descriptions à compléter avec la requête)
+    """
+    plan = []
+    for index, intent in enumerate(intents, start=1):
+        plan.append(dict(INTENT_PLAN_STEPS[intent], id=str(index), dependencies=[]))
+
+    plan.append({
+        "id": str(len(intents) + 1),
+        "title": "Rédiger la réponse au client",
+        "description": "À partir des résultats précédents, répondre point par point à la requête : {query}",
+        "dependencies": [step["id"] for step in plan],
+        "type": "génération"
+    })
+    return plan
+
+# Plans précompilés pour les combinaisons d'une à trois intentions
+PLAN_LIBRARY: Dict[frozenset, List[Dict[str, Any]]] = {
+    frozenset(combo): build_library_plan(combo)
+    for size in range(1, 4)
+    for combo in combinations(INTENT_PLAN_STEPS, size)
+}
+
+class PlanCache:
+    """
+    Cache LRU des plans obtenus du LLM, indexé par requête normalisée et,
+    si un backend d'embedding est fourni, par similarité des requêtes.
+    """
+
+    def __init__(self, max_entries: int = CHAIN_PLAN_CACHE_SIZE,
+                 embedding_backend: Optional[EmbeddingBackend] = None,
+                 similarity_threshold: float = CHAIN_PLAN_SIMILARITY_THRESHOLD):
+        """
+        Initialise le cache de plans.
+
+        Args:
+            max_entries: Nombre maximum de plans conservés
+            embedding_backend: Backend d'embedding pour la recherche par similarité (désactivée si None)
+            similarity_threshold: Similarité cosinus minimale pour réutiliser le plan d'une autre requête
+        """
+        self.plans = LRUCache(max_entries)
+        self.embedding_backend = embedding_backend
+        self.similarity_threshold = similarity_threshold
+        self._vectors: deque = deque(maxlen=max_entries)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(normalized: str) -> str:
+        return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+    def _embed(self, normalized: str) -> List[float]:
+        vector = self.embedding_backend.get_embedding(normalized)
+        norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+        return [x / norm for x in vector]
+
+    def get(self, normalized: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Recherche le plan d'une requête.
+
+        Args:
+            normalized: Requête normalisée
+
+        Returns:
+            Copie du plan en cache, ou None
+        """
+        plan = self.plans.get(self._key(normalized))
+        if plan is None and self.embedding_backend is not None:
+            vector = self._embed(normalized)
+            with self._lock:
+                candidates = list(self._vectors)
+
+            best_key, best_score = None, self.similarity_threshold
+            for key, other in candidates:
+                score = sum(a * b for a, b in zip(vector, other))
+                if score >= best_score:
+                    best_key, best_score = key, score
+            if best_key is not None:
+                plan = self.plans.get(best_key)
+
+        return copy.deepcopy(plan) if plan is not None else None
+
+    def set(self, normalized: str, plan: List[Dict[str, Any]]) -> None:
+        """
+        Enregistre le plan d'une requête.
+
+        Args:
+            normalized: Requête normalisée
+            plan: Plan obtenu du LLM
+        """
+        key = self._key(normalized)
+        self.plans.set(key, copy.deepcopy(plan))
+        if self.embedding_backend is not None:
+            vector = self._embed(normalized)
+            with self._lock:
+                self._vectors.append((key, vector))
+
+class ChainPlanner:
+    """
+    Planificateur des chaînes de prompts : requête simple, plan précompilé,
+    plan en cache, puis décomposition par le LLM en dernier recours.
+    """
+
+    def __init__(self, plan_cache: Optional[PlanCache] = None,
+                 intent_matcher: Optional[IntentMatcher] = None,
+                 simple_query_max_words: int = CHAIN_SIMPLE_QUERY_MAX_WORDS):
+        """
+        Initialise le planificateur.
+
+        Args:
+            plan_cache: Cache des plans (cache mémoire sans similarité si non spécifié)
+            intent_matcher: Détecteur des intentions de la requête (PLANNING_KEYWORDS si non spécifié)
+            simple_query_max_words: Nombre de mots au-delà duquel une requête n'est plus considérée simple
+        """
+        self.plan_cache = plan_cache or PlanCache()
+        self.intent_matcher = intent_matcher or IntentMatcher(PLANNING_KEYWORDS)
+        self.simple_query_max_words = simple_query_max_words
+        self._stats_lock = threading.Lock()
+        self.stats = {"simple": 0, "library": 0, "cache": 0, "llm": 0}
+
+    def _count(self, name: str) -> None:
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    def detect_intents(self, normalized: str) -> List[str]:
+        """
+        Détecte toutes les intentions présentes dans une requête.
+
+        Args:
+            normalized: Requête normalisée
+
+        Returns:
+            Intentions trouvées, dans l'ordre de INTENT_PLAN_STEPS
+        """
+        scores = self.intent_matcher.scores(normalized)
+        return [intent for intent in INTENT_PLAN_STEPS if scores.get(intent, 0) > 0]
+
+    def is_simple(self, normalized: str, intents: List[str]) -> bool:
+        """
+        Indique si une requête peut être traitée en une seule sous-tâche.
+
+        Args:
+            normalized: Requête normalisée
+            intents: Intentions détectées
+
+        Returns:
+            True pour une requête courte, d'au plus une intention et sans plusieurs parties
+        """
+        return (len(intents) <= 1
+                and len(normalized.split()) <= self.simple_query_max_words
+                and not _MULTI_PART_MARKERS.search(normalized))
+
+    def plan(self, query: str,
+             decompose: Callable[[str], List[Dict[str, Any]]]) -> Tuple[List[Dict[str, Any]], str]:
+        """
+        Détermine le plan d'exécution d'une requête.
+
+        Args:
+            query: Requête utilisateur
+            decompose: Décomposition par le LLM, appelée si aucun plan n'est disponible
+
+        Returns:
+            Tuple (plan, origine du plan : "simple", "library", "cache" ou "llm")
+        """
+        normalized = normalize_query(query)
+        intents = self.detect_intents(normalized)
+
+        if self.is_simple(normalized, intents):
+            self._count("simple")
+            return single_task_plan(query), "simple"
+
+        template = PLAN_LIBRARY.get(frozenset(intents))
+        if template is not None:
+            self._count("library")
+            return [dict(step, description=step["description"].format(query=query),
+                         dependencies=list(step["dependencies"])) for step in template], "library"
+
+        plan = self.plan_cache.get(normalized)
+        if plan is not None:
+            self._count("cache")
+            return plan, "cache"
+
+        plan = decompose(query)
+        self._count("llm")
+        # Le plan de repli (décomposition en échec) n'est pas mis en cache
+        if plan and plan != single_task_plan(query):
+            self.plan_cache.set(normalized, plan)
+        return plan, "llm"
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Retourne les statistiques du planificateur.
+
+        Returns:
+            Nombre de plans par origine et part des décompositions évitées
+        """
+        with self._stats_lock:
+            stats = dict(self.stats)
+        total = sum(stats.values())
+        stats["llm_calls_saved_rate"] = (total - stats["llm"]) / total if total else 0.0
+        return stats
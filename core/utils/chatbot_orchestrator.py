@@ -8,9 +8,19 @@ Ce module implémente les prompts spécifiques et les workflows de conversation.
 
 import os
 import json
-from typing import Dict, List, Any, Optional, Tuple
+import hashlib
+import logging
+import threading
+from typing import Dict, List, Any, Optional, Tuple, Callable
 from dotenv import load_dotenv
-from .groq_integration import GroqClient, InsurancePromptSystem, InsurancePrompts
+from .groq_integration import GroqClient, InsurancePromptSystem, InsurancePrompts, warm_up_groq_transport
+from .prompt_budget import PromptBudgetManager
+from .conversation_summary import ConversationSummarizer
+from .intent_matcher import default_intent_matcher
+from .conversation_journal import ConversationJournal, JOURNAL_RETAIN_MESSAGES
+from .prompt_templates import PromptTemplates
+
+logger = logging.getLogger(__name__)
 
 # Chargement des variables d'environnement
 load_dotenv('../docker/.env')
@@ -21,19 +31,90 @@ class ChatbotOrchestrator:
     Gère les flux de conversation et l'intégration avec les différentes API.
     """
     
-    def __init__(self, groq_api_key: Optional[str] = None, groq_model: Optional[str] = None):
+    def __init__(self, groq_api_key: Optional[str] = None, groq_model: Optional[str] = None,
+                 prompt_budgets: Optional[Dict[str, int]] = None,
+                 summarize_history: bool = False,
+                 summary_threshold: int = 20,
+                 max_history_size: Optional[int] = None,
+                 intent_classifier: Optional[Any] = None):
         """
         Initialise l'orchestrateur du chatbot.
         
         Args:
             groq_api_key: Clé API Groq (utilise la variable d'environnement si non spécifiée)
             groq_model: Modèle Groq à utiliser (utilise le modèle par défaut si non spécifié)
+            prompt_budgets: Budgets de tokens par section du prompt (utilise ceux du modèle si non spécifiés)
+            summarize_history: Si True, les anciens messages sont condensés dans un résumé glissant
+            summary_threshold: Nombre de messages d'historique déclenchant un résumé
+            max_history_size: Nombre maximum de messages conservés en mémoire
+                (2 x summary_threshold par défaut en mode résumé, illimité sinon)
+            intent_classifier: Classifieur par embeddings (EmbeddingIntentClassifier) consulté
+                lorsque les mots-clés ne détectent aucune intention
         """
         self.groq_client = GroqClient(api_key=groq_api_key, model=groq_model)
+        # Ouverture des connexions vers Groq dès le démarrage (une seule fois par processus)
+        warm_up_groq_transport(client=self.groq_client)
+        self.budget_manager = PromptBudgetManager(self.groq_client.model, prompt_budgets)
+        self.intent_matcher = default_intent_matcher
+        self.intent_classifier = intent_classifier
+        self.last_budget_report = None
         self.conversation_history = []
+        self.conversation_summary = ""
+        self.summarizer = ConversationSummarizer(self.groq_client, threshold=summary_threshold) if summarize_history else None
+        if max_history_size is None and summarize_history:
+            max_history_size = 2 * summary_threshold
+        self.max_history_size = max_history_size
+        self._history_lock = threading.Lock()
+        self._history_generation = 0
+        self.journal: Optional[ConversationJournal] = None
+        # Destination des résumés calculés en arrière-plan (apply_summary si non spécifiée) :
+        # permet de rattacher un résumé à sa session lorsque l'orchestrateur est partagé
+        self.summary_sink: Optional[Callable[[int, List[Dict[str, str]], str], None]] = None
         self.current_client = None
         self.current_claim = None
         self.knowledge_context = []
+        # Sections de contexte déjà formatées : section -> (empreinte des données, rendu)
+        self._context_sections: Dict[str, Tuple[str, str]] = {}
+    
+    @staticmethod
+    def _content_hash(data: Any) -> str:
+        """Empreinte du contenu des données d'une section de contexte."""
+        payload = json.dumps(data, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def _update_context_section(self, section: str, data: Any) -> None:
+        """Invalide le rendu d'une section uniquement si ses données ont changé."""
+        cached = self._context_sections.get(section)
+        if cached is not None and (not data or cached[0] != self._content_hash(data)):
+            del self._context_sections[section]
+    
+    def _render_context_section(self, section: str) -> str:
+        """
+        Retourne le rendu d'une section de contexte, formaté au plus une fois par contenu.
+        
+        Args:
+            section: Section de contexte ("client", "claim" ou "knowledge")
+            
+        Returns:
+            Section formatée (vide si aucune donnée)
+        """
+        if section == "client":
+            data, format_section = self.current_client, InsurancePromptSystem.format_client_context
+        elif section == "claim":
+            data, format_section = self.current_claim, InsurancePromptSystem.format_claim_context
+        else:
+            # Éléments classés par pertinence, dans l'ordre utilisé par le gestionnaire de budget
+            data = self.knowledge_context
+            format_section = lambda items: InsurancePromptSystem.format_knowledge_context(
+                PromptBudgetManager.rank_knowledge_items(items))
+        
+        if not data:
+            return ""
+        
+        cached = self._context_sections.get(section)
+        if cached is None:
+            cached = self._context_sections[section] = (self._content_hash(data), format_section(data))
+        return cached[1]
     
     def set_client_context(self, client_data: Dict[str, Any]) -> None:
         """
@@ -43,6 +124,7 @@ class ChatbotOrchestrator:
             client_data: Données du client
         """
         self.current_client = client_data
+        self._update_context_section("client", client_data)
     
     def set_claim_context(self, claim_data: Dict[str, Any]) -> None:
         """
@@ -52,6 +134,7 @@ class ChatbotOrchestrator:
             claim_data: Données de la réclamation
         """
         self.current_claim = claim_data
+        self._update_context_section("claim", claim_data)
     
     def set_knowledge_context(self, knowledge_items: List[Dict[str, Any]]) -> None:
         """
@@ -61,29 +144,17 @@ class ChatbotOrchestrator:
             knowledge_items: Éléments de la base de connaissances
         """
         self.knowledge_context = knowledge_items
+        self._update_context_section("knowledge", knowledge_items)
     
     def build_context_prompt(self) -> str:
         """
         Construit le prompt de contexte complet pour la conversation.
+        Les sections inchangées depuis le tour précédent ne sont pas reformatées.
         
         Returns:
             Prompt de contexte
         """
-        context = ""
-        
-        # Ajout du contexte client si disponible
-        if self.current_client:
-            context += InsurancePromptSystem.format_client_context(self.current_client)
-        
-        # Ajout du contexte de réclamation si disponible
-        if self.current_claim:
-            context += InsurancePromptSystem.format_claim_context(self.current_claim)
-        
-        # Ajout du contexte de connaissances si disponible
-        if self.knowledge_context:
-            context += InsurancePromptSystem.format_knowledge_context(self.knowledge_context)
-        
-        return context
+        return "".join(self._render_context_section(section) for section in ("client", "claim", "knowledge"))
     
     def detect_intent(self, user_message: str) -> Tuple[str, float]:
         """
@@ -95,34 +166,17 @@ class ChatbotOrchestrator:
         Returns:
             Tuple contenant l'intention détectée et le score de confiance
         """
-        # Liste des intentions possibles avec leurs mots-clés associés
-        intents = {
-            "remboursement": ["remboursement", "rembourser", "remboursé", "prise en charge", "frais", "dépense", "facture"],
-            "reclamation": ["réclamation", "plainte", "problème", "erreur", "insatisfaction", "contester"],
-            "contrat": ["contrat", "garantie", "couverture", "niveau", "option", "formule", "souscription"],
-            "resiliation": ["résiliation", "résilier", "annuler", "annulation", "mettre fin", "arrêter"]
-        }
-        
-        # Calcul du score pour chaque intention
-        scores = {}
-        user_message_lower = user_message.lower()
-        
-        for intent, keywords in intents.items():
-            score = 0
-            for keyword in keywords:
-                if keyword in user_message_lower:
-                    score += 1
-            
-            scores[intent] = score / len(keywords) if score > 0 else 0
+        # Détection insensible aux accents et à la casse (mots-clés compilés une seule fois)
+        intent, confidence = self.intent_matcher.match(user_message)
         
-        # Sélection de l'intention avec le score le plus élevé
-        max_intent = max(scores.items(), key=lambda x: x[1])
+        # Messages reformulés sans mot-clé : classification par similarité d'embeddings
+        if intent == "general" and self.intent_classifier is not None:
+            try:
+                intent, confidence = self.intent_classifier.classify(user_message)
+            except Exception as e:
+                logger.warning(f"Erreur du classifieur d'intention par embeddings: {e}")
         
-        # Si aucune intention n'est détectée avec un score suffisant, on utilise l'intention par défaut
-        if max_intent[1] < 0.2:
-            return "general", 0.0
-        
-        return max_intent
+        return intent, confidence
     
     def get_intent_prompt(self, intent: str) -> str:
         """
@@ -142,47 +196,159 @@ class ChatbotOrchestrator:
             "general": ""  # Pas de prompt spécifique pour l'intention générale
         }
         
-        return intent_prompts.get(intent, "")
+        if intent not in intent_prompts:
+            # Intentions détectées par le classifieur par embeddings (modification, prise_en_charge)
+            return PromptTemplates.get_intent_specific_prompts().get(intent, "")
+        
+        return intent_prompts[intent]
     
-    def process_message(self, user_message: str, temperature: float = 0.7) -> str:
+    def build_messages(self, user_message: str) -> List[Dict[str, str]]:
         """
-        Traite un message utilisateur et génère une réponse.
+        Ajoute le message utilisateur à l'historique et construit les messages pour l'API.
+        Chaque section du prompt est limitée par le gestionnaire de budget ; le détail
+        des éléments tronqués ou écartés est disponible dans last_budget_report.
         
         Args:
             user_message: Message de l'utilisateur
-            temperature: Température pour le sampling (0.0 à 1.0)
             
         Returns:
-            Réponse générée
+            Messages pour l'API Groq
         """
         # Détection de l'intention
         intent, confidence = self.detect_intent(user_message)
         
-        # Construction du prompt système
-        system_prompt = InsurancePromptSystem.get_system_prompt()
-        
-        # Ajout du prompt spécifique à l'intention si la confiance est suffisante
+        # Prompt spécifique à l'intention (vide pour l'intention générale)
         intent_prompt = self.get_intent_prompt(intent)
-        if intent_prompt:
-            system_prompt += f"\n\n{intent_prompt}"
-        
-        # Construction du contexte
-        context_prompt = self.build_context_prompt()
         
         # Ajout du message utilisateur à l'historique
-        self.conversation_history.append({"role": "user", "content": user_message})
+        with self._history_lock:
+            self.conversation_history.append({"role": "user", "content": user_message})
+            if self.journal is not None:
+                self.journal.append({"role": "user", "content": user_message})
+        
+        messages, self.last_budget_report = self.budget_manager.assemble(
+            system_prompt=InsurancePromptSystem.get_system_prompt(),
+            intent_prompt=intent_prompt,
+            client_context=self._render_context_section("client"),
+            claim_context=self._render_context_section("claim"),
+            knowledge_items=self.knowledge_context or [],
+            history=list(self.conversation_history),
+            format_knowledge=InsurancePromptSystem.format_knowledge_context,
+            conversation_summary=self.conversation_summary,
+            knowledge_text=self._render_context_section("knowledge")
+        )
         
-        # Construction des messages pour l'API Groq
-        messages = [
-            {"role": "system", "content": system_prompt}
-        ]
+        return messages
+    
+    def add_assistant_message(self, content: str) -> None:
+        """
+        Ajoute une réponse de l'assistant à l'historique et planifie, si nécessaire,
+        le résumé des anciens messages en arrière-plan.
         
-        # Ajout du contexte comme message système supplémentaire si disponible
-        if context_prompt:
-            messages.append({"role": "system", "content": f"CONTEXTE:\n{context_prompt}"})
+        Args:
+            content: Réponse de l'assistant
+        """
+        with self._history_lock:
+            self.conversation_history.append({"role": "assistant", "content": content})
+            if self.journal is not None:
+                self.journal.append({"role": "assistant", "content": content})
+            generation = self._history_generation
+            overflow = self._history_overflow()
+            
+            if overflow and self.summarizer is None:
+                # Sans résumé, l'historique brut est simplement plafonné
+                logger.warning(f"Historique plafonné: {overflow} message(s) le(s) plus ancien(s) retiré(s)")
+                del self.conversation_history[:overflow]
+                overflow = 0
+        
+        if overflow:
+            # Le résumé a pris du retard : les messages excédentaires y sont intégrés avant d'être retirés
+            self._catch_up_summary(generation)
+        
+        if self.summarizer is not None:
+            with self._history_lock:
+                history = list(self.conversation_history)
+                summary = self.conversation_summary
+            apply_summary = self.summary_sink or self.apply_summary
+            self.summarizer.maybe_schedule(
+                history, summary,
+                lambda folded, new_summary: apply_summary(generation, folded, new_summary)
+            )
+    
+    def _history_overflow(self) -> int:
+        """Nombre de messages dépassant max_history_size (à appeler sous _history_lock)."""
+        if not self.max_history_size:
+            return 0
+        return max(0, len(self.conversation_history) - self.max_history_size)
+    
+    def _catch_up_summary(self, generation: int) -> None:
+        """
+        Ramène l'historique sous max_history_size en attendant le résumé en cours,
+        puis en résumant immédiatement les messages excédentaires si nécessaire.
+        
+        Args:
+            generation: Génération de l'historique
+        """
+        self.summarizer.wait()
+        
+        with self._history_lock:
+            if not self._history_overflow():
+                return
+            history = list(self.conversation_history)
+            summary = self.conversation_summary
+        
+        keep_recent = min(self.summarizer.keep_recent, self.max_history_size)
+        try:
+            folded, new_summary = self.summarizer.fold(history, summary, keep_recent)
+        except Exception as e:
+            logger.error(f"Erreur lors du résumé de l'historique excédentaire: {e}")
+            with self._history_lock:
+                overflow = self._history_overflow()
+                logger.warning(f"Historique plafonné: {overflow} message(s) le(s) plus ancien(s) retiré(s)")
+                del self.conversation_history[:overflow]
+            return
+        
+        self.apply_summary(generation, folded, new_summary)
+    
+    def apply_summary(self, generation: int, folded: List[Dict[str, str]], summary: str) -> None:
+        """
+        Remplace les messages résumés par le nouveau résumé glissant. Le résumé est
+        ignoré si l'historique a été effacé ou ne commence plus par les messages résumés.
+        
+        Args:
+            generation: Génération de l'historique au moment de la planification
+            folded: Messages intégrés au résumé
+            summary: Nouveau résumé
+        """
+        with self._history_lock:
+            if generation != self._history_generation:
+                # Historique effacé ou rechargé entre-temps
+                return
+            
+            # Comparaison par contenu : l'historique a pu être exporté puis restauré entre-temps
+            count = len(folded)
+            if self.conversation_history[:count] != folded:
+                logger.info("Résumé ignoré : l'historique ne commence plus par les messages résumés")
+                return
+            
+            del self.conversation_history[:count]
+            self.conversation_summary = summary
+            if self.journal is not None:
+                self.journal.record_summary(summary, len(self.conversation_history))
+    
+    def process_message(self, user_message: str, temperature: float = 0.7) -> str:
+        """
+        Traite un message utilisateur et génère une réponse.
         
-        # Ajout de l'historique de conversation (limité aux 10 derniers messages)
-        messages.extend(self.conversation_history[-10:])
+        Args:
+            user_message: Message de l'utilisateur
+            temperature: Température pour le sampling (0.0 à 1.0)
+            
+        Returns:
+            Réponse générée
+        """
+        # Construction des messages dans le respect du budget de tokens
+        messages = self.build_messages(user_message)
         
         # Appel à l'API Groq
         response = self.groq_client.chat_completion(messages, temperature=temperature)
@@ -191,7 +357,7 @@ class ChatbotOrchestrator:
         assistant_message = response['choices'][0]['message']['content']
         
         # Ajout de la réponse à l'historique
-        self.conversation_history.append({"role": "assistant", "content": assistant_message})
+        self.add_assistant_message(assistant_message)
         
         return assistant_message
     
@@ -206,34 +372,8 @@ class ChatbotOrchestrator:
         Returns:
             Générateur de chunks de réponse
         """
-        # Détection de l'intention
-        intent, confidence = self.detect_intent(user_message)
-        
-        # Construction du prompt système
-        system_prompt = InsurancePromptSystem.get_system_prompt()
-        
-        # Ajout du prompt spécifique à l'intention si la confiance est suffisante
-        intent_prompt = self.get_intent_prompt(intent)
-        if intent_prompt:
-            system_prompt += f"\n\n{intent_prompt}"
-        
-        # Construction du contexte
-        context_prompt = self.build_context_prompt()
-        
-        # Ajout du message utilisateur à l'historique
-        self.conversation_history.append({"role": "user", "content": user_message})
-        
-        # Construction des messages pour l'API Groq
-        messages = [
-            {"role": "system", "content": system_prompt}
-        ]
-        
-        # Ajout du contexte comme message système supplémentaire si disponible
-        if context_prompt:
-            messages.append({"role": "system", "content": f"CONTEXTE:\n{context_prompt}"})
-        
-        # Ajout de l'historique de conversation (limité aux 10 derniers messages)
-        messages.extend(self.conversation_history[-10:])
+        # Construction des messages dans le respect du budget de tokens
+        messages = self.build_messages(user_message)
         
         # Appel à l'API Groq en mode streaming
         response_stream = self.groq_client.chat_completion(
@@ -252,15 +392,94 @@ class ChatbotOrchestrator:
                     yield content
         
         # Ajout de la réponse complète à l'historique
-        self.conversation_history.append({"role": "assistant", "content": full_response})
+        self.add_assistant_message(full_response)
     
     def clear_conversation_history(self) -> None:
-        """Efface l'historique de conversation."""
-        self.conversation_history = []
+        """Efface l'historique de conversation et son résumé."""
+        with self._history_lock:
+            self.conversation_history = []
+            self.conversation_summary = ""
+            self._history_generation += 1
+        if self.journal is not None:
+            self.journal.reset()
+    
+    def export_session_state(self) -> Dict[str, Any]:
+        """
+        Exporte l'état de la conversation (historique, résumé et contexte).
+        
+        Returns:
+            État de la conversation, restaurable avec restore_session_state()
+        """
+        with self._history_lock:
+            return {
+                "history": list(self.conversation_history),
+                "summary": self.conversation_summary,
+                "client": self.current_client,
+                "claim": self.current_claim,
+                "knowledge": self.knowledge_context,
+                "context_sections": dict(self._context_sections),
+                "generation": self._history_generation
+            }
+    
+    def restore_session_state(self, history: List[Dict[str, str]], summary: str = "",
+                              client: Optional[Dict[str, Any]] = None,
+                              claim: Optional[Dict[str, Any]] = None,
+                              knowledge: Optional[List[Dict[str, Any]]] = None,
+                              context_sections: Optional[Dict[str, Tuple[str, str]]] = None,
+                              generation: Optional[int] = None) -> None:
+        """
+        Remplace l'état de la conversation (permet de servir plusieurs sessions
+        avec un même orchestrateur).
+        
+        Args:
+            history: Historique de la conversation
+            summary: Résumé glissant des échanges plus anciens
+            client: Données du client
+            claim: Données de la réclamation
+            knowledge: Éléments de la base de connaissances
+            context_sections: Sections de contexte déjà formatées (revalidées par empreinte)
+            generation: Génération de l'historique de la session (les résumés planifiés pour
+                une autre génération sont ignorés ; inchangée si non spécifiée)
+        """
+        with self._history_lock:
+            self.conversation_history = list(history)
+            self.conversation_summary = summary
+            if generation is not None:
+                self._history_generation = generation
+        
+        self._context_sections = dict(context_sections or {})
+        self.set_client_context(client)
+        self.set_claim_context(claim)
+        self.set_knowledge_context(knowledge or [])
+    
+    def create_journal(self, filename: str) -> ConversationJournal:
+        """
+        Ouvre un journal JSONL dont la compaction conserve l'historique utile de l'orchestrateur.
+        
+        Args:
+            filename: Chemin du fichier JSONL
+            
+        Returns:
+            Journal de la conversation
+        """
+        # Au-delà de max_history_size, les messages sont intégrés au résumé également journalisé
+        return ConversationJournal(filename, retain_messages=self.max_history_size or JOURNAL_RETAIN_MESSAGES)
+    
+    def _attach_journal(self, filename: str) -> ConversationJournal:
+        """Active la journalisation des nouveaux messages dans un fichier JSONL."""
+        if self.journal is not None:
+            if os.path.abspath(self.journal.path) == os.path.abspath(filename):
+                return self.journal
+            self.journal.close()
+        self.journal = self.create_journal(filename)
+        return self.journal
     
     def save_conversation(self, filename: str) -> bool:
         """
         Sauvegarde l'historique de conversation dans un fichier JSON.
+        Avec une extension .jsonl, l'historique est écrit une fois sous forme de journal,
+        puis chaque nouveau message y est ajouté au fil de l'eau : les sauvegardes
+        suivantes se limitent à une synchronisation disque.
         
         Args:
             filename: Nom du fichier de sauvegarde
@@ -269,6 +488,20 @@ class ChatbotOrchestrator:
             True si la sauvegarde est réussie, False sinon
         """
         try:
+            if filename.endswith('.jsonl'):
+                if self.journal is not None and os.path.abspath(self.journal.path) == os.path.abspath(filename):
+                    self.journal.sync()
+                else:
+                    with self._history_lock:
+                        history = list(self.conversation_history)
+                        summary = self.conversation_summary
+                    if self.journal is not None:
+                        self.journal.close()
+                        self.journal = None
+                    ConversationJournal.write_snapshot(filename, history, summary)
+                    self._attach_journal(filename)
+                return True
+            
             with open(filename, 'w', encoding='utf-8') as f:
                 json.dump(self.conversation_history, f, ensure_ascii=False, indent=2)
             return True
@@ -276,19 +509,36 @@ class ChatbotOrchestrator:
             print(f"Erreur lors de la sauvegarde de la conversation: {e}")
             return False
     
-    def load_conversation(self, filename: str) -> bool:
+    def load_conversation(self, filename: str, last_messages: Optional[int] = None) -> bool:
         """
         Charge l'historique de conversation depuis un fichier JSON.
+        Un journal .jsonl est lu depuis la fin (seuls les derniers messages sont décodés)
+        et les nouveaux messages y sont ensuite ajoutés.
         
         Args:
             filename: Nom du fichier à charger
+            last_messages: Nombre de messages les plus récents à charger depuis un journal
+                (max_history_size ou tous si non spécifié)
             
         Returns:
             True si le chargement est réussi, False sinon
         """
         try:
-            with open(filename, 'r', encoding='utf-8') as f:
-                self.conversation_history = json.load(f)
+            if filename.endswith('.jsonl'):
+                journal = self._attach_journal(filename)
+                history = journal.read_last(last_messages or self.max_history_size)
+                summary = journal.read_summary()
+            else:
+                with open(filename, 'r', encoding='utf-8') as f:
+                    history = json.load(f)
+                summary = ""
+                if self.journal is not None:
+                    self.journal.close()
+                    self.journal = None
+            with self._history_lock:
+                self.conversation_history = history
+                self.conversation_summary = summary
+                self._history_generation += 1
             return True
         except Exception as e:
             print(f"Erreur lors du chargement de la conversation: {e}")
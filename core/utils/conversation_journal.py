@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Module de journalisation des conversations pour le POC de chatbot IA AssurSanté.
+Chaque message est ajouté en fin de fichier JSONL (une ligne par message) ; la synchronisation
+disque (fsync) est regroupée par intervalle, la lecture des derniers messages se fait depuis la
+fin du fichier et le journal est compacté périodiquement (dernier résumé et derniers messages).
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from typing import Dict, List, Any, Optional, Iterator, Tuple
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Configuration du journal
+JOURNAL_FSYNC_INTERVAL = float(os.getenv('JOURNAL_FSYNC_INTERVAL', '1.0'))  # Secondes entre deux fsync
+JOURNAL_COMPACT_BYTES = int(os.getenv('JOURNAL_COMPACT_BYTES', str(1024 * 1024)))  # Taille déclenchant la compaction
+JOURNAL_RETAIN_MESSAGES = int(os.getenv('JOURNAL_RETAIN_MESSAGES', '200'))  # Messages conservés à la compaction (0 = tous)
+
+# Enregistrement marquant l'effacement de l'historique
+RESET_RECORD = {"type": "reset"}
+# Type des enregistrements du résumé glissant (le plus récent remplace les précédents) ;
+# "retained" y indique le nombre de messages précédant l'enregistrement non couverts par le résumé
+SUMMARY_RECORD_TYPE = "summary"
+
+_READ_BLOCK_SIZE = 8192
+
+class ConversationJournal:
+    """
+    Journal JSONL en ajout seul de l'historique d'une conversation.
+    Les messages antérieurs au dernier effacement (enregistrement "reset") ou déjà couverts
+    par le dernier résumé (enregistrement "summary") sont ignorés à la lecture et supprimés
+    à la compaction, qui ne conserve que ce résumé et les retain_messages derniers messages.
+    """
+
+    def __init__(self, path: str,
+                 fsync_interval: float = JOURNAL_FSYNC_INTERVAL,
+                 compact_bytes: int = JOURNAL_COMPACT_BYTES,
+                 retain_messages: int = JOURNAL_RETAIN_MESSAGES):
+        """
+        Ouvre (ou crée) le journal.
+
+        Args:
+            path: Chemin du fichier JSONL
+            fsync_interval: Délai maximal avant synchronisation disque des ajouts (secondes, 0 = à chaque ajout)
+            compact_bytes: Taille du fichier à partir de laquelle la compaction est tentée
+            retain_messages: Nombre de messages conservés à la compaction (0 pour tous)
+        """
+        self.path = path
+        self.fsync_interval = fsync_interval
+        self.compact_bytes = compact_bytes
+        self.retain_messages = retain_messages
+        self._lock = threading.RLock()
+        self._file = open(path, 'ab')
+        self._terminate_partial_line()
+        self._dirty = False
+        self._last_sync = time.monotonic()
+        self._sync_timer: Optional[threading.Timer] = None
+        self._next_compaction = compact_bytes
+
+    def _terminate_partial_line(self) -> None:
+        """Termine une dernière ligne incomplète (écriture interrompue) pour ne pas corrompre l'ajout suivant."""
+        if self._file.tell() == 0:
+            return
+        with open(self.path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b'\n':
+                self._file.write(b'\n')
+                self._file.flush()
+
+    def _write_records(self, records: List[Dict[str, Any]]) -> None:
+        data = b''.join(
+            json.dumps(record, ensure_ascii=False, separators=(',', ':')).encode('utf-8') + b'\n'
+            for record in records
+        )
+        with self._lock:
+            self._file.write(data)
+            self._file.flush()
+            self._dirty = True
+
+            if time.monotonic() - self._last_sync >= self.fsync_interval:
+                self.sync()
+            elif self._sync_timer is None:
+                # Synchronisation différée : les ajouts de l'intervalle partagent un seul fsync
+                self._sync_timer = threading.Timer(self.fsync_interval, self.sync)
+                self._sync_timer.daemon = True
+                self._sync_timer.start()
+
+            if self._file.tell() >= self._next_compaction:
+                self.compact()
+
+    def append(self, message: Dict[str, str]) -> None:
+        """
+        Ajoute un message au journal.
+
+        Args:
+            message: Message ({"role": ..., "content": ...})
+        """
+        self._write_records([{"role": message.get('role'), "content": message.get('content', '')}])
+
+    def extend(self, messages: List[Dict[str, str]]) -> None:
+        """
+        Ajoute plusieurs messages au journal en une seule écriture.
+
+        Args:
+            messages: Messages à ajouter
+        """
+        if messages:
+            self._write_records([{"role": m.get('role'), "content": m.get('content', '')} for m in messages])
+
+    def record_summary(self, summary: str, retained: int = 0) -> None:
+        """
+        Enregistre le résumé glissant de la conversation (remplace le résumé précédent).
+
+        Args:
+            summary: Résumé des messages les plus anciens
+            retained: Nombre de derniers messages du journal non couverts par le résumé
+        """
+        self._write_records([{"type": SUMMARY_RECORD_TYPE, "content": summary, "retained": retained}])
+
+    def reset(self) -> None:
+        """Marque l'effacement de l'historique (les messages précédents ne seront plus lus)."""
+        self._write_records([RESET_RECORD])
+
+    def sync(self) -> None:
+        """Force la synchronisation disque des ajouts en attente."""
+        with self._lock:
+            if self._sync_timer is not None:
+                self._sync_timer.cancel()
+                self._sync_timer = None
+            if self._dirty and not self._file.closed:
+                os.fsync(self._file.fileno())
+                self._dirty = False
+            self._last_sync = time.monotonic()
+
+    def _iter_lines_reversed(self) -> Iterator[bytes]:
+        """Parcourt les lignes du fichier de la dernière à la première, par blocs."""
+        with open(self.path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            position = f.tell()
+            remainder = b''
+
+            while position > 0:
+                size = min(_READ_BLOCK_SIZE, position)
+                position -= size
+                f.seek(position)
+                lines = (f.read(size) + remainder).split(b'\n')
+                remainder = lines[0]
+                for line in reversed(lines[1:]):
+                    if line.strip():
+                        yield line
+
+            if remainder.strip():
+                yield remainder
+
+    def _read_tail(self, n: Optional[int], with_summary: bool) -> Tuple[List[Dict[str, str]], str]:
+        """
+        Lit depuis la fin du fichier les n derniers messages non couverts par le dernier résumé
+        et, si demandé, ce résumé.
+        """
+        with self._lock:
+            self._file.flush()
+
+        messages = []
+        summary = None
+        scanned = 0
+        uncovered = None
+        if n == 0 and not with_summary:
+            return messages, ""
+
+        for line in self._iter_lines_reversed():
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # Ligne incomplète (écriture interrompue) : ignorée
+                logger.warning(f"Ligne illisible ignorée dans le journal {self.path}")
+                continue
+
+            record_type = record.get("type")
+            if record_type == "reset":
+                break
+            if record_type == SUMMARY_RECORD_TYPE:
+                if summary is None:
+                    summary = record.get("content", "")
+                    # Les messages plus anciens que les "retained" non couverts sont déjà résumés
+                    uncovered = scanned + record.get("retained", 0)
+            else:
+                if uncovered is not None and scanned >= uncovered:
+                    break
+                scanned += 1
+                if n is None or len(messages) < n:
+                    messages.append(record)
+
+            if n is not None and len(messages) >= n and (summary is not None or not with_summary):
+                break
+
+        messages.reverse()
+        return messages, summary or ""
+
+    def read_last(self, n: Optional[int] = None) -> List[Dict[str, str]]:
+        """
+        Lit les derniers messages du journal en partant de la fin du fichier.
+
+        Args:
+            n: Nombre de messages à lire (tous les messages depuis le dernier effacement si None)
+
+        Returns:
+            Messages, du plus ancien au plus récent
+        """
+        return self._read_tail(n, with_summary=False)[0]
+
+    def read_summary(self) -> str:
+        """
+        Lit le dernier résumé enregistré depuis le dernier effacement.
+
+        Returns:
+            Résumé (vide si aucun)
+        """
+        return self._read_tail(0, with_summary=True)[1]
+
+    def compact(self) -> None:
+        """
+        Réécrit le journal avec le seul état utile : le dernier résumé et les messages
+        qu'il ne couvre pas, limités aux retain_messages derniers si configuré.
+        """
+        with self._lock:
+            messages, summary = self._read_tail(self.retain_messages or None, with_summary=True)
+            records = ([{"type": SUMMARY_RECORD_TYPE, "content": summary, "retained": 0}] if summary else []) + messages
+
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                for record in records:
+                    f.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')).encode('utf-8') + b'\n')
+                f.flush()
+                os.fsync(f.fileno())
+
+            self._file.close()
+            os.replace(tmp_path, self.path)
+            self._file = open(self.path, 'ab')
+            self._dirty = False
+
+            # Sans message à supprimer, la prochaine tentative attend que le fichier double
+            self._next_compaction = max(self.compact_bytes, 2 * self._file.tell())
+            logger.info(f"Journal {self.path} compacté: {len(messages)} message(s) conservé(s)")
+
+    def close(self) -> None:
+        """Synchronise et ferme le journal."""
+        with self._lock:
+            self.sync()
+            self._file.close()
+
+    @staticmethod
+    def write_snapshot(path: str, messages: List[Dict[str, str]], summary: str = "") -> None:
+        """
+        Écrit un journal complet à partir d'un historique (remplace le fichier existant).
+
+        Args:
+            path: Chemin du fichier JSONL
+            messages: Historique de la conversation
+            summary: Résumé glissant des messages plus anciens
+        """
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            if summary:
+                record = {"type": SUMMARY_RECORD_TYPE, "content": summary, "retained": 0}
+                f.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')).encode('utf-8') + b'\n')
+            for message in messages:
+                record = {"role": message.get('role'), "content": message.get('content', '')}
+                f.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')).encode('utf-8') + b'\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
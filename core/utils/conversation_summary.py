@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Module de résumé glissant des conversations pour le POC de chatbot IA AssurSanté.
+Les anciens tours de conversation sont condensés en arrière-plan dans un résumé compact,
+afin de borner la taille de l'historique sans perdre les faits importants.
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Dict, List, Any, Optional, Callable, Tuple
+from .groq_integration import GroqClient
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+SUMMARY_PROMPT = """Vous êtes un assistant chargé de tenir à jour le résumé d'une conversation entre un agent du service client d'AssurSanté et l'assistant IA.
+
+Intégrez les nouveaux échanges ci-dessous au résumé existant. Le résumé doit :
+1. Conserver tous les faits utiles pour la suite (identité et contrat du client, demandes, montants, dates, numéros de dossier, décisions et engagements pris)
+2. Supprimer les formules de politesse et les répétitions
+3. Rester factuel, sans ajouter d'information absente des échanges
+4. Tenir en quelques phrases ou une courte liste à puces
+
+Résumé existant :
+{summary}
+
+Nouveaux échanges :
+{exchanges}
+
+Résumé mis à jour :"""
+
+class ConversationSummarizer:
+    """
+    Résumé glissant de l'historique de conversation, calculé hors du chemin critique.
+    """
+
+    def __init__(self, groq_client: GroqClient,
+                 threshold: int = 20,
+                 keep_recent: int = 10,
+                 max_summary_tokens: int = 400,
+                 executor: Optional[ThreadPoolExecutor] = None):
+        """
+        Initialise le système de résumé.
+
+        Args:
+            groq_client: Client Groq pour les appels API
+            threshold: Nombre de messages d'historique déclenchant un résumé
+            keep_recent: Nombre de messages récents conservés tels quels
+            max_summary_tokens: Taille maximale du résumé (tokens)
+            executor: Exécuteur des résumés en arrière-plan (créé si non spécifié)
+        """
+        self.groq_client = groq_client
+        self.threshold = threshold
+        self.keep_recent = min(keep_recent, threshold)
+        self.max_summary_tokens = max_summary_tokens
+        self.executor = executor or ThreadPoolExecutor(max_workers=1, thread_name_prefix="summarizer")
+        self._pending: Optional[Future] = None
+        self._lock = threading.Lock()
+
+    def summarize(self, summary: str, messages: List[Dict[str, str]]) -> str:
+        """
+        Intègre des messages au résumé existant (appel synchrone au LLM).
+
+        Args:
+            summary: Résumé existant (peut être vide)
+            messages: Messages à intégrer au résumé
+
+        Returns:
+            Résumé mis à jour
+        """
+        exchanges = "\n".join(
+            f"{'Agent' if message.get('role') == 'user' else 'Assistant'} : {message.get('content', '')}"
+            for message in messages
+        )
+        prompt = SUMMARY_PROMPT.format(summary=summary or "(aucun)", exchanges=exchanges)
+
+        response = self.groq_client.chat_completion(
+            [{"role": "system", "content": prompt}],
+            temperature=0.2,
+            max_tokens=self.max_summary_tokens
+        )
+        return response['choices'][0]['message']['content'].strip()
+
+    def fold(self, history: List[Dict[str, str]], summary: str,
+             keep_recent: Optional[int] = None) -> Tuple[List[Dict[str, str]], str]:
+        """
+        Intègre immédiatement au résumé les messages antérieurs aux plus récents (appel synchrone).
+
+        Args:
+            history: Historique courant de la conversation
+            summary: Résumé courant
+            keep_recent: Nombre de messages récents conservés tels quels (keep_recent du système si non spécifié)
+
+        Returns:
+            Tuple (messages résumés, nouveau résumé)
+        """
+        keep_recent = self.keep_recent if keep_recent is None else keep_recent
+        folded = list(history[:max(0, len(history) - keep_recent)])
+        if not folded:
+            return [], summary
+        return folded, self.summarize(summary, folded)
+
+    def maybe_schedule(self, history: List[Dict[str, str]], summary: str,
+                       on_done: Callable[[List[Dict[str, str]], str], None]) -> bool:
+        """
+        Planifie en arrière-plan le résumé des anciens messages si le seuil est dépassé.
+
+        Args:
+            history: Historique courant de la conversation
+            summary: Résumé courant
+            on_done: Fonction appelée avec (messages résumés, nouveau résumé)
+
+        Returns:
+            True si un résumé a été planifié
+        """
+        with self._lock:
+            if len(history) <= self.threshold or (self._pending is not None and not self._pending.done()):
+                return False
+
+            folded = list(history[:len(history) - self.keep_recent])
+
+            def _run():
+                try:
+                    new_summary = self.summarize(summary, folded)
+                except Exception as e:
+                    logger.error(f"Erreur lors du résumé de la conversation: {e}")
+                    return
+                on_done(folded, new_summary)
+
+            self._pending = self.executor.submit(_run)
+            return True
+
+    def wait(self, timeout: Optional[float] = None) -> None:
+        """
+        Attend la fin du résumé en cours (utile avant une sauvegarde ou en test).
+
+        Args:
+            timeout: Délai maximal d'attente (secondes)
+        """
+        with self._lock:
+            pending = self._pending
+        if pending is not None:
+            pending.result(timeout=timeout)
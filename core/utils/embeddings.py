@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Module des backends d'embedding pour le POC de chatbot IA AssurSanté.
+Ce module permet de calculer les embeddings localement, dans le même espace vectoriel
+(all-MiniLM-L6-v2, 384 dimensions) que la collection Qdrant knowledge_base.
+"""
+
+import os
+import hashlib
+import logging
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, List, Any, Optional
+from .llm_cache import LRUCache
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Configuration des embeddings
+EMBEDDING_BACKEND = os.getenv('EMBEDDING_BACKEND', 'local')  # 'local' ou 'groq'
+EMBEDDING_MODEL_NAME = os.getenv('EMBEDDING_MODEL_NAME', 'all-MiniLM-L6-v2')  # Modèle de data/vectorize_knowledge.py
+EMBEDDING_CACHE_SIZE = int(os.getenv('EMBEDDING_CACHE_SIZE', '4096'))
+EMBEDDING_BATCH_SIZE = int(os.getenv('EMBEDDING_BATCH_SIZE', '64'))
+
+class EmbeddingBackend(ABC):
+    """
+    Backend d'embedding avec cache borné indexé par l'empreinte des textes.
+    Les sous-classes implémentent _embed_batch().
+    """
+
+    def __init__(self, cache_size: int = EMBEDDING_CACHE_SIZE):
+        """
+        Initialise le backend.
+
+        Args:
+            cache_size: Nombre maximum d'embeddings conservés en cache (0 pour désactiver)
+        """
+        self.cache = LRUCache(cache_size) if cache_size > 0 else None
+
+    @staticmethod
+    def _text_key(text: str) -> str:
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+    @abstractmethod
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """
+        Encode un lot de textes absents du cache.
+
+        Args:
+            texts: Textes à encoder
+
+        Returns:
+            Vecteurs d'embedding, dans l'ordre des textes
+        """
+
+    def get_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """
+        Calcule les embeddings d'un lot de textes.
+
+        Args:
+            texts: Textes à encoder
+
+        Returns:
+            Vecteurs d'embedding, dans l'ordre des textes
+        """
+        if self.cache is None:
+            return self._embed_batch(list(texts))
+
+        keys = [self._text_key(text) for text in texts]
+        embeddings: List[Optional[List[float]]] = [self.cache.get(key) for key in keys]
+
+        # Encodage groupé des seuls textes absents du cache (dédoublonnés)
+        missing: Dict[str, int] = {}
+        for i, embedding in enumerate(embeddings):
+            if embedding is None and keys[i] not in missing:
+                missing[keys[i]] = i
+
+        if missing:
+            computed = self._embed_batch([texts[i] for i in missing.values()])
+            by_key = dict(zip(missing.keys(), computed))
+            for key, embedding in by_key.items():
+                self.cache.set(key, embedding)
+            embeddings = [embedding if embedding is not None else by_key[key]
+                          for key, embedding in zip(keys, embeddings)]
+
+        return embeddings
+
+    def get_embedding(self, text: str) -> List[float]:
+        """
+        Calcule l'embedding d'un texte.
+
+        Args:
+            text: Texte à encoder
+
+        Returns:
+            Vecteur d'embedding
+        """
+        return self.get_embeddings([text])[0]
+
+_loaded_models: Dict[str, Any] = {}
+_loaded_models_lock = threading.Lock()
+
+def load_sentence_transformer(model_name: str = EMBEDDING_MODEL_NAME) -> Any:
+    """
+    Charge un modèle SentenceTransformer une seule fois par processus.
+
+    Args:
+        model_name: Nom du modèle
+
+    Returns:
+        Modèle chargé
+    """
+    model = _loaded_models.get(model_name)
+    if model is None:
+        with _loaded_models_lock:
+            model = _loaded_models.get(model_name)
+            if model is None:
+                from sentence_transformers import SentenceTransformer
+                model = _loaded_models[model_name] = SentenceTransformer(model_name)
+    return model
+
+class SentenceTransformerBackend(EmbeddingBackend):
+    """Backend d'embedding local basé sur SentenceTransformer (aucun appel réseau)."""
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL_NAME,
+                 batch_size: int = EMBEDDING_BATCH_SIZE,
+                 cache_size: int = EMBEDDING_CACHE_SIZE):
+        """
+        Initialise le backend local.
+
+        Args:
+            model_name: Nom du modèle SentenceTransformer
+            batch_size: Taille des lots d'encodage
+            cache_size: Nombre maximum d'embeddings conservés en cache
+        """
+        super().__init__(cache_size)
+        self.model_name = model_name
+        self.batch_size = batch_size
+
+    @property
+    def model(self) -> Any:
+        return load_sentence_transformer(self.model_name)
+
+    @property
+    def dimension(self) -> int:
+        return self.model.get_sentence_embedding_dimension()
+
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        vectors = self.model.encode(texts, batch_size=self.batch_size, convert_to_numpy=True,
+                                    show_progress_bar=False)
+        return vectors.tolist()
+
+class GroqEmbeddingBackend(EmbeddingBackend):
+    """Backend d'embedding distant via l'endpoint /embeddings de l'API Groq."""
+
+    def __init__(self, groq_client: Any, cache_size: int = EMBEDDING_CACHE_SIZE):
+        """
+        Initialise le backend distant.
+
+        Args:
+            groq_client: Client Groq effectuant les appels
+            cache_size: Nombre maximum d'embeddings conservés en cache
+        """
+        if groq_client is None:
+            raise ValueError("Le backend d'embedding 'groq' nécessite un client Groq.")
+        super().__init__(cache_size)
+        self.groq_client = groq_client
+
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        return self.groq_client.request_embeddings(texts)
+
+_default_backend: Optional[EmbeddingBackend] = None
+_default_backend_lock = threading.Lock()
+
+def get_default_embedding_backend(groq_client: Any = None) -> EmbeddingBackend:
+    """
+    Retourne le backend d'embedding configuré par EMBEDDING_BACKEND.
+    Le backend local est partagé par tout le processus ; il est également utilisé
+    lorsque le backend 'groq' est configuré sans client Groq.
+
+    Args:
+        groq_client: Client Groq (utilisé par le backend 'groq')
+
+    Returns:
+        Backend d'embedding
+    """
+    global _default_backend
+    if EMBEDDING_BACKEND == 'groq':
+        if groq_client is not None:
+            return GroqEmbeddingBackend(groq_client)
+        logger.warning("Backend d'embedding 'groq' demandé sans client Groq : utilisation du backend local")
+
+    if _default_backend is None:
+        with _default_backend_lock:
+            if _default_backend is None:
+                _default_backend = SentenceTransformerBackend()
+    return _default_backend
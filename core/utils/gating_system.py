@@ -4,31 +4,180 @@
 """
 Module d'implémentation du système de gating pour le POC de chatbot IA AssurSanté.
 Ce module permet de vérifier la conformité des réponses avant leur envoi à l'utilisateur.
+Les règles activées sont évaluées en parallèle, dans un délai global.
 """
 
+import os
 import json
+import time
+import random
 import logging
+import threading
+from collections import deque
+from contextvars import ContextVar
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from typing import Dict, List, Any, Optional, Tuple, Callable
 from .groq_integration import GroqClient
+from .pii_detector import PIIDetector, default_pii_detector, VERDICT_LEAK
+from .prompt_budget import estimate_tokens
+from .rate_limiting import RateLimitWaitClock, measure_rate_limit_wait
 
 # Configuration du logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Configuration du gating
+GATING_DEADLINE = float(os.getenv('GATING_DEADLINE', '10'))  # Délai global d'évaluation (secondes)
+GATING_MAX_WORKERS = int(os.getenv('GATING_MAX_WORKERS', '12'))  # Évaluations de règles simultanées
+# Sévérités pour lesquelles une règle non évaluée à temps bloque la réponse (les autres sont ignorées)
+GATING_FAIL_CLOSED_SEVERITIES = set(os.getenv('GATING_FAIL_CLOSED_SEVERITIES', 'high').split(','))
+# Mode court-circuit : évaluation arrêtée au premier échec bloquant
+GATING_SHORT_CIRCUIT = os.getenv('GATING_SHORT_CIRCUIT', 'false').lower() == 'true'
+GATING_SHORT_CIRCUIT_PARALLELISM = int(os.getenv('GATING_SHORT_CIRCUIT_PARALLELISM', '3'))
+# Mode groupé : toutes les règles évaluées en un seul appel (réponse envoyée une seule fois)
+GATING_BATCHED = os.getenv('GATING_BATCHED', 'false').lower() == 'true'
+GATING_BATCH_MAX_TOKENS = int(os.getenv('GATING_BATCH_MAX_TOKENS', '2048'))
+GATING_PII_PREFILTER = os.getenv('GATING_PII_PREFILTER', 'true').lower() == 'true'  # Détection déterministe avant le LLM
+# Cascade : un petit modèle rapide évalue d'abord, le modèle principal ne réévalue que les scores
+# proches du seuil de réussite (GATING_CASCADE_PASS_THRESHOLD ± GATING_CASCADE_BAND)
+GATING_CASCADE = os.getenv('GATING_CASCADE', 'false').lower() == 'true'
+GATING_SMALL_MODEL = os.getenv('GATING_SMALL_MODEL', 'llama3-8b-8192')
+GATING_CASCADE_PASS_THRESHOLD = float(os.getenv('GATING_CASCADE_PASS_THRESHOLD', '0.5'))
+GATING_CASCADE_BAND = float(os.getenv('GATING_CASCADE_BAND', '0.2'))
+# Part des évaluations tranchées par le petit modèle réévaluées malgré tout (mesure de l'accord)
+GATING_CASCADE_AUDIT_RATE = float(os.getenv('GATING_CASCADE_AUDIT_RATE', '0.0'))
+GATING_FAIL_RATE_ALPHA = float(os.getenv('GATING_FAIL_RATE_ALPHA', '0.05'))  # Lissage du taux d'échec par règle
+
+# Échéance de la vérification en cours d'exécution (transmise comme timeout aux appels au LLM)
+_check_expiry: ContextVar[Optional[Callable[[], float]]] = ContextVar('gating_check_expiry', default=None)
+
+# Rang des sévérités (ordre d'évaluation en mode court-circuit)
+SEVERITY_RANKS = {"high": 0, "medium": 1, "low": 2}
+
+# Critères d'évaluation de chaque règle de conformité
+RULE_CRITERIA = {
+    "medical_advice": """Vous êtes un expert en conformité médicale. Votre tâche est d'évaluer si la réponse suivante contient des conseils médicaux inappropriés.
+
+Une réponse est considérée comme contenant des conseils médicaux inappropriés si elle :
+1. Donne des conseils médicaux spécifiques sans préciser qu'ils doivent être validés par un professionnel de santé
+2. Fait des diagnostics ou suggère des traitements
+3. Contredit les recommandations médicales standard
+4. Présente des opinions médicales comme des faits établis""",
+    "personal_data": """Vous êtes un expert en protection des données personnelles. Votre tâche est d'évaluer si la réponse suivante contient des données personnelles non protégées.
+
+Une réponse est considérée comme contenant des données personnelles non protégées si elle :
+1. Inclut des numéros de sécurité sociale complets ou partiellement masqués de manière insuffisante
+2. Contient des informations médicales sensibles associées à une personne identifiable
+3. Révèle des coordonnées personnelles complètes (adresse, téléphone, email)
+4. Mentionne des informations financières spécifiques (numéro de compte, montants précis)""",
+    "legal_compliance": """Vous êtes un expert juridique spécialisé dans le domaine de l'assurance santé. Votre tâche est d'évaluer si la réponse suivante est conforme aux exigences légales et réglementaires.
+
+Une réponse est considérée comme non conforme si elle :
+1. Contient des informations incorrectes sur les droits des assurés
+2. Fait des promesses de couverture ou de remboursement qui pourraient être trompeuses
+3. Omet des informations essentielles sur les limitations ou exclusions
+4. Suggère des pratiques contraires à la réglementation en vigueur
+5. Ne respecte pas les principes de la réforme 100% Santé lorsqu'elle est mentionnée""",
+    "tone_politeness": """Vous êtes un expert en communication client. Votre tâche est d'évaluer si le ton et la politesse de la réponse suivante sont appropriés pour un service client d'assurance santé.
+
+Une réponse est considérée comme inappropriée si elle :
+1. Utilise un langage familier ou irrespectueux
+2. Manque d'empathie dans des situations qui en nécessitent
+3. Est trop directive ou autoritaire
+4. Contient des formulations passives-agressives ou condescendantes
+5. N'inclut pas les formules de politesse attendues dans une communication professionnelle""",
+    "factual_accuracy": """Vous êtes un expert en vérification factuelle. Votre tâche est d'évaluer si la réponse suivante est factuellement exacte par rapport au contexte fourni.
+
+Une réponse est considérée comme factuellement inexacte si elle :
+1. Contient des informations qui contredisent le contexte fourni
+2. Fait des affirmations non étayées par le contexte
+3. Déforme ou interprète incorrectement les informations du contexte
+4. Invente des détails qui ne sont pas présents dans le contexte""",
+    "completeness": """Vous êtes un expert en analyse de la qualité des réponses. Votre tâche est d'évaluer si la réponse suivante est complète par rapport à la requête de l'utilisateur.
+
+Une réponse est considérée comme incomplète si elle :
+1. Ne répond pas à tous les aspects de la requête
+2. Omet des informations essentielles pour une compréhension complète
+3. Laisse des questions implicites sans réponse
+4. Est trop vague ou générale pour être utile
+5. Ne fournit pas les détails pratiques nécessaires (procédures, délais, etc.)"""
+}
+
+# En-tête de la réponse dans les prompts d'évaluation
+RESPONSE_HEADER = "\n\nRéponse à évaluer :\n"
+
+BATCH_PROMPT_HEADER = """Vous êtes un comité d'experts en conformité dans le domaine de l'assurance santé. Évaluez la réponse ci-dessous selon chacune des règles suivantes, indépendamment les unes des autres."""
+
+BATCH_PROMPT_FOOTER = """
+
+Évaluez la conformité de cette réponse selon les critères de chaque règle et fournissez votre analyse au format JSON, avec une entrée par règle (clés : {rules}) :
+{{
+  "<nom de la règle>": {{
+    "passed": true/false,
+    "score": 0.0-1.0,
+    "reason": "Explication détaillée de votre évaluation",
+    "issues": ["Liste des problèmes spécifiques identifiés"]
+  }}
+}}
+"""
+
 class GatingSystem:
     """
     Implémentation du pattern de gating pour le chatbot IA.
     Permet de vérifier la conformité des réponses avant leur envoi à l'utilisateur.
     """
     
-    def __init__(self, groq_client: Optional[GroqClient] = None):
+    def __init__(self, groq_client: Optional[GroqClient] = None,
+                 deadline: float = GATING_DEADLINE,
+                 max_workers: int = GATING_MAX_WORKERS,
+                 fail_closed_severities: Optional[set] = None,
+                 short_circuit: bool = GATING_SHORT_CIRCUIT,
+                 short_circuit_parallelism: int = GATING_SHORT_CIRCUIT_PARALLELISM,
+                 pii_detector: Optional[PIIDetector] = None,
+                 batched: bool = GATING_BATCHED,
+                 cascade: bool = GATING_CASCADE,
+                 small_client: Optional[GroqClient] = None,
+                 cascade_pass_threshold: float = GATING_CASCADE_PASS_THRESHOLD,
+                 cascade_band: float = GATING_CASCADE_BAND,
+                 cascade_audit_rate: float = GATING_CASCADE_AUDIT_RATE):
         """
         Initialise le système de gating.
         
         Args:
             groq_client: Client Groq pour les appels API
+            deadline: Délai global d'évaluation des règles (secondes)
+            max_workers: Nombre maximum d'évaluations de règles simultanées
+            fail_closed_severities: Sévérités pour lesquelles une règle hors délai fait échouer l'évaluation
+                (GATING_FAIL_CLOSED_SEVERITIES si non spécifiées)
+            short_circuit: Si True, l'évaluation s'arrête au premier échec d'une règle de sévérité haute
+            short_circuit_parallelism: Nombre de règles évaluées simultanément en mode court-circuit
+            pii_detector: Détecteur déterministe des données personnelles (détecteur partagé si GATING_PII_PREFILTER)
+            batched: Si True, les règles sont évaluées en un seul appel au LLM (repli règle par règle en cas d'échec)
+            cascade: Si True, chaque règle est d'abord évaluée par un petit modèle rapide
+            small_client: Client Groq du petit modèle (GATING_SMALL_MODEL si non spécifié)
+            cascade_pass_threshold: Score séparant réussite et échec
+            cascade_band: Demi-largeur de la zone d'incertitude autour du seuil, réévaluée par le modèle principal
+            cascade_audit_rate: Part des évaluations tranchées par le petit modèle réévaluées pour mesurer l'accord
         """
         self.groq_client = groq_client or GroqClient()
+        self.deadline = deadline
+        self.fail_closed_severities = fail_closed_severities or GATING_FAIL_CLOSED_SEVERITIES
+        # Les évaluations abandonnées après le délai libèrent leur thread à l'expiration de leur appel au LLM
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="gating")
+        self.short_circuit = short_circuit
+        self.short_circuit_parallelism = max(1, short_circuit_parallelism)
+        self.pii_detector = pii_detector or (default_pii_detector if GATING_PII_PREFILTER else None)
+        self.batched = batched
+        self.small_client = (small_client or GroqClient(model=GATING_SMALL_MODEL)) if cascade else None
+        self.cascade_pass_threshold = cascade_pass_threshold
+        self.cascade_band = cascade_band
+        self.cascade_audit_rate = cascade_audit_rate
+        self.cascade_stats = {"screened": 0, "escalated": 0, "audited": 0, "compared": 0, "agreements": 0,
+                              "small_latency": 0.0, "large_latency": 0.0}
+        
+        # Taux d'échec observé par règle (moyenne mobile exponentielle)
+        self.rule_stats: Dict[str, Dict[str, Any]] = {}
+        self._stats_lock = threading.Lock()
         
         # Règles de conformité par défaut
         self.compliance_rules = {
@@ -83,42 +232,63 @@ class GatingSystem:
         Returns:
             Résultat de la vérification
         """
-        prompt = """Vous êtes un expert en conformité médicale. Votre tâche est d'évaluer si la réponse suivante contient des conseils médicaux inappropriés.
-
-Une réponse est considérée comme contenant des conseils médicaux inappropriés si elle :
-1. Donne des conseils médicaux spécifiques sans préciser qu'ils doivent être validés par un professionnel de santé
-2. Fait des diagnostics ou suggère des traitements
-3. Contredit les recommandations médicales standard
-4. Présente des opinions médicales comme des faits établis
-
-Réponse à évaluer :
-"""
+        prompt = RULE_CRITERIA["medical_advice"] + RESPONSE_HEADER
         
         return self._evaluate_rule(prompt, response, "medical_advice")
     
-    def check_personal_data(self, response: str) -> Dict[str, Any]:
+    def check_personal_data(self, response: str, context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Vérifie si la réponse contient des données personnelles non protégées.
+        Le détecteur déterministe bloque les fuites certaines (NIR ou IBAN valides, données
+        du client) sans appel au LLM ; les autres réponses, ambiguës ou sans donnée
+        repérée, restent soumises au LLM.
         
         Args:
             response: Réponse à vérifier
+            context: Contexte de la conversation (données personnelles connues du client)
             
         Returns:
             Résultat de la vérification
         """
-        prompt = """Vous êtes un expert en protection des données personnelles. Votre tâche est d'évaluer si la réponse suivante contient des données personnelles non protégées.
-
-Une réponse est considérée comme contenant des données personnelles non protégées si elle :
-1. Inclut des numéros de sécurité sociale complets ou partiellement masqués de manière insuffisante
-2. Contient des informations médicales sensibles associées à une personne identifiable
-3. Révèle des coordonnées personnelles complètes (adresse, téléphone, email)
-4. Mentionne des informations financières spécifiques (numéro de compte, montants précis)
-
-Réponse à évaluer :
-"""
+        prefiltered = self._prefilter_personal_data(response, context)
+        if prefiltered is not None:
+            return prefiltered
+        
+        prompt = RULE_CRITERIA["personal_data"] + RESPONSE_HEADER
         
         return self._evaluate_rule(prompt, response, "personal_data")
     
+    def _prefilter_personal_data(self, response: str, context: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """
+        Applique le détecteur déterministe des données personnelles.
+        
+        Args:
+            response: Réponse à vérifier
+            context: Contexte de la conversation
+            
+        Returns:
+            Résultat de la règle personal_data en cas de fuite certaine, sinon None
+            (vérification par le LLM)
+        """
+        rule = self.compliance_rules.get("personal_data")
+        if self.pii_detector is None or not rule or not rule.get('enabled', False):
+            return None
+        
+        detection = self.pii_detector.scan(response, self.pii_detector.known_values(context))
+        if detection["verdict"] == VERDICT_LEAK:
+            leaks = [finding for finding in detection["findings"] if finding["certain"]]
+            return {
+                "rule": "personal_data",
+                "passed": False,
+                "score": 0.0,
+                "reason": "Données personnelles détectées par contrôle déterministe",
+                "issues": [f"Donnée personnelle non protégée ({finding['type']}) : {finding['value']}"
+                           for finding in leaks],
+                "severity": rule.get('severity', 'low'),
+                "detector": "deterministic"
+            }
+        return None
+    
     def check_legal_compliance(self, response: str) -> Dict[str, Any]:
         """
         Vérifie si la réponse est conforme aux exigences légales et réglementaires.
@@ -129,17 +299,7 @@ Réponse à évaluer :
         Returns:
             Résultat de la vérification
         """
-        prompt = """Vous êtes un expert juridique spécialisé dans le domaine de l'assurance santé. Votre tâche est d'évaluer si la réponse suivante est conforme aux exigences légales et réglementaires.
-
-Une réponse est considérée comme non conforme si elle :
-1. Contient des informations incorrectes sur les droits des assurés
-2. Fait des promesses de couverture ou de remboursement qui pourraient être trompeuses
-3. Omet des informations essentielles sur les limitations ou exclusions
-4. Suggère des pratiques contraires à la réglementation en vigueur
-5. Ne respecte pas les principes de la réforme 100% Santé lorsqu'elle est mentionnée
-
-Réponse à évaluer :
-"""
+        prompt = RULE_CRITERIA["legal_compliance"] + RESPONSE_HEADER
         
         return self._evaluate_rule(prompt, response, "legal_compliance")
     
@@ -153,17 +313,7 @@ Réponse à évaluer :
         Returns:
             Résultat de la vérification
         """
-        prompt = """Vous êtes un expert en communication client. Votre tâche est d'évaluer si le ton et la politesse de la réponse suivante sont appropriés pour un service client d'assurance santé.
-
-Une réponse est considérée comme inappropriée si elle :
-1. Utilise un langage familier ou irrespectueux
-2. Manque d'empathie dans des situations qui en nécessitent
-3. Est trop directive ou autoritaire
-4. Contient des formulations passives-agressives ou condescendantes
-5. N'inclut pas les formules de politesse attendues dans une communication professionnelle
-
-Réponse à évaluer :
-"""
+        prompt = RULE_CRITERIA["tone_politeness"] + RESPONSE_HEADER
         
         return self._evaluate_rule(prompt, response, "tone_politeness")
     
@@ -179,23 +329,9 @@ Réponse à évaluer :
             Résultat de la vérification
         """
         # Construction du contexte formaté
-        context_str = ""
-        for key, value in context.items():
-            if isinstance(value, dict) or isinstance(value, list):
-                context_str += f"\n--- {key} ---\n{json.dumps(value, ensure_ascii=False, indent=2)}\n"
-            else:
-                context_str += f"\n--- {key} ---\n{value}\n"
+        context_str = self.format_context(context)
         
-        prompt = """Vous êtes un expert en vérification factuelle. Votre tâche est d'évaluer si la réponse suivante est factuellement exacte par rapport au contexte fourni.
-
-Une réponse est considérée comme factuellement inexacte si elle :
-1. Contient des informations qui contredisent le contexte fourni
-2. Fait des affirmations non étayées par le contexte
-3. Déforme ou interprète incorrectement les informations du contexte
-4. Invente des détails qui ne sont pas présents dans le contexte
-
-Contexte :
-"""
+        prompt = RULE_CRITERIA["factual_accuracy"] + "\n\nContexte :\n"
         
         # Ajout du contexte au prompt
         prompt += context_str
@@ -203,6 +339,25 @@ Contexte :
         
         return self._evaluate_rule(prompt, response, "factual_accuracy")
     
+    @staticmethod
+    def format_context(context: Dict[str, Any]) -> str:
+        """
+        Formate le contexte de la conversation pour les prompts d'évaluation.
+        
+        Args:
+            context: Contexte de la conversation
+            
+        Returns:
+            Contexte formaté (une section par clé)
+        """
+        context_str = ""
+        for key, value in context.items():
+            if isinstance(value, dict) or isinstance(value, list):
+                context_str += f"\n--- {key} ---\n{json.dumps(value, ensure_ascii=False, indent=2)}\n"
+            else:
+                context_str += f"\n--- {key} ---\n{value}\n"
+        return context_str
+    
     def check_completeness(self, response: str, query: str) -> Dict[str, Any]:
         """
         Vérifie si la réponse est complète par rapport à la requête.
@@ -214,17 +369,7 @@ Contexte :
         Returns:
             Résultat de la vérification
         """
-        prompt = """Vous êtes un expert en analyse de la qualité des réponses. Votre tâche est d'évaluer si la réponse suivante est complète par rapport à la requête de l'utilisateur.
-
-Une réponse est considérée comme incomplète si elle :
-1. Ne répond pas à tous les aspects de la requête
-2. Omet des informations essentielles pour une compréhension complète
-3. Laisse des questions implicites sans réponse
-4. Est trop vague ou générale pour être utile
-5. Ne fournit pas les détails pratiques nécessaires (procédures, délais, etc.)
-
-Requête de l'utilisateur :
-"""
+        prompt = RULE_CRITERIA["completeness"] + "\n\nRequête de l'utilisateur :\n"
         
         # Ajout de la requête au prompt
         prompt += query
@@ -232,9 +377,118 @@ Requête de l'utilisateur :
         
         return self._evaluate_rule(prompt, response, "completeness")
     
+    @staticmethod
+    def _parse_json_content(content: str) -> Optional[Dict[str, Any]]:
+        """
+        Extrait l'objet JSON d'une réponse du LLM (éventuellement entouré de texte).
+        
+        Args:
+            content: Contenu de la réponse
+            
+        Returns:
+            Objet JSON, ou None si la réponse n'en contient pas
+        """
+        try:
+            # Tentative de parsing direct
+            parsed = json.loads(content)
+        except json.JSONDecodeError:
+            # Si échec, tentative d'extraction du JSON de la réponse textuelle
+            start_idx = content.find('{')
+            end_idx = content.rfind('}') + 1
+            if start_idx < 0 or end_idx <= start_idx:
+                return None
+            try:
+                parsed = json.loads(content[start_idx:end_idx])
+            except json.JSONDecodeError:
+                return None
+        return parsed if isinstance(parsed, dict) else None
+    
+    def _judge(self, client: GroqClient, messages: List[Dict[str, str]]) -> Optional[Dict[str, Any]]:
+        """
+        Demande l'évaluation d'une règle à un modèle.
+        
+        Args:
+            client: Client Groq du modèle évaluateur
+            messages: Messages d'évaluation
+            
+        Returns:
+            Évaluation extraite de la réponse, ou None si le JSON est illisible
+        """
+        api_response = client.chat_completion(messages, temperature=0.1, cache=True, coalesce=True,
+                                              timeout=self._request_timeout())
+        content = api_response['choices'][0]['message']['content']
+        return self._parse_json_content(content)
+    
+    def _is_conclusive(self, evaluation: Optional[Dict[str, Any]]) -> bool:
+        """
+        Indique si l'évaluation du petit modèle peut être retenue sans réévaluation.
+        
+        Args:
+            evaluation: Évaluation du petit modèle
+            
+        Returns:
+            True si le score est hors de la zone d'incertitude et cohérent avec le verdict
+        """
+        if evaluation is None or not isinstance(evaluation.get('passed'), bool):
+            return False
+        try:
+            score = float(evaluation.get('score'))
+        except (TypeError, ValueError):
+            return False
+        if abs(score - self.cascade_pass_threshold) < self.cascade_band:
+            return False
+        return evaluation['passed'] == (score >= self.cascade_pass_threshold)
+    
+    def _judge_cascade(self, messages: List[Dict[str, str]], rule_name: str) -> Optional[Dict[str, Any]]:
+        """
+        Évalue une règle avec le petit modèle, puis avec le modèle principal si le résultat
+        est proche du seuil, incohérent ou illisible (ou tiré pour l'audit).
+        
+        Args:
+            messages: Messages d'évaluation
+            rule_name: Nom de la règle
+            
+        Returns:
+            Évaluation retenue, ou None si le JSON est illisible
+        """
+        started_at = time.monotonic()
+        try:
+            screening = self._judge(self.small_client, messages)
+        except Exception as e:
+            logger.warning(f"Erreur du petit modèle pour la règle {rule_name}, réévaluation: {e}")
+            screening = None
+        small_latency = time.monotonic() - started_at
+        
+        conclusive = self._is_conclusive(screening)
+        audited = conclusive and random.random() < self.cascade_audit_rate
+        with self._stats_lock:
+            self.cascade_stats["screened"] += 1
+            self.cascade_stats["small_latency"] += small_latency
+        if conclusive and not audited:
+            screening["judge"] = "small"
+            return screening
+        
+        started_at = time.monotonic()
+        evaluation = self._judge(self.groq_client, messages)
+        large_latency = time.monotonic() - started_at
+        
+        comparable = (screening is not None and isinstance(screening.get('passed'), bool)
+                      and evaluation is not None and isinstance(evaluation.get('passed'), bool))
+        with self._stats_lock:
+            self.cascade_stats["audited" if audited else "escalated"] += 1
+            self.cascade_stats["large_latency"] += large_latency
+            if comparable:
+                self.cascade_stats["compared"] += 1
+                self.cascade_stats["agreements"] += int(screening['passed'] == evaluation['passed'])
+        
+        if evaluation is not None:
+            evaluation["judge"] = "large"
+            evaluation["escalated"] = not audited
+        return evaluation
+    
     def _evaluate_rule(self, prompt: str, response: str, rule_name: str) -> Dict[str, Any]:
         """
-        Évalue une règle de conformité spécifique.
+        Évalue une règle de conformité spécifique (en cascade si activée).
         
         Args:
             prompt: Prompt d'évaluation
@@ -273,37 +527,19 @@ Requête de l'utilisateur :
         ]
         
         try:
-            api_response = self.groq_client.chat_completion(messages, temperature=0.1)
-            content = api_response['choices'][0]['message']['content']
+            if self.small_client is not None:
+                evaluation = self._judge_cascade(messages, rule_name)
+            else:
+                evaluation = self._judge(self.groq_client, messages)
             
-            # Extraction du JSON de la réponse
-            try:
-                # Tentative de parsing direct
-                evaluation = json.loads(content)
-            except json.JSONDecodeError:
-                # Si échec, tentative d'extraction du JSON de la réponse textuelle
-                start_idx = content.find('{')
-                end_idx = content.rfind('}') + 1
-                
-                if start_idx >= 0 and end_idx > start_idx:
-                    json_str = content[start_idx:end_idx]
-                    try:
-                        evaluation = json.loads(json_str)
-                    except json.JSONDecodeError:
-                        logger.error(f"Impossible d'extraire le JSON de l'évaluation pour la règle {rule_name}")
-                        evaluation = {
-                            "passed": False,
-                            "score": 0.0,
-                            "reason": "Erreur d'analyse de la réponse d'évaluation",
-                            "issues": ["Format de réponse invalide"]
-                        }
-                else:
-                    evaluation = {
-                        "passed": False,
-                        "score": 0.0,
-                        "reason": "Erreur d'analyse de la réponse d'évaluation",
-                        "issues": ["Format de réponse invalide"]
-                    }
+            if evaluation is None:
+                logger.error(f"Impossible d'extraire le JSON de l'évaluation pour la règle {rule_name}")
+                evaluation = {
+                    "passed": False,
+                    "score": 0.0,
+                    "reason": "Erreur d'analyse de la réponse d'évaluation",
+                    "issues": ["Format de réponse invalide"]
+                }
             
             # Ajout des informations de la règle
             evaluation["rule"] = rule_name
@@ -320,12 +556,13 @@ Requête de l'utilisateur :
                 "score": 0.0,
                 "reason": f"Erreur technique lors de l'évaluation: {str(e)}",
                 "issues": ["Erreur technique"],
-                "severity": rule.get('severity', 'low')
+                "severity": rule.get('severity', 'low'),
+                "error": True
             }
     
-    def evaluate_response(self, response: str, query: str, context: Dict[str, Any] = None) -> Dict[str, Any]:
+    def _rule_checks(self, response: str, query: str, context: Dict[str, Any]) -> Dict[str, Callable[[], Dict[str, Any]]]:
         """
-        Évalue une réponse complète selon toutes les règles de conformité activées.
+        Liste les vérifications des règles activées.
         
         Args:
             response: Réponse à évaluer
@@ -333,30 +570,521 @@ Requête de l'utilisateur :
             context: Contexte de la conversation
             
         Returns:
-            Résultat complet de l'évaluation
+            Vérification à exécuter par nom de règle
         """
-        context = context or {}
+        checks = {
+            'medical_advice': lambda: self.check_medical_advice(response),
+            'personal_data': lambda: self.check_personal_data(response, context),
+            'legal_compliance': lambda: self.check_legal_compliance(response),
+            'tone_politeness': lambda: self.check_tone_politeness(response),
+            'factual_accuracy': lambda: self.check_factual_accuracy(response, context),
+            'completeness': lambda: self.check_completeness(response, query)
+        }
+        return {rule_name: check for rule_name, check in checks.items()
+                if self.compliance_rules.get(rule_name, {}).get('enabled', False)}
+    
+    def _timeout_result(self, rule_name: str, deadline: float) -> Dict[str, Any]:
+        """
+        Résultat d'une règle non évaluée dans le délai : échec pour les sévérités
+        bloquantes, succès signalé pour les autres.
+        
+        Args:
+            rule_name: Nom de la règle
+            deadline: Délai dépassé (secondes)
+            
+        Returns:
+            Résultat de la règle
+        """
+        severity = self.compliance_rules.get(rule_name, {}).get('severity', 'low')
+        fail_closed = severity in self.fail_closed_severities
+        logger.warning(f"Règle {rule_name} non évaluée dans le délai de {deadline:.1f}s "
+                       f"({'bloquante' if fail_closed else 'ignorée'})")
+        return {
+            "rule": rule_name,
+            "passed": not fail_closed,
+            "score": 0.0 if fail_closed else 1.0,
+            "reason": f"Évaluation non terminée dans le délai de {deadline:.1f}s",
+            "issues": ["Vérification de conformité non effectuée dans le délai"] if fail_closed else [],
+            "severity": severity,
+            "timed_out": True
+        }
+    
+    def _error_result(self, rule_name: str, error: Exception) -> Dict[str, Any]:
+        """
+        Résultat d'une règle dont l'évaluation a échoué techniquement.
+        
+        Args:
+            rule_name: Nom de la règle
+            error: Erreur rencontrée
+            
+        Returns:
+            Résultat de la règle
+        """
+        logger.error(f"Erreur lors de l'évaluation de la règle {rule_name}: {error}")
+        return {
+            "rule": rule_name,
+            "passed": False,
+            "score": 0.0,
+            "reason": f"Erreur technique lors de l'évaluation: {str(error)}",
+            "issues": ["Erreur technique"],
+            "severity": self.compliance_rules.get(rule_name, {}).get('severity', 'low'),
+            "error": True
+        }
+    
+    def _deadline_result(self, rule_name: str, result: Dict[str, Any], expires_at: float,
+                         deadline: float) -> Dict[str, Any]:
+        """
+        Traite comme un dépassement du délai l'erreur technique d'une vérification survenue
+        à son échéance (expiration du timeout de l'appel au LLM).
+        
+        Args:
+            rule_name: Nom de la règle
+            result: Résultat de la vérification
+            expires_at: Échéance de la vérification (horodatage monotone)
+            deadline: Délai global (secondes)
+            
+        Returns:
+            Résultat de la règle
+        """
+        if result.get('error') and time.monotonic() >= expires_at:
+            return self._timeout_result(rule_name, deadline)
+        return result
+    
+    def _record_outcome(self, rule_name: str, result: Dict[str, Any]) -> None:
+        """
+        Met à jour le taux d'échec d'une règle (les erreurs techniques et délais dépassés sont ignorés).
+        
+        Args:
+            rule_name: Nom de la règle
+            result: Résultat de la règle
+        """
+        if result.get('error') or result.get('timed_out') or result.get('skipped'):
+            return
+        failed = 0.0 if result.get('passed', False) else 1.0
+        with self._stats_lock:
+            stats = self.rule_stats.setdefault(rule_name, {"evaluations": 0, "failures": 0, "fail_rate": failed})
+            stats["evaluations"] += 1
+            stats["failures"] += int(failed)
+            stats["fail_rate"] += GATING_FAIL_RATE_ALPHA * (failed - stats["fail_rate"])
+    
+    def get_rule_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Retourne les statistiques d'échec par règle.
+        
+        Returns:
+            Nombre d'évaluations, d'échecs et taux d'échec lissé par règle
+        """
+        with self._stats_lock:
+            return {rule_name: dict(stats) for rule_name, stats in self.rule_stats.items()}
+    
+    def get_cascade_stats(self) -> Dict[str, Any]:
+        """
+        Retourne les statistiques de la cascade d'évaluation, pour l'ajustement du seuil et de la zone d'incertitude.
+        
+        Returns:
+            Évaluations du petit modèle, taux de réévaluation, taux d'accord entre modèles et latences moyennes
+        """
+        with self._stats_lock:
+            stats = dict(self.cascade_stats)
+        small_latency = stats.pop("small_latency")
+        large_latency = stats.pop("large_latency")
+        large_calls = stats["escalated"] + stats["audited"]
+        stats["escalation_rate"] = stats["escalated"] / stats["screened"] if stats["screened"] else 0.0
+        stats["agreement_rate"] = stats["agreements"] / stats["compared"] if stats["compared"] else None
+        stats["avg_small_latency"] = small_latency / stats["screened"] if stats["screened"] else 0.0
+        stats["avg_large_latency"] = large_latency / large_calls if large_calls else 0.0
+        return stats
+    
+    def rule_priority_order(self, rule_names: List[str]) -> List[str]:
+        """
+        Ordonne les règles pour le mode court-circuit : sévérité décroissante,
+        puis taux d'échec observé décroissant.
+        
+        Args:
+            rule_names: Règles à ordonner
+            
+        Returns:
+            Règles dans l'ordre d'évaluation
+        """
+        with self._stats_lock:
+            fail_rates = {name: self.rule_stats.get(name, {}).get('fail_rate', 0.0) for name in rule_names}
+        return sorted(rule_names, key=lambda name: (
+            SEVERITY_RANKS.get(self.compliance_rules.get(name, {}).get('severity', 'low'), len(SEVERITY_RANKS)),
+            -fail_rates[name]
+        ))
+    
+    def _skipped_result(self, rule_name: str, blocking_rule: str) -> Dict[str, Any]:
+        """
+        Résultat d'une règle non évaluée (ou interrompue) après un échec bloquant.
+        
+        Args:
+            rule_name: Nom de la règle
+            blocking_rule: Règle dont l'échec a bloqué la réponse
+            
+        Returns:
+            Résultat de la règle
+        """
+        return {
+            "rule": rule_name,
+            "passed": True,
+            "score": 1.0,
+            "reason": f"Évaluation interrompue : réponse déjà bloquée par la règle {blocking_rule}",
+            "issues": [],
+            "severity": self.compliance_rules.get(rule_name, {}).get('severity', 'low'),
+            "skipped": True
+        }
+    
+    @staticmethod
+    def _with_wait_clock(check: Callable[[], Dict[str, Any]], clock: RateLimitWaitClock,
+                         started_at: float, deadline: float) -> Dict[str, Any]:
+        """
+        Exécute une vérification en mesurant son attente auprès du limiteur de débit ;
+        ses appels au LLM reçoivent le délai restant comme timeout.
+        """
+        token = _check_expiry.set(lambda: GatingSystem._expires_at(started_at, deadline, clock))
+        try:
+            with measure_rate_limit_wait(clock):
+                return check()
+        finally:
+            _check_expiry.reset(token)
+    
+    @staticmethod
+    def _request_timeout() -> Optional[float]:
+        """
+        Délai restant pour un appel au LLM de la vérification en cours : une évaluation
+        abandonnée après l'échéance libère son thread au lieu d'attendre la réponse.
+        
+        Returns:
+            Timeout de l'appel (secondes, None hors vérification du gating)
+        """
+        expiry = _check_expiry.get()
+        if expiry is None:
+            return None
+        remaining = expiry() - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError("Délai d'évaluation du gating dépassé")
+        return remaining
+    
+    @staticmethod
+    def _expires_at(started_at: float, deadline: float, clock: RateLimitWaitClock) -> float:
+        """Échéance d'une vérification : le temps passé à attendre le limiteur n'est pas décompté du délai."""
+        return started_at + deadline + clock.elapsed()
+    
+    def _run_checks_short_circuit(self, checks: Dict[str, Callable[[], Dict[str, Any]]],
+                                  deadline: float) -> Tuple[Dict[str, Any], Dict[str, float]]:
+        """
+        Exécute les vérifications par ordre de priorité et s'arrête au premier échec
+        d'une règle de sévérité haute : les vérifications en cours sont abandonnées
+        et les suivantes ne sont pas lancées.
+        
+        Args:
+            checks: Vérification à exécuter par nom de règle
+            deadline: Délai global (secondes)
+            
+        Returns:
+            Tuple (résultat par règle, dans l'ordre des vérifications ; durée par règle)
+        """
+        started_at = time.monotonic()
+        durations: Dict[str, float] = {}
+        results: Dict[str, Any] = {}
+        pending = deque(self.rule_priority_order(list(checks)))
+        running: Dict[Any, Tuple[str, float, RateLimitWaitClock]] = {}
+        blocking_rule = None
+        
+        while (pending or running) and blocking_rule is None:
+            if time.monotonic() < started_at + deadline:
+                while pending and len(running) < self.short_circuit_parallelism:
+                    rule_name = pending.popleft()
+                    clock = RateLimitWaitClock()
+                    future = self.executor.submit(self._with_wait_clock, checks[rule_name], clock,
+                                                  started_at, deadline)
+                    running[future] = (rule_name, time.monotonic(), clock)
+            elif not running:
+                break
+            
+            now = time.monotonic()
+            for future in [f for f, (_, _, clock) in running.items()
+                           if not f.done() and self._expires_at(started_at, deadline, clock) <= now]:
+                rule_name, rule_start, _ = running.pop(future)
+                future.cancel()
+                durations[rule_name] = now - rule_start
+                results[rule_name] = self._timeout_result(rule_name, deadline)
+            if not running:
+                continue
+            
+            remaining = min(self._expires_at(started_at, deadline, clock) for _, _, clock in running.values()) - now
+            done, _ = wait(list(running), timeout=max(0.0, remaining), return_when=FIRST_COMPLETED)
+            
+            for future in done:
+                rule_name, rule_start, clock = running.pop(future)
+                durations[rule_name] = time.monotonic() - rule_start
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = self._error_result(rule_name, e)
+                result = self._deadline_result(rule_name, result, self._expires_at(started_at, deadline, clock),
+                                               deadline)
+                results[rule_name] = result
+                self._record_outcome(rule_name, result)
+                
+                if not result.get('passed', False) and result.get('severity') == 'high' and blocking_rule is None:
+                    blocking_rule = rule_name
+        
+        if blocking_rule is not None:
+            logger.info(f"Gating court-circuité par la règle {blocking_rule}: "
+                        f"{len(running) + len(pending)} règle(s) non évaluée(s)")
+        
+        for future, (rule_name, rule_start, _) in running.items():
+            future.cancel()
+            durations[rule_name] = time.monotonic() - rule_start
+            results[rule_name] = (self._skipped_result(rule_name, blocking_rule) if blocking_rule
+                                  else self._timeout_result(rule_name, deadline))
+        for rule_name in pending:
+            results[rule_name] = (self._skipped_result(rule_name, blocking_rule) if blocking_rule
+                                  else self._timeout_result(rule_name, deadline))
+        
+        return {rule_name: results[rule_name] for rule_name in checks}, durations
+    
+    def _run_checks(self, checks: Dict[str, Callable[[], Dict[str, Any]]],
+                    deadline: float) -> Tuple[Dict[str, Any], Dict[str, float]]:
+        """
+        Exécute les vérifications en parallèle dans le délai global.
+        
+        Args:
+            checks: Vérification à exécuter par nom de règle
+            deadline: Délai global (secondes)
+            
+        Returns:
+            Tuple (résultat par règle, dans l'ordre des vérifications ; durée par règle)
+        """
+        started_at = time.monotonic()
+        # Durées propres à cet appel, renseignées uniquement ici : une vérification abandonnée
+        # qui se termine après l'échéance ne les modifie plus
+        durations: Dict[str, float] = {}
+        clocks = {rule_name: RateLimitWaitClock() for rule_name in checks}
+        
+        def _timed(rule_name: str, check: Callable[[], Dict[str, Any]]) -> Tuple[Dict[str, Any], float]:
+            rule_start = time.monotonic()
+            try:
+                result = self._with_wait_clock(check, clocks[rule_name], started_at, deadline)
+            except Exception as e:
+                result = self._error_result(rule_name, e)
+            return result, time.monotonic() - rule_start
+        
+        pending = {rule_name: self.executor.submit(_timed, rule_name, check) for rule_name, check in checks.items()}
         results = {}
+        while True:
+            for rule_name in [name for name, future in pending.items() if future.done()]:
+                result, durations[rule_name] = pending.pop(rule_name).result()
+                results[rule_name] = self._deadline_result(
+                    rule_name, result, self._expires_at(started_at, deadline, clocks[rule_name]), deadline)
+                self._record_outcome(rule_name, results[rule_name])
+            
+            now = time.monotonic()
+            expires = {name: self._expires_at(started_at, deadline, clocks[name]) for name in pending}
+            for rule_name in [name for name in pending if expires[name] <= now]:
+                # Une vérification en cours n'est pas interrompue : son appel au LLM expire de lui-même
+                pending.pop(rule_name).cancel()
+                results[rule_name] = self._timeout_result(rule_name, deadline)
+                durations[rule_name] = now - started_at
+            if not pending:
+                break
+            
+            wait(list(pending.values()), timeout=min(expires[name] for name in pending) - now,
+                 return_when=FIRST_COMPLETED)
         
-        # Évaluation de chaque règle activée
-        if self.compliance_rules.get('medical_advice', {}).get('enabled', False):
-            results['medical_advice'] = self.check_medical_advice(response)
+        return {rule_name: results[rule_name] for rule_name in checks}, durations
+    
+    def _evaluate_rules_batched(self, rule_names: List[str], response: str, query: str,
+                                context: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Évalue plusieurs règles en un seul appel au LLM.
         
-        if self.compliance_rules.get('personal_data', {}).get('enabled', False):
-            results['personal_data'] = self.check_personal_data(response)
+        Args:
+            rule_names: Règles à évaluer
+            response: Réponse à évaluer
+            query: Requête utilisateur
+            context: Contexte de la conversation
+            
+        Returns:
+            Résultat par règle, pour les seules règles correctement évaluées
+        """
+        prompt = BATCH_PROMPT_HEADER
+        for rule_name in rule_names:
+            prompt += f"\n\n### Règle {rule_name}\n{RULE_CRITERIA[rule_name]}"
+        if 'factual_accuracy' in rule_names:
+            prompt += "\n\nContexte :\n" + self.format_context(context)
+        if 'completeness' in rule_names:
+            prompt += "\n\nRequête de l'utilisateur :\n" + query
+        prompt += RESPONSE_HEADER + response + BATCH_PROMPT_FOOTER.format(rules=", ".join(rule_names))
         
-        if self.compliance_rules.get('legal_compliance', {}).get('enabled', False):
-            results['legal_compliance'] = self.check_legal_compliance(response)
+        logger.info(f"Évaluation groupée de {len(rule_names)} règles: ~{estimate_tokens(prompt)} tokens de prompt")
         
-        if self.compliance_rules.get('tone_politeness', {}).get('enabled', False):
-            results['tone_politeness'] = self.check_tone_politeness(response)
+        try:
+            api_response = self.groq_client.chat_completion([{"role": "system", "content": prompt}],
+                                                            temperature=0.1, max_tokens=GATING_BATCH_MAX_TOKENS,
+                                                            cache=True, coalesce=True,
+                                                            timeout=self._request_timeout())
+            parsed = self._parse_json_content(api_response['choices'][0]['message']['content'])
+        except Exception as e:
+            logger.error(f"Erreur lors de l'évaluation groupée des règles: {e}")
+            return {}
         
-        if self.compliance_rules.get('factual_accuracy', {}).get('enabled', False):
-            results['factual_accuracy'] = self.check_factual_accuracy(response, context)
+        if parsed is None:
+            logger.error("Impossible d'extraire le JSON de l'évaluation groupée")
+            return {}
         
-        if self.compliance_rules.get('completeness', {}).get('enabled', False):
-            results['completeness'] = self.check_completeness(response, query)
+        results = {}
+        for rule_name in rule_names:
+            evaluation = parsed.get(rule_name)
+            if not isinstance(evaluation, dict) or not isinstance(evaluation.get('passed'), bool):
+                continue
+            try:
+                score = float(evaluation.get('score', 1.0 if evaluation['passed'] else 0.0))
+            except (TypeError, ValueError):
+                continue
+            issues = evaluation.get('issues', [])
+            results[rule_name] = {
+                "rule": rule_name,
+                "passed": evaluation['passed'],
+                "score": score,
+                "reason": evaluation.get('reason', ''),
+                "issues": issues if isinstance(issues, list) else [str(issues)],
+                "severity": self.compliance_rules.get(rule_name, {}).get('severity', 'low')
+            }
+        return results
+    
+    def _run_checks_batched(self, checks: Dict[str, Callable[[], Dict[str, Any]]], response: str, query: str,
+                            context: Dict[str, Any], deadline: float,
+                            short_circuit: bool) -> Tuple[Dict[str, Any], Dict[str, float], List[str]]:
+        """
+        Évalue les règles en un seul appel au LLM, puis règle par règle celles dont
+        le résultat groupé est absent ou illisible.
+        
+        Args:
+            checks: Vérification à exécuter par nom de règle (repli)
+            response: Réponse à évaluer
+            query: Requête utilisateur
+            context: Contexte de la conversation
+            deadline: Délai global (secondes)
+            short_circuit: Si True, le repli s'arrête au premier échec bloquant
+            
+        Returns:
+            Tuple (résultat par règle, durée par règle, règles évaluées individuellement en repli)
+        """
+        started_at = time.monotonic()
+        results: Dict[str, Any] = {}
+        durations: Dict[str, float] = {}
+        remaining = dict(checks)
+        
+        # Les fuites certaines de données personnelles sont tranchées sans LLM
+        if 'personal_data' in remaining:
+            prefiltered = self._prefilter_personal_data(response, context)
+            if prefiltered is not None:
+                results['personal_data'] = prefiltered
+                durations['personal_data'] = 0.0
+                del remaining['personal_data']
+        
+        batch: Dict[str, Any] = {}
+        clock = RateLimitWaitClock()
+        if remaining:
+            rule_names = list(remaining)
+            future = self.executor.submit(
+                self._with_wait_clock,
+                lambda: self._evaluate_rules_batched(rule_names, response, query, context),
+                clock, started_at, deadline
+            )
+            while not future.done():
+                timeout = self._expires_at(started_at, deadline, clock) - time.monotonic()
+                if timeout <= 0:
+                    break
+                wait([future], timeout=timeout)
+            if future.done():
+                batch = future.result()
+            else:
+                future.cancel()
+                for rule_name in remaining:
+                    results[rule_name] = self._timeout_result(rule_name, deadline)
+                    durations[rule_name] = time.monotonic() - started_at
+                remaining = {}
+        
+        batch_duration = time.monotonic() - started_at
+        for rule_name, result in batch.items():
+            results[rule_name] = result
+            durations[rule_name] = batch_duration
+            self._record_outcome(rule_name, result)
+        
+        fallback = [rule_name for rule_name in remaining if rule_name not in batch]
+        if fallback:
+            logger.warning(f"Évaluation groupée incomplète, repli règle par règle: {fallback}")
+            fallback_checks = {rule_name: remaining[rule_name] for rule_name in fallback}
+            fallback_deadline = max(0.0, deadline - batch_duration + clock.elapsed())
+            if short_circuit:
+                fallback_results, fallback_durations = self._run_checks_short_circuit(fallback_checks, fallback_deadline)
+            else:
+                fallback_results, fallback_durations = self._run_checks(fallback_checks, fallback_deadline)
+            results.update(fallback_results)
+            durations.update(fallback_durations)
+        
+        return {rule_name: results[rule_name] for rule_name in checks}, durations, fallback
+    
+    def evaluate_response(self, response: str, query: str, context: Dict[str, Any] = None,
+                          deadline: Optional[float] = None,
+                          short_circuit: Optional[bool] = None,
+                          batched: Optional[bool] = None) -> Dict[str, Any]:
+        """
+        Évalue une réponse complète selon toutes les règles de conformité activées.
+        Les règles sont évaluées en parallèle (ou en un seul appel en mode groupé) : la durée
+        du gating est celle de la règle la plus lente, bornée par le délai global.
+        
+        Args:
+            response: Réponse à évaluer
+            query: Requête utilisateur
+            context: Contexte de la conversation
+            deadline: Délai global d'évaluation (secondes, délai du système si non spécifié)
+            short_circuit: Si True, arrêt au premier échec bloquant (mode du système si non spécifié)
+            batched: Si True, évaluation groupée en un seul appel (mode du système si non spécifié)
+            
+        Returns:
+            Résultat complet de l'évaluation
+        """
+        context = context or {}
+        deadline = self.deadline if deadline is None else deadline
+        short_circuit = self.short_circuit if short_circuit is None else short_circuit
+        batched = self.batched if batched is None else batched
+        started_at = time.monotonic()
+        fallback: List[str] = []
+        
+        # Évaluation de chaque règle activée
+        checks = self._rule_checks(response, query, context)
+        if batched:
+            results, durations, fallback = self._run_checks_batched(checks, response, query, context,
+                                                                    deadline, short_circuit)
+        elif short_circuit:
+            results, durations = self._run_checks_short_circuit(checks, deadline)
+        else:
+            results, durations = self._run_checks(checks, deadline)
+        
+        evaluation = self._aggregate_results(results)
+        evaluation["mode"] = "batched" if batched else ("short_circuit" if short_circuit else "concurrent")
+        evaluation["batch_fallback_rules"] = fallback
+        evaluation["rule_durations"] = durations
+        evaluation["timed_out_rules"] = [name for name, result in results.items() if result.get('timed_out')]
+        evaluation["skipped_rules"] = [name for name, result in results.items() if result.get('skipped')]
+        evaluation["gating_time"] = time.monotonic() - started_at
+        return evaluation
+    
+    @staticmethod
+    def _aggregate_results(results: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Calcule le résultat global à partir des résultats par règle.
         
+        Args:
+            results: Résultat par règle
+            
+        Returns:
+            Résultat global (succès, score pondéré, problèmes par sévérité, résultats par règle)
+        """
         # Calcul du résultat global
         passed = True
         high_severity_issues = []
@@ -381,6 +1109,9 @@ Requête de l'utilisateur :
         weighted_score = 0
         
         for rule_name, result in results.items():
+            if result.get('skipped') or (result.get('timed_out') and result.get('passed')):
+                # Règle non évaluée (interrompue, ou non bloquante hors délai) : exclue du score
+                continue
             severity = result.get('severity', 'low')
             score = result.get('score', 0.0)
             
@@ -7,11 +7,22 @@ Ce module fournit les fonctions nécessaires pour interagir avec les modèles LL
 """
 
 import os
-import json
 import requests
+import threading
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Any, Optional
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
+from .rate_limiting import (
+    GroqRateLimiter, get_groq_rate_limiter, estimate_request_tokens, parse_retry_after,
+    RETRYABLE_STATUS_CODES, GROQ_MAX_RETRIES
+)
+from .llm_cache import LLMResponseCache, get_llm_response_cache, canonical_request_key
+from .request_coalescing import SingleFlight, get_request_coalescer
+from .embeddings import EmbeddingBackend, get_default_embedding_backend
+from .sse_parser import SSEStreamParser, StreamMetrics, CompletionStream, summarize_stream_metrics
 
 # Chargement des variables d'environnement
 load_dotenv('../docker/.env')
@@ -20,20 +31,190 @@ load_dotenv('../docker/.env')
 GROQ_API_KEY = os.getenv('GROQ_API_KEY', 'your_groq_api_key_here')
 GROQ_API_BASE = "https://api.groq.com/openai/v1"
 GROQ_MODEL = "llama3-70b-8192"  # Modèle par défaut
+GROQ_EMBEDDING_MODEL = os.getenv('GROQ_EMBEDDING_MODEL', 'embed-english-v3.0')  # Backend d'embedding 'groq'
+
+# Configuration du transport HTTP partagé (pool de connexions keep-alive)
+GROQ_POOL_CONNECTIONS = int(os.getenv('GROQ_POOL_CONNECTIONS', '4'))
+GROQ_POOL_MAXSIZE = int(os.getenv('GROQ_POOL_MAXSIZE', '32'))
+GROQ_CONNECT_TIMEOUT = float(os.getenv('GROQ_CONNECT_TIMEOUT', '5'))
+GROQ_READ_TIMEOUT = float(os.getenv('GROQ_READ_TIMEOUT', '60'))
+GROQ_WARM_UP_CONNECTIONS = int(os.getenv('GROQ_WARM_UP_CONNECTIONS', '2'))  # Connexions ouvertes au démarrage (0 = aucune)
+
+class GroqTransport:
+    """
+    Transport HTTP partagé pour les appels à l'API Groq.
+    Maintient un pool de connexions keep-alive afin d'éviter une poignée de main
+    TCP+TLS à chaque appel LLM.
+    """
+    
+    def __init__(self,
+                 pool_connections: int = GROQ_POOL_CONNECTIONS,
+                 pool_maxsize: int = GROQ_POOL_MAXSIZE,
+                 connect_timeout: float = GROQ_CONNECT_TIMEOUT,
+                 read_timeout: float = GROQ_READ_TIMEOUT):
+        """
+        Initialise le transport HTTP.
+        
+        Args:
+            pool_connections: Nombre de pools d'hôtes conservés
+            pool_maxsize: Nombre maximum de connexions conservées par hôte
+            connect_timeout: Timeout d'établissement de connexion (secondes)
+            read_timeout: Timeout de lecture (secondes)
+        """
+        self.pool_maxsize = pool_maxsize
+        self.timeout = (connect_timeout, read_timeout)
+        self.warmed_up = False
+        
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_connections,
+                              pool_maxsize=pool_maxsize,
+                              pool_block=True)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+    
+    def post(self, url: str, headers: Dict[str, str], payload: Dict[str, Any],
+             stream: bool = False, timeout: Optional[float] = None) -> requests.Response:
+        """
+        Envoie une requête POST via le pool de connexions.
+        
+        Args:
+            url: URL de la requête
+            headers: En-têtes HTTP
+            payload: Corps JSON de la requête
+            stream: Si True, le corps de la réponse est lu au fil de l'eau
+            timeout: Timeout de la requête (secondes), borne les timeouts de connexion et de lecture du transport
+            
+        Returns:
+            Réponse HTTP
+        """
+        request_timeout = self.timeout
+        if timeout is not None:
+            request_timeout = (min(self.timeout[0], timeout), min(self.timeout[1], timeout))
+        return self.session.post(url, headers=headers, json=payload,
+                                 timeout=request_timeout, stream=stream)
+    
+    def warm_up(self, headers: Dict[str, str], connections: int = 1) -> int:
+        """
+        Ouvre des connexions à l'avance pour que les premiers appels LLM
+        ne paient pas le coût de la poignée de main.
+        
+        Args:
+            headers: En-têtes HTTP (authentification)
+            connections: Nombre de connexions à ouvrir en parallèle
+            
+        Returns:
+            Nombre de connexions ouvertes avec succès
+        """
+        connections = max(1, min(connections, self.pool_maxsize))
+        url = f"{GROQ_API_BASE}/models"
+        
+        def _open(_):
+            try:
+                response = self.session.get(url, headers=headers, timeout=self.timeout)
+                response.close()
+                return True
+            except requests.exceptions.RequestException as e:
+                print(f"Erreur lors du préchauffage de la connexion Groq: {e}")
+                return False
+        
+        with ThreadPoolExecutor(max_workers=connections) as executor:
+            return sum(executor.map(_open, range(connections)))
+    
+    def close(self) -> None:
+        """Ferme toutes les connexions du pool."""
+        self.session.close()
+
+_shared_transport: Optional[GroqTransport] = None
+_shared_transport_lock = threading.Lock()
+
+def get_groq_transport() -> GroqTransport:
+    """
+    Retourne le transport HTTP partagé par tous les clients Groq du processus.
+    
+    Returns:
+        Transport HTTP partagé
+    """
+    global _shared_transport
+    if _shared_transport is None:
+        with _shared_transport_lock:
+            if _shared_transport is None:
+                _shared_transport = GroqTransport()
+    return _shared_transport
+
+def configure_groq_transport(**kwargs) -> GroqTransport:
+    """
+    Remplace le transport HTTP partagé (taille du pool, timeouts).
+    
+    Args:
+        **kwargs: Paramètres transmis à GroqTransport
+        
+    Returns:
+        Nouveau transport HTTP partagé
+    """
+    global _shared_transport
+    with _shared_transport_lock:
+        previous = _shared_transport
+        _shared_transport = GroqTransport(**kwargs)
+    if previous is not None:
+        previous.close()
+    return _shared_transport
+
+def warm_up_groq_transport(api_key: Optional[str] = None,
+                           connections: int = GROQ_WARM_UP_CONNECTIONS,
+                           client: Optional["GroqClient"] = None) -> int:
+    """
+    Préchauffe le transport HTTP d'un client au démarrage de l'application
+    (une seule fois par transport : les appels suivants sont sans effet).
+    
+    Args:
+        api_key: Clé API Groq (utilise la variable d'environnement si non spécifiée)
+        connections: Nombre de connexions à ouvrir (0 pour ne pas préchauffer)
+        client: Client dont le transport est préchauffé (client du transport partagé si non spécifié)
+        
+    Returns:
+        Nombre de connexions ouvertes avec succès
+    """
+    if connections <= 0:
+        return 0
+    client = client or GroqClient(api_key=api_key)
+    with _shared_transport_lock:
+        if client.transport.warmed_up:
+            return 0
+        client.transport.warmed_up = True
+    return client.warm_up(connections)
 
 class GroqClient:
     """Client pour interagir avec l'API Groq."""
     
-    def __init__(self, api_key: Optional[str] = None, model: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, model: Optional[str] = None,
+                 transport: Optional[GroqTransport] = None,
+                 rate_limiter: Optional[GroqRateLimiter] = None,
+                 max_retries: int = GROQ_MAX_RETRIES,
+                 response_cache: Optional[LLMResponseCache] = None,
+                 coalescer: Optional[SingleFlight] = None,
+                 embedding_backend: Optional[EmbeddingBackend] = None):
         """
         Initialise le client Groq.
         
         Args:
             api_key: Clé API Groq (utilise la variable d'environnement si non spécifiée)
             model: Modèle Groq à utiliser (utilise le modèle par défaut si non spécifié)
+            transport: Transport HTTP (utilise le transport partagé du processus si non spécifié)
+            rate_limiter: Limiteur de débit (utilise le limiteur partagé du processus si non spécifié)
+            max_retries: Nombre maximum de nouvelles tentatives sur 429/5xx
+            response_cache: Cache des réponses (utilise le cache partagé du processus si non spécifié)
+            coalescer: Regroupeur des requêtes identiques (utilise celui du processus si non spécifié)
+            embedding_backend: Backend d'embedding (selon EMBEDDING_BACKEND si non spécifié)
         """
         self.api_key = api_key or GROQ_API_KEY
         self.model = model or GROQ_MODEL
+        self.transport = transport or get_groq_transport()
+        self.rate_limiter = rate_limiter or get_groq_rate_limiter()
+        self.max_retries = max_retries
+        self.response_cache = response_cache or get_llm_response_cache()
+        self.coalescer = coalescer or get_request_coalescer()
+        self.stream_metrics_history = deque(maxlen=100)
+        self.embedding_backend = embedding_backend or get_default_embedding_backend(self)
         
         if not self.api_key or self.api_key == 'your_groq_api_key_here':
             raise ValueError("Clé API Groq non configurée. Veuillez définir la variable d'environnement GROQ_API_KEY.")
@@ -43,11 +224,26 @@ class GroqClient:
             "Content-Type": "application/json"
         }
     
+    def warm_up(self, connections: int = 1) -> int:
+        """
+        Ouvre des connexions vers l'API Groq avant le premier appel.
+        
+        Args:
+            connections: Nombre de connexions à ouvrir
+            
+        Returns:
+            Nombre de connexions ouvertes avec succès
+        """
+        return self.transport.warm_up(self.headers, connections)
+    
     def chat_completion(self, 
                         messages: List[Dict[str, str]], 
                         temperature: float = 0.7, 
                         max_tokens: int = 1024,
-                        stream: bool = False) -> Dict[str, Any]:
+                        stream: bool = False,
+                        cache: bool = False,
+                        coalesce: bool = False,
+                        timeout: Optional[float] = None) -> Dict[str, Any]:
         """
         Envoie une requête de complétion de chat à l'API Groq.
         
@@ -56,6 +252,55 @@ class GroqClient:
             temperature: Température pour le sampling (0.0 à 1.0)
             max_tokens: Nombre maximum de tokens à générer
             stream: Si True, retourne une réponse en streaming
+            cache: Si True, réutilise une réponse identique déjà obtenue
+                (réservé aux appels déterministes ; ignoré en mode streaming)
+            coalesce: Si True, les appels identiques simultanés partagent une seule requête
+                (les appelants regroupés reçoivent le résultat ou l'erreur du premier ; ignoré en mode streaming)
+            timeout: Durée maximale de l'appel hors attente du limiteur de débit, nouvelles tentatives
+                et attente d'une requête regroupée comprises (secondes, timeouts du transport si non spécifiée)
+            
+        Returns:
+            Réponse de l'API Groq
+        """
+        coalesce = coalesce and not stream
+        request_key = None
+        if cache or coalesce:
+            request_key = canonical_request_key(self.model, messages, temperature, max_tokens)
+        
+        if cache and not stream:
+            cached_response = self.response_cache.get(request_key)
+            if cached_response is not None:
+                return cached_response
+        
+        def _request():
+            return self._request_completion(messages, temperature, max_tokens, stream,
+                                            request_key if cache else None, timeout)
+        
+        if not coalesce:
+            return _request()
+        try:
+            return self.coalescer.do(request_key, _request, timeout=timeout)
+        except TimeoutError as e:
+            # Même erreur que l'expiration d'un appel non regroupé
+            raise requests.exceptions.Timeout(str(e)) from e
+    
+    def _request_completion(self,
+                            messages: List[Dict[str, str]],
+                            temperature: float,
+                            max_tokens: int,
+                            stream: bool,
+                            cache_key: Optional[str],
+                            timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Effectue l'appel de complétion en amont.
+        
+        Args:
+            messages: Liste des messages de la conversation
+            temperature: Température pour le sampling (0.0 à 1.0)
+            max_tokens: Nombre maximum de tokens à générer
+            stream: Si True, retourne une réponse en streaming
+            cache_key: Clé sous laquelle enregistrer la réponse (aucun cache si None)
+            timeout: Durée maximale de l'appel hors attente du limiteur de débit (secondes)
             
         Returns:
             Réponse de l'API Groq
@@ -70,14 +315,32 @@ class GroqClient:
             "stream": stream
         }
         
+        reserved_tokens = estimate_request_tokens(messages, max_tokens)
+        started_at = time.monotonic()
+        
         try:
-            response = requests.post(url, headers=self.headers, json=payload)
-            response.raise_for_status()
+            response = self._post_with_retries(url, payload, reserved_tokens, stream=stream, timeout=timeout)
             
             if stream:
-                return self._process_stream(response)
-            else:
-                return response.json()
+                try:
+                    return self._process_stream(response, reserved_tokens, started_at)
+                except BaseException:
+                    response.close()
+                    self.rate_limiter.release(response.status_code, tokens_reserved=reserved_tokens)
+                    raise
+            
+            tokens_used = None
+            try:
+                result = response.json()
+                tokens_used = result.get('usage', {}).get('total_tokens')
+            finally:
+                self.rate_limiter.release(response.status_code,
+                                          tokens_reserved=reserved_tokens,
+                                          tokens_used=tokens_used)
+            
+            if cache_key is not None:
+                self.response_cache.set(cache_key, result)
+            return result
         
         except requests.exceptions.RequestException as e:
             print(f"Erreur lors de la requête à l'API Groq: {e}")
@@ -85,32 +348,126 @@ class GroqClient:
                 print(f"Détails de l'erreur: {e.response.text}")
             raise
     
-    def _process_stream(self, response):
+    def _post_with_retries(self, url: str, payload: Dict[str, Any], reserved_tokens: int,
+                           stream: bool = False, timeout: Optional[float] = None) -> requests.Response:
+        """
+        Envoie une requête en respectant le limiteur de débit partagé.
+        Les réponses 429/5xx et les erreurs de connexion sont retentées avec un
+        backoff exponentiel (jitter complet) ; Retry-After est respecté par le limiteur.
+        
+        En cas de succès, le créneau du limiteur reste réservé : l'appelant doit
+        appeler rate_limiter.release() une fois la réponse consommée.
+        
+        Args:
+            url: URL de la requête
+            payload: Corps JSON de la requête
+            reserved_tokens: Nombre de tokens estimé pour la requête
+            stream: Si True, le corps de la réponse est lu au fil de l'eau
+            timeout: Durée maximale des tentatives et des pauses entre tentatives, hors attente
+                du limiteur de débit (secondes, timeouts du transport si non spécifiée)
+            
+        Returns:
+            Réponse HTTP réussie
+        """
+        attempt = 0
+        # Budget restant de l'appel : seul le temps passé hors du limiteur est décompté
+        remaining = timeout
+        
+        while True:
+            if remaining is not None and remaining <= 0:
+                raise requests.exceptions.Timeout(f"Délai de {timeout:.1f}s dépassé pour l'appel à l'API Groq")
+            
+            self.rate_limiter.acquire(reserved_tokens)
+            attempt_started_at = time.monotonic()
+            
+            try:
+                response = self.transport.post(url, self.headers, payload, stream=stream, timeout=remaining)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                self.rate_limiter.release(tokens_reserved=reserved_tokens, tokens_used=0)
+                if attempt >= self.max_retries:
+                    raise
+                remaining = self._retry_pause(attempt, attempt_started_at, remaining)
+                attempt += 1
+                continue
+            
+            if response.status_code < 400:
+                return response
+            
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            self.rate_limiter.release(response.status_code, retry_after=retry_after,
+                                      tokens_reserved=reserved_tokens, tokens_used=0)
+            
+            if response.status_code in RETRYABLE_STATUS_CODES and attempt < self.max_retries:
+                response.close()
+                remaining = self._retry_pause(attempt, attempt_started_at, remaining)
+                attempt += 1
+                continue
+            
+            response.raise_for_status()
+    
+    def _retry_pause(self, attempt: int, attempt_started_at: float, remaining: Optional[float]) -> Optional[float]:
+        """
+        Attend avant une nouvelle tentative, sans dépasser le budget restant de l'appel.
+        
+        Args:
+            attempt: Numéro de la tentative échouée
+            attempt_started_at: Horodatage monotone du début de la tentative (après le limiteur)
+            remaining: Budget restant avant la tentative (secondes, None si illimité)
+            
+        Returns:
+            Budget restant après la pause (None si illimité)
+        """
+        delay = self.rate_limiter.retry_delay(attempt)
+        if remaining is None:
+            time.sleep(delay)
+            return None
+        remaining -= time.monotonic() - attempt_started_at
+        time.sleep(max(0.0, min(delay, remaining)))
+        return remaining - delay
+    
+    def _process_stream(self, response, reserved_tokens: int = 0,
+                        started_at: Optional[float] = None) -> CompletionStream:
         """
         Traite une réponse en streaming de l'API Groq.
         
         Args:
             response: Réponse de l'API en streaming
+            reserved_tokens: Nombre de tokens réservé auprès du limiteur de débit
+            started_at: Horodatage monotone de l'envoi de la requête
             
         Returns:
-            Générateur de chunks de réponse
-        """
-        for line in response.iter_lines():
-            if line:
-                line = line.decode('utf-8')
-                if line.startswith('data: '):
-                    data = line[6:]  # Supprime le préfixe 'data: '
-                    if data == '[DONE]':
-                        break
-                    try:
-                        chunk = json.loads(data)
-                        yield chunk
-                    except json.JSONDecodeError:
-                        print(f"Erreur de décodage JSON: {data}")
+            Itérateur de chunks de réponse (avec ses mesures de latence), à consommer
+            entièrement ou à fermer avec close() pour libérer la connexion
+        """
+        parser = SSEStreamParser(StreamMetrics(started_at))
+        
+        def _chunks():
+            # Lecture des octets bruts au fil de leur arrivée
+            for data in response.iter_content(chunk_size=None):
+                yield from parser.feed(data)
+                if parser.done:
+                    break
+        
+        def _release():
+            # Restitution de la connexion au pool et du créneau du limiteur
+            response.close()
+            self.rate_limiter.release(response.status_code, tokens_reserved=reserved_tokens)
+            self.stream_metrics_history.append(parser.metrics.to_dict())
+        
+        return CompletionStream(_chunks(), parser.metrics, on_close=_release)
+    
+    def get_stream_latency_stats(self) -> Dict[str, Any]:
+        """
+        Retourne les latences des dernières réponses en streaming.
+        
+        Returns:
+            Nombre de streams mesurés, TTFT médian et p95, latence inter-tokens moyenne
+        """
+        return summarize_stream_metrics(self.stream_metrics_history)
     
     def get_embedding(self, text: str) -> List[float]:
         """
-        Obtient l'embedding d'un texte via l'API Groq.
+        Obtient l'embedding d'un texte via le backend d'embedding configuré.
         
         Args:
             text: Texte à encoder
@@ -118,19 +475,49 @@ class GroqClient:
         Returns:
             Vecteur d'embedding
         """
+        return self.embedding_backend.get_embedding(text)
+    
+    def get_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """
+        Obtient les embeddings d'un lot de textes via le backend d'embedding configuré.
+        
+        Args:
+            texts: Textes à encoder
+            
+        Returns:
+            Vecteurs d'embedding, dans l'ordre des textes
+        """
+        return self.embedding_backend.get_embeddings(texts)
+    
+    def request_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """
+        Obtient les embeddings d'un lot de textes via l'API Groq (un seul appel).
+        
+        Args:
+            texts: Textes à encoder
+            
+        Returns:
+            Vecteurs d'embedding, dans l'ordre des textes
+        """
         url = f"{GROQ_API_BASE}/embeddings"
         
         payload = {
-            "model": "embed-english-v3.0",  # Modèle d'embedding de Groq
-            "input": text
+            "model": GROQ_EMBEDDING_MODEL,
+            "input": texts
         }
         
+        reserved_tokens = sum(len(text) for text in texts) // 4
+        
         try:
-            response = requests.post(url, headers=self.headers, json=payload)
-            response.raise_for_status()
+            response = self._post_with_retries(url, payload, reserved_tokens)
+            
+            try:
+                result = response.json()
+            finally:
+                self.rate_limiter.release(response.status_code, tokens_reserved=reserved_tokens)
             
-            result = response.json()
-            return result["data"][0]["embedding"]
+            data = sorted(result["data"], key=lambda item: item.get("index", 0))
+            return [item["embedding"] for item in data]
         
         except requests.exceptions.RequestException as e:
             print(f"Erreur lors de la requête d'embedding à l'API Groq: {e}")
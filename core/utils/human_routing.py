@@ -298,7 +298,7 @@ Fournissez votre analyse au format JSON :
         ]
         
         try:
-            api_response = self.groq_client.chat_completion(messages, temperature=0.1)
+            api_response = self.groq_client.chat_completion(messages, temperature=0.1, cache=True)
             content = api_response['choices'][0]['message']['content']
             
             # Extraction du JSON de la réponse
@@ -397,7 +397,7 @@ Déterminez le service spécialiste le plus approprié et fournissez votre analy
         ]
         
         try:
-            api_response = self.groq_client.chat_completion(messages, temperature=0.2)
+            api_response = self.groq_client.chat_completion(messages, temperature=0.2, cache=True)
             content = api_response['choices'][0]['message']['content']
             
             # Extraction du JSON de la réponse
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Module de classification d'intention par embeddings pour le POC de chatbot IA AssurSanté.
+Chaque intention est représentée par le centroïde des embeddings de messages exemples ;
+un message est classé par similarité cosinus avec une matrice de centroïdes stockée sur
+disque et chargée en mémoire partagée (memory-map).
+"""
+
+import os
+import json
+import hashlib
+import logging
+import threading
+import numpy as np
+from typing import Dict, List, Any, Optional, Tuple
+from .embeddings import EmbeddingBackend, get_default_embedding_backend
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Configuration du classifieur
+INTENT_CENTROIDS_PATH = os.getenv(
+    'INTENT_CENTROIDS_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models', 'intent_centroids.npy')
+)
+INTENT_EMBEDDING_THRESHOLD = float(os.getenv('INTENT_EMBEDDING_THRESHOLD', '0.35'))
+
+# Messages exemples par intention (catégories de PromptTemplates.get_intent_specific_prompts)
+INTENT_EXAMPLES = {
+    "remboursement": [
+        "Quand vais-je être remboursé de ma consultation chez le dermatologue ?",
+        "Je n'ai toujours rien reçu pour mes lunettes achetées le mois dernier.",
+        "Combien la mutuelle me rend-elle sur une couronne dentaire ?",
+        "Mon décompte indique un montant plus faible que prévu pour mes séances de kiné.",
+        "J'ai envoyé mes justificatifs d'ostéopathe, où en est le versement ?",
+        "Quel est le taux de prise en charge des dépassements d'honoraires ?",
+        "L'argent de mes soins n'est pas encore arrivé sur mon compte.",
+        "Est-ce que mes médicaments non remboursés par la Sécu sont couverts ?"
+    ],
+    "reclamation": [
+        "Je ne suis pas du tout satisfait de la façon dont mon dossier a été traité.",
+        "Cela fait trois fois que j'appelle et personne ne me répond, c'est inadmissible.",
+        "Je conteste le refus de remboursement que vous m'avez envoyé.",
+        "Vous vous êtes trompés dans le calcul de ma cotisation.",
+        "Je souhaite faire une plainte contre votre service client.",
+        "On m'a prélevé deux fois ce mois-ci, je veux une explication.",
+        "Mon dossier est bloqué depuis des semaines sans aucune nouvelle.",
+        "Je veux saisir le médiateur au sujet de mon litige."
+    ],
+    "contrat": [
+        "Qu'est-ce qui est couvert par ma formule actuelle ?",
+        "Quelles sont les garanties optique de mon niveau Confort ?",
+        "Est-ce que mon contrat inclut la médecine douce ?",
+        "Pouvez-vous me rappeler les plafonds annuels de mon offre ?",
+        "Mes enfants sont-ils bien assurés avec ma couverture ?",
+        "Y a-t-il un délai de carence sur les soins dentaires ?",
+        "Quelle est la différence entre le niveau Standard et le niveau Premium ?",
+        "Je voudrais recevoir le tableau de mes garanties."
+    ],
+    "resiliation": [
+        "Je veux quitter votre mutuelle à la fin du mois.",
+        "Comment mettre un terme à mon adhésion ?",
+        "Mon employeur me propose une mutuelle obligatoire, je dois arrêter la vôtre.",
+        "Je déménage à l'étranger et souhaite clôturer mon contrat.",
+        "Quel est le préavis pour ne plus être assuré chez vous ?",
+        "Je ne veux plus payer de cotisation, stoppez mon abonnement.",
+        "Puis-je résilier à tout moment après un an d'adhésion ?",
+        "Envoyez-moi la procédure pour partir chez un autre assureur."
+    ],
+    "modification": [
+        "Je souhaite passer au niveau de garantie supérieur.",
+        "Je voudrais ajouter mon conjoint comme bénéficiaire.",
+        "Mon adresse a changé, pouvez-vous la mettre à jour ?",
+        "Je veux changer le RIB utilisé pour les prélèvements.",
+        "Est-il possible de baisser ma formule pour payer moins cher ?",
+        "Mon bébé vient de naître, comment l'ajouter à mon contrat ?",
+        "Je souhaite passer d'un prélèvement mensuel à un paiement annuel.",
+        "Retirez mon fils de mon contrat, il a maintenant sa propre mutuelle."
+    ],
+    "prise_en_charge": [
+        "Je vais être hospitalisé la semaine prochaine, que dois-je faire ?",
+        "Pouvez-vous envoyer un accord à la clinique pour mon opération ?",
+        "J'ai besoin d'une attestation pour ne pas avancer les frais d'hôpital.",
+        "Mon hospitalisation en ambulatoire peut-elle être prise en charge directement ?",
+        "La clinique me demande un document de votre part avant mon entrée.",
+        "Comment obtenir le tiers payant pour mon séjour à l'hôpital ?",
+        "Je dois être opéré du genou, faut-il faire une demande préalable ?",
+        "Ma fille entre en maternité le mois prochain, que faut-il envoyer ?"
+    ]
+}
+
+class EmbeddingIntentClassifier:
+    """
+    Classifieur d'intention par similarité cosinus avec des centroïdes d'embeddings.
+    La matrice des centroïdes (une ligne normalisée par intention) est calculée une fois,
+    enregistrée au format .npy puis chargée en memory-map aux démarrages suivants.
+    """
+
+    def __init__(self, embedding_backend: Optional[EmbeddingBackend] = None,
+                 examples: Optional[Dict[str, List[str]]] = None,
+                 centroids_path: str = INTENT_CENTROIDS_PATH,
+                 threshold: float = INTENT_EMBEDDING_THRESHOLD):
+        """
+        Initialise le classifieur (les centroïdes sont chargés au premier appel).
+
+        Args:
+            embedding_backend: Backend d'embedding (backend par défaut si non spécifié)
+            examples: Messages exemples par intention (INTENT_EXAMPLES si non spécifiés)
+            centroids_path: Fichier .npy des centroïdes
+            threshold: Similarité minimale pour retenir une intention
+        """
+        self.embedding_backend = embedding_backend or get_default_embedding_backend()
+        self.examples = examples or INTENT_EXAMPLES
+        self.centroids_path = centroids_path
+        self.threshold = threshold
+        self.intents = list(self.examples)
+        self._centroids: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+
+    @property
+    def metadata_path(self) -> str:
+        return os.path.splitext(self.centroids_path)[0] + '.json'
+
+    def _fingerprint(self) -> str:
+        """Empreinte du modèle d'embedding et des exemples (invalide les centroïdes obsolètes)."""
+        model = getattr(self.embedding_backend, 'model_name', type(self.embedding_backend).__name__)
+        payload = json.dumps({"model": model, "examples": self.examples}, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        """Encode des textes en une matrice de vecteurs normalisés (une ligne par texte)."""
+        vectors = np.asarray(self.embedding_backend.get_embeddings(texts), dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def build_centroids(self) -> np.ndarray:
+        """
+        Calcule la matrice des centroïdes à partir des messages exemples.
+
+        Returns:
+            Matrice (nombre d'intentions x dimension) de centroïdes normalisés
+        """
+        texts = [text for intent in self.intents for text in self.examples[intent]]
+        vectors = self._embed(texts)
+
+        centroids = []
+        offset = 0
+        for intent in self.intents:
+            count = len(self.examples[intent])
+            centroid = vectors[offset:offset + count].mean(axis=0)
+            centroids.append(centroid / max(np.linalg.norm(centroid), 1e-12))
+            offset += count
+
+        return np.vstack(centroids).astype(np.float32)
+
+    def save_centroids(self, centroids: np.ndarray) -> None:
+        """
+        Enregistre les centroïdes et leurs métadonnées (écriture atomique).
+
+        Args:
+            centroids: Matrice des centroïdes
+        """
+        os.makedirs(os.path.dirname(self.centroids_path) or '.', exist_ok=True)
+
+        tmp_path = self.centroids_path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.save(f, centroids)
+        os.replace(tmp_path, self.centroids_path)
+
+        with open(self.metadata_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump({"intents": self.intents, "fingerprint": self._fingerprint()}, f, ensure_ascii=False)
+        os.replace(self.metadata_path + '.tmp', self.metadata_path)
+
+    def _load_centroids(self) -> Optional[np.ndarray]:
+        """Charge les centroïdes enregistrés en memory-map s'ils correspondent à la configuration."""
+        try:
+            with open(self.metadata_path, 'r', encoding='utf-8') as f:
+                metadata = json.load(f)
+            if metadata.get("fingerprint") != self._fingerprint() or metadata.get("intents") != self.intents:
+                logger.info("Centroïdes d'intention obsolètes, recalcul nécessaire")
+                return None
+            return np.load(self.centroids_path, mmap_mode='r')
+        except (OSError, ValueError) as e:
+            logger.info(f"Centroïdes d'intention indisponibles ({e}), recalcul nécessaire")
+            return None
+
+    @property
+    def centroids(self) -> np.ndarray:
+        """Matrice des centroïdes (chargée ou calculée au premier accès)."""
+        if self._centroids is None:
+            with self._lock:
+                if self._centroids is None:
+                    centroids = self._load_centroids()
+                    if centroids is None:
+                        centroids = self.build_centroids()
+                        try:
+                            self.save_centroids(centroids)
+                        except OSError as e:
+                            logger.warning(f"Impossible d'enregistrer les centroïdes d'intention: {e}")
+                    self._centroids = centroids
+        return self._centroids
+
+    def scores(self, text: str) -> Dict[str, float]:
+        """
+        Calcule la similarité d'un message avec chaque intention.
+
+        Args:
+            text: Message à analyser
+
+        Returns:
+            Similarité cosinus par intention
+        """
+        similarities = self.centroids @ self._embed([text])[0]
+        return {intent: float(score) for intent, score in zip(self.intents, similarities)}
+
+    def classify(self, text: str) -> Tuple[str, float]:
+        """
+        Détecte l'intention d'un message.
+
+        Args:
+            text: Message à analyser
+
+        Returns:
+            Tuple contenant l'intention détectée et le score de confiance
+        """
+        return self.classify_batch([text])[0]
+
+    def classify_batch(self, texts: List[str]) -> List[Tuple[str, float]]:
+        """
+        Détecte l'intention d'un lot de messages (un seul produit matriciel).
+
+        Args:
+            texts: Messages à analyser
+
+        Returns:
+            Liste de tuples (intention, score), dans l'ordre des messages
+        """
+        if not texts:
+            return []
+
+        similarities = self._embed(list(texts)) @ np.asarray(self.centroids).T
+        best = similarities.argmax(axis=1)
+        best_scores = similarities[np.arange(len(texts)), best]
+
+        return [
+            (self.intents[index], float(score)) if score >= self.threshold else ("general", 0.0)
+            for index, score in zip(best, best_scores)
+        ]
+
+# Exemple d'utilisation
+def example_usage():
+    """Exemple d'utilisation du classifieur d'intention par embeddings."""
+    classifier = EmbeddingIntentClassifier()
+
+    messages = [
+        "Je n'ai pas touché l'argent pour mes lunettes",
+        "Je pars chez un concurrent, comment faire ?",
+        "Je me fais opérer le mois prochain, la clinique attend un papier",
+        "Bonjour"
+    ]
+
+    for message, (intent, score) in zip(messages, classifier.classify_batch(messages)):
+        print(f"{message} -> {intent} ({score:.2f})")
+
+if __name__ == "__main__":
+    example_usage()
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Module de détection d'intention par mots-clés pour le POC de chatbot IA AssurSanté.
+Les mots-clés, normalisés une seule fois, sont recherchés comme sous-chaînes d'un texte
+normalisé (sans accents ni majuscules), comme dans l'implémentation d'origine.
+"""
+
+import re
+import time
+import random
+import unicodedata
+from typing import Dict, List, Tuple, Optional, Set
+
+# Intentions possibles avec leurs mots-clés associés
+INTENT_KEYWORDS = {
+    "remboursement": ["remboursement", "rembourser", "remboursé", "prise en charge", "frais", "dépense", "facture"],
+    "reclamation": ["réclamation", "plainte", "problème", "erreur", "insatisfaction", "contester"],
+    "contrat": ["contrat", "garantie", "couverture", "niveau", "option", "formule", "souscription"],
+    "resiliation": ["résiliation", "résilier", "annuler", "annulation", "mettre fin", "arrêter"]
+}
+
+# Score minimal en dessous duquel l'intention générale est retenue
+INTENT_THRESHOLD = 0.2
+
+_COMBINING_MARKS = re.compile(r'[\u0300-\u036f]')
+_SEPARATOR = '\x00'
+_NOTHING_FOUND: frozenset = frozenset()
+
+def normalize_text(text: str) -> str:
+    """
+    Normalise un texte pour la recherche de mots-clés (minuscules, sans accents).
+
+    Args:
+        text: Texte à normaliser
+
+    Returns:
+        Texte normalisé
+    """
+    text = text.lower()
+    if text.isascii():
+        return text
+    return _COMBINING_MARKS.sub('', unicodedata.normalize('NFKD', text))
+
+class IntentMatcher:
+    """
+    Détecteur d'intention insensible aux accents et à la casse : les mots-clés sont
+    recherchés comme sous-chaînes ("remboursé" trouve "remboursée", "option" trouve
+    "optionnelles"), et le résultat est mémorisé par ensemble de mots-clés trouvés.
+    """
+
+    def __init__(self, intents: Optional[Dict[str, List[str]]] = None,
+                 threshold: float = INTENT_THRESHOLD):
+        """
+        Initialise le détecteur et normalise ses mots-clés.
+
+        Args:
+            intents: Mots-clés par intention (ceux de INTENT_KEYWORDS si non spécifiés)
+            threshold: Score minimal pour retenir une intention
+        """
+        intents = intents or INTENT_KEYWORDS
+        self.threshold = threshold
+        self.intents = list(intents)
+
+        # Le score reste rapporté au nombre de mots-clés déclarés, comme auparavant
+        self._sizes = {intent: len(keywords) for intent, keywords in intents.items()}
+        self._keyword_intents: Dict[str, Set[str]] = {}
+        for intent, keywords in intents.items():
+            for keyword in keywords:
+                self._keyword_intents.setdefault(normalize_text(keyword), set()).add(intent)
+        self._keywords = tuple(self._keyword_intents)
+
+        # Résultat mémorisé par ensemble de mots-clés trouvés
+        self._results: Dict[frozenset, Tuple[str, float]] = {}
+
+    def _found_keywords(self, normalized: str) -> frozenset:
+        found = [keyword for keyword in self._keywords if keyword in normalized]
+        return frozenset(found) if found else _NOTHING_FOUND
+
+    def _scores_from_keywords(self, found: Set[str]) -> Dict[str, float]:
+        counts = dict.fromkeys(self.intents, 0)
+        for keyword in found:
+            for intent in self._keyword_intents[keyword]:
+                counts[intent] += 1
+        return {intent: counts[intent] / self._sizes[intent] if counts[intent] > 0 else 0
+                for intent in self.intents}
+
+    def _select(self, found: frozenset) -> Tuple[str, float]:
+        result = self._results.get(found)
+        if result is None:
+            best = max(self._scores_from_keywords(found).items(), key=lambda x: x[1])
+            result = ("general", 0.0) if best[1] < self.threshold else best
+            if len(self._results) >= 4096:
+                self._results.clear()
+            self._results[found] = result
+        return result
+
+    def scores(self, text: str) -> Dict[str, float]:
+        """
+        Calcule le score de chaque intention pour un texte.
+
+        Args:
+            text: Texte à analyser
+
+        Returns:
+            Score par intention (part des mots-clés de l'intention présents)
+        """
+        return self._scores_from_keywords(self._found_keywords(normalize_text(text)))
+
+    def match(self, text: str) -> Tuple[str, float]:
+        """
+        Détecte l'intention d'un texte.
+
+        Args:
+            text: Texte à analyser
+
+        Returns:
+            Tuple contenant l'intention détectée et le score de confiance
+        """
+        return self._select(self._found_keywords(normalize_text(text)))
+
+    def match_batch(self, texts: List[str]) -> List[Tuple[str, float]]:
+        """
+        Détecte l'intention d'un lot de textes, normalisés en une seule fois.
+
+        Args:
+            texts: Textes à analyser
+
+        Returns:
+            Liste de tuples (intention, score), dans l'ordre des textes
+        """
+        if not texts:
+            return []
+
+        normalized = normalize_text(_SEPARATOR.join(t.replace(_SEPARATOR, ' ') for t in texts))
+        found_keywords = self._found_keywords
+        select = self._select
+        return [select(found_keywords(text)) for text in normalized.split(_SEPARATOR)]
+
+# Détecteur partagé (compilé une seule fois)
+default_intent_matcher = IntentMatcher()
+
+def _legacy_detect_intent(user_message: str) -> Tuple[str, float]:
+    """Implémentation d'origine de ChatbotOrchestrator.detect_intent (référence du benchmark)."""
+    intents = {
+        "remboursement": ["remboursement", "rembourser", "remboursé", "prise en charge", "frais", "dépense", "facture"],
+        "reclamation": ["réclamation", "plainte", "problème", "erreur", "insatisfaction", "contester"],
+        "contrat": ["contrat", "garantie", "couverture", "niveau", "option", "formule", "souscription"],
+        "resiliation": ["résiliation", "résilier", "annuler", "annulation", "mettre fin", "arrêter"]
+    }
+    scores = {}
+    user_message_lower = user_message.lower()
+    for intent, keywords in intents.items():
+        score = 0
+        for keyword in keywords:
+            if keyword in user_message_lower:
+                score += 1
+        scores[intent] = score / len(keywords) if score > 0 else 0
+    max_intent = max(scores.items(), key=lambda x: x[1])
+    if max_intent[1] < 0.2:
+        return "general", 0.0
+    return max_intent
+
+def benchmark_intent_matcher(n_messages: int = 20000, seed: int = 42, repeat: int = 5) -> Dict[str, float]:
+    """
+    Compare le détecteur compilé à l'implémentation d'origine sur des messages synthétiques.
+
+    Args:
+        n_messages: Nombre de messages à classifier
+        seed: Graine aléatoire
+        repeat: Nombre de mesures par implémentation (la plus rapide est retenue)
+
+    Returns:
+        Durées (secondes) et débits (messages/s) de chaque implémentation
+    """
+    rng = random.Random(seed)
+    fragments = [
+        "Bonjour, je voudrais savoir", "quand serai-je remboursé de ma facture d'optique",
+        "j'ai un problème avec ma réclamation", "je souhaite résilier mon contrat",
+        "quelle est la garantie de mon niveau de couverture", "merci de mettre fin à ma formule",
+        "la prise en charge de mes frais dentaires", "je conteste cette erreur",
+        "pouvez-vous m'aider", "mon enfant vient de naître", "cordialement", "RESILIATION URGENTE"
+    ]
+    messages = [" ".join(rng.choice(fragments) for _ in range(rng.randint(1, 4))) for _ in range(n_messages)]
+
+    def best_time(run):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = run()
+            timings.append(time.perf_counter() - start)
+        return result, min(timings)
+
+    legacy, legacy_time = best_time(lambda: [_legacy_detect_intent(message) for message in messages])
+
+    matcher = IntentMatcher()
+    single, single_time = best_time(lambda: [matcher.match(message) for message in messages])
+    batch, batch_time = best_time(lambda: matcher.match_batch(messages))
+
+    assert single == batch
+    differences = sum(1 for a, b in zip(legacy, batch) if a != b)
+
+    return {
+        "messages": n_messages,
+        "legacy_time": legacy_time,
+        "compiled_time": single_time,
+        "batch_time": batch_time,
+        "legacy_throughput": n_messages / legacy_time,
+        "compiled_throughput": n_messages / single_time,
+        "batch_throughput": n_messages / batch_time,
+        # Écarts dus à l'insensibilité aux accents et à la casse
+        "differences_with_legacy": differences
+    }
+
+if __name__ == "__main__":
+    results = benchmark_intent_matcher()
+    print(f"Messages classifiés : {results['messages']}")
+    print(f"Implémentation d'origine : {results['legacy_time']:.3f}s ({results['legacy_throughput']:.0f} msg/s)")
+    print(f"Détecteur compilé        : {results['compiled_time']:.3f}s ({results['compiled_throughput']:.0f} msg/s)")
+    print(f"Détecteur compilé (lot)  : {results['batch_time']:.3f}s ({results['batch_throughput']:.0f} msg/s)")
+    print(f"Classifications différentes (accents/casse) : {results['differences_with_legacy']}")
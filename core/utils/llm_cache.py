@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Module de cache des réponses LLM pour le POC de chatbot IA AssurSanté.
+Ce module met en cache les réponses déterministes (appels d'évaluation à basse température)
+dans un cache LRU en mémoire et, optionnellement, dans Redis avec expiration.
+"""
+
+import os
+import copy
+import json
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Configuration du cache
+LLM_CACHE_MAX_ENTRIES = int(os.getenv('LLM_CACHE_MAX_ENTRIES', '1024'))
+LLM_CACHE_TTL = int(os.getenv('LLM_CACHE_TTL', '3600'))
+LLM_CACHE_REDIS_ENABLED = os.getenv('LLM_CACHE_REDIS_ENABLED', 'false').lower() == 'true'
+REDIS_HOST = os.getenv('REDIS_HOST', 'redis')
+REDIS_PASSWORD = os.getenv('REDIS_PASSWORD', 'redis_password_123')
+
+def canonical_request_key(model: str,
+                          messages: List[Dict[str, str]],
+                          temperature: float,
+                          max_tokens: int) -> str:
+    """
+    Calcule la clé canonique d'une requête de complétion.
+
+    Args:
+        model: Modèle Groq
+        messages: Messages de la requête
+        temperature: Température de sampling
+        max_tokens: Nombre maximum de tokens à générer
+
+    Returns:
+        Empreinte SHA-256 de la requête
+    """
+    canonical = json.dumps(
+        {
+            "model": model,
+            "messages": [{"role": m.get("role"), "content": m.get("content")} for m in messages],
+            "temperature": round(float(temperature), 4),
+            "max_tokens": int(max_tokens)
+        },
+        ensure_ascii=False, sort_keys=True, separators=(',', ':')
+    )
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+class LRUCache:
+    """Cache LRU borné et thread-safe."""
+
+    def __init__(self, max_entries: int = LLM_CACHE_MAX_ENTRIES):
+        """
+        Initialise le cache LRU.
+
+        Args:
+            max_entries: Nombre maximum d'entrées conservées
+        """
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class RedisCacheTier:
+    """Niveau de cache partagé dans Redis, avec expiration."""
+
+    def __init__(self, redis_client: Any, ttl: int = LLM_CACHE_TTL, prefix: str = "llm_cache:"):
+        """
+        Initialise le niveau Redis.
+
+        Args:
+            redis_client: Client Redis
+            ttl: Durée de vie des entrées (secondes)
+            prefix: Préfixe des clés Redis
+        """
+        self.redis_client = redis_client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[Any]:
+        try:
+            value = self.redis_client.get(self.prefix + key)
+            return json.loads(value) if value else None
+        except Exception as e:
+            logger.warning(f"Erreur de lecture du cache Redis: {e}")
+            return None
+
+    def set(self, key: str, value: Any) -> None:
+        try:
+            self.redis_client.setex(self.prefix + key, self.ttl, json.dumps(value, ensure_ascii=False))
+        except Exception as e:
+            logger.warning(f"Erreur d'écriture du cache Redis: {e}")
+
+def create_redis_tier(ttl: int = LLM_CACHE_TTL) -> Optional[RedisCacheTier]:
+    """
+    Crée le niveau Redis à partir de la configuration d'environnement.
+
+    Args:
+        ttl: Durée de vie des entrées (secondes)
+
+    Returns:
+        Niveau Redis, ou None si Redis est indisponible
+    """
+    try:
+        import redis
+        client = redis.Redis(host=REDIS_HOST, port=6379, password=REDIS_PASSWORD,
+                             decode_responses=True, socket_timeout=0.5)
+        client.ping()
+        return RedisCacheTier(client, ttl=ttl)
+    except Exception as e:
+        logger.warning(f"Cache Redis indisponible, utilisation du cache mémoire seul: {e}")
+        return None
+
+class LLMResponseCache:
+    """
+    Cache à deux niveaux des réponses de complétion : LRU en mémoire puis Redis (optionnel).
+    """
+
+    def __init__(self, max_entries: int = LLM_CACHE_MAX_ENTRIES,
+                 redis_tier: Optional[RedisCacheTier] = None):
+        """
+        Initialise le cache des réponses.
+
+        Args:
+            max_entries: Nombre maximum d'entrées du cache mémoire
+            redis_tier: Niveau Redis (aucun si non spécifié)
+        """
+        self.memory = LRUCache(max_entries)
+        self.redis_tier = redis_tier
+        self._stats_lock = threading.Lock()
+        self.stats = {
+            "memory_hits": 0,
+            "redis_hits": 0,
+            "misses": 0,
+            "stores": 0
+        }
+
+    def _count(self, name: str) -> None:
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Recherche une réponse dans le cache.
+
+        Args:
+            key: Clé canonique de la requête
+
+        Returns:
+            Copie de la réponse en cache, ou None
+        """
+        value = self.memory.get(key)
+        if value is not None:
+            self._count("memory_hits")
+            return copy.deepcopy(value)
+
+        if self.redis_tier is not None:
+            value = self.redis_tier.get(key)
+            if value is not None:
+                self._count("redis_hits")
+                self.memory.set(key, value)
+                return copy.deepcopy(value)
+
+        self._count("misses")
+        return None
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        """
+        Enregistre une réponse dans le cache.
+
+        Args:
+            key: Clé canonique de la requête
+            value: Réponse de l'API
+        """
+        value = copy.deepcopy(value)
+        self.memory.set(key, value)
+        if self.redis_tier is not None:
+            self.redis_tier.set(key, value)
+        self._count("stores")
+
+    def clear(self) -> None:
+        """Vide le cache mémoire."""
+        self.memory.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Retourne les statistiques du cache.
+
+        Returns:
+            Compteurs de hits/misses, taux de hit et taille du cache mémoire
+        """
+        with self._stats_lock:
+            stats = dict(self.stats)
+        lookups = stats["memory_hits"] + stats["redis_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["memory_hits"] + stats["redis_hits"]) / lookups if lookups else 0.0
+        stats["memory_entries"] = len(self.memory)
+        return stats
+
+_shared_cache: Optional[LLMResponseCache] = None
+_shared_cache_lock = threading.Lock()
+
+def get_llm_response_cache() -> LLMResponseCache:
+    """
+    Retourne le cache des réponses partagé par tous les clients Groq du processus.
+
+    Returns:
+        Cache des réponses partagé
+    """
+    global _shared_cache
+    if _shared_cache is None:
+        with _shared_cache_lock:
+            if _shared_cache is None:
+                redis_tier = create_redis_tier() if LLM_CACHE_REDIS_ENABLED else None
+                _shared_cache = LLMResponseCache(redis_tier=redis_tier)
+    return _shared_cache
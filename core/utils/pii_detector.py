@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Module de détection déterministe des données personnelles pour le POC de chatbot IA AssurSanté.
+Les numéros de sécurité sociale (NIR, avec contrôle de la clé), IBAN (contrôle modulo 97),
+numéros de téléphone français et adresses email sont repérés par expressions régulières
+compilées, avant l'appel au LLM de vérification : seules les fuites certaines évitent cet appel.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import random
+from typing import Dict, List, Any, Optional, Set
+
+# Valeurs publiques autorisées dans les réponses (numéro et email du service client...)
+PII_ALLOWLIST = [value for value in os.getenv('PII_ALLOWLIST', '').split(',') if value.strip()]
+
+# Verdicts du détecteur
+VERDICT_LEAK = "leak"        # Donnée personnelle certaine : la réponse est bloquée sans appel au LLM
+VERDICT_SUSPECT = "suspect"  # Cas ambigu : la décision revient au LLM
+VERDICT_CLEAN = "clean"      # Aucune donnée personnelle repérée par les expressions régulières (le LLM reste consulté)
+
+# Champs du contexte contenant des données personnelles du client
+PERSONAL_CONTEXT_FIELDS = {"email", "telephone", "numero_securite_sociale", "iban"}
+
+_NIR_PATTERN = re.compile(
+    r'(?<![\dA-Za-z])([1-478])\s?(\d{2})\s?(\d{2})\s?(\d{2}|2[AB])\s?(\d{3})\s?(\d{3})(?:\s?(\d{2}))?(?![\dA-Za-z])',
+    re.IGNORECASE
+)
+_IBAN_PATTERN = re.compile(r'(?<![A-Z0-9])[A-Z]{2}\d{2}(?:\s?[A-Z0-9]{4}){2,7}(?:\s?[A-Z0-9]{1,3})?(?![A-Z0-9])')
+_PHONE_PATTERN = re.compile(r'(?<![\d+])(?:(?:\+|00)33\s?(?:\(0\)\s?)?|0)[1-9](?:[\s.-]?\d{2}){4}(?!\d)')
+_EMAIL_PATTERN = re.compile(r'[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}')
+# Identifiant long partiellement masqué ("1 85 04 XX XXX XXX 12") : la qualité du masquage est jugée par le LLM
+_MASKED_ID_PATTERN = re.compile(r'(?<![\w*])(?=[\dXx*\s]*\d)(?=[\dXx*\s]*[Xx*])[\dXx*](?:\s?[\dXx*]){12,}(?![\w*])')
+_NON_ALNUM = re.compile(r'[^0-9A-Za-z]')
+
+def nir_key_valid(nir: str) -> bool:
+    """
+    Vérifie la clé d'un numéro de sécurité sociale (97 - NIR modulo 97).
+
+    Args:
+        nir: NIR de 15 caractères (13 caractères et la clé), espaces éventuels compris
+
+    Returns:
+        True si la clé est valide
+    """
+    nir = _NON_ALNUM.sub('', nir).upper()
+    if len(nir) != 15:
+        return False
+    # Corse : 2A et 2B sont remplacés par 19 et 18 pour le calcul
+    number = nir[:13].replace('2A', '19', 1).replace('2B', '18', 1)
+    if not number.isdigit() or not nir[13:].isdigit():
+        return False
+    return 97 - int(number) % 97 == int(nir[13:])
+
+def iban_valid(iban: str) -> bool:
+    """
+    Vérifie la clé de contrôle d'un IBAN (ISO 13616, modulo 97).
+
+    Args:
+        iban: IBAN, espaces éventuels compris
+
+    Returns:
+        True si la clé de contrôle est valide
+    """
+    iban = _NON_ALNUM.sub('', iban).upper()
+    if not 15 <= len(iban) <= 34:
+        return False
+    rearranged = iban[4:] + iban[:4]
+    return int(''.join(str(int(char, 36)) for char in rearranged)) % 97 == 1
+
+def canonical_value(kind: str, value: str) -> str:
+    """
+    Forme canonique d'une donnée personnelle, pour la comparaison avec les données connues.
+
+    Args:
+        kind: Type de donnée ("nir", "iban", "phone", "email")
+        value: Valeur trouvée
+
+    Returns:
+        Valeur canonique
+    """
+    if kind == "email":
+        return value.strip().lower()
+    compact = _NON_ALNUM.sub('', value).upper()
+    if kind == "phone":
+        # Formats national et international ramenés au format national
+        return '0' + compact[-9:]
+    if kind == "nir":
+        return compact[:13]
+    return compact
+
+class PIIDetector:
+    """
+    Détecteur déterministe des données personnelles dans une réponse.
+    Une donnée est certaine lorsqu'elle passe son contrôle de clé (NIR, IBAN) ou
+    correspond à une donnée personnelle du client ; les autres correspondances
+    (téléphone, email, identifiant masqué ou clé invalide) sont ambiguës.
+    """
+
+    def __init__(self, allowlist: Optional[List[str]] = None):
+        """
+        Initialise le détecteur.
+
+        Args:
+            allowlist: Valeurs publiques autorisées (PII_ALLOWLIST si non spécifiées)
+        """
+        allowlist = PII_ALLOWLIST if allowlist is None else allowlist
+        self._allowed = {canonical_value("email" if '@' in value else "phone", value) for value in allowlist}
+
+    @staticmethod
+    def known_values(context: Optional[Dict[str, Any]]) -> Set[str]:
+        """
+        Extrait les données personnelles du client présentes dans le contexte.
+
+        Args:
+            context: Contexte de la conversation
+
+        Returns:
+            Formes canoniques des données personnelles connues
+        """
+        values: Set[str] = set()
+        kinds = {"email": "email", "telephone": "phone", "numero_securite_sociale": "nir", "iban": "iban"}
+
+        def _collect(node: Any) -> None:
+            if isinstance(node, dict):
+                for key, value in node.items():
+                    if key in PERSONAL_CONTEXT_FIELDS and isinstance(value, str) and value:
+                        values.add(canonical_value(kinds[key], value))
+                    else:
+                        _collect(value)
+            elif isinstance(node, list):
+                for item in node:
+                    _collect(item)
+
+        _collect(context or {})
+        return values
+
+    def scan(self, text: str, known_values: Optional[Set[str]] = None) -> Dict[str, Any]:
+        """
+        Recherche les données personnelles d'un texte.
+
+        Args:
+            text: Texte à analyser
+            known_values: Données personnelles connues du client (known_values())
+
+        Returns:
+            Verdict ("leak", "suspect" ou "clean") et données trouvées
+        """
+        known_values = known_values or set()
+        findings = []
+
+        def _add(kind: str, value: str, certain: bool) -> None:
+            canonical = canonical_value(kind, value)
+            if canonical in self._allowed:
+                return
+            findings.append({"type": kind, "value": value, "certain": certain or canonical in known_values})
+
+        for match in _NIR_PATTERN.finditer(text):
+            month = int(match.group(3))
+            if month == 0 or 13 <= month <= 19:
+                continue
+            _add("nir", match.group(0), match.group(7) is not None and nir_key_valid(match.group(0)))
+        for match in _IBAN_PATTERN.finditer(text):
+            _add("iban", match.group(0), iban_valid(match.group(0)))
+        for match in _PHONE_PATTERN.finditer(text):
+            _add("phone", match.group(0), False)
+        for match in _EMAIL_PATTERN.finditer(text):
+            _add("email", match.group(0), False)
+        for match in _MASKED_ID_PATTERN.finditer(text):
+            findings.append({"type": "masked_id", "value": match.group(0), "certain": False})
+
+        if any(finding["certain"] for finding in findings):
+            verdict = VERDICT_LEAK
+        elif findings:
+            verdict = VERDICT_SUSPECT
+        else:
+            verdict = VERDICT_CLEAN
+        return {"verdict": verdict, "findings": findings}
+
+# Détecteur partagé (expressions compilées une seule fois)
+default_pii_detector = PIIDetector()
+
+def make_fr_iban(rng: random.Random) -> str:
+    """
+    Génère un IBAN français syntaxiquement valide (clé de contrôle correcte).
+
+    Args:
+        rng: Générateur aléatoire
+
+    Returns:
+        IBAN au format imprimé (groupes de 4 caractères)
+    """
+    bban = ''.join(rng.choice('0123456789') for _ in range(23))
+    check = 98 - int(''.join(str(int(char, 36)) for char in bban + 'FR00')) % 97
+    iban = f"FR{check:02d}{bban}"
+    return ' '.join(iban[i:i + 4] for i in range(0, len(iban), 4))
+
+# Données des clients synthétiques du benchmark
+_BENCHMARK_FIRST_NAMES = ["Jean", "Marie", "Pierre", "Sophie", "Luc", "Camille", "Nicolas", "Julie", "Thomas", "Claire"]
+_BENCHMARK_LAST_NAMES = ["Martin", "Bernard", "Dubois", "Thomas", "Robert", "Richard", "Petit", "Durand", "Leroy", "Moreau"]
+_BENCHMARK_CONTRACTS = ["Essentiel", "Confort", "Premium", "Famille"]
+
+def make_benchmark_client(rng: random.Random) -> Dict[str, Any]:
+    """
+    Génère un profil client synthétique (NIR à clé valide, email et téléphone français).
+
+    Args:
+        rng: Générateur aléatoire
+
+    Returns:
+        Profil client
+    """
+    prenom = rng.choice(_BENCHMARK_FIRST_NAMES)
+    nom = rng.choice(_BENCHMARK_LAST_NAMES)
+    number = (f"{rng.choice('12')}{rng.randint(40, 99):02d}{rng.randint(1, 12):02d}"
+              f"{rng.randint(1, 95):02d}{rng.randint(1, 999):03d}{rng.randint(1, 999):03d}")
+    nir = f"{number}{97 - int(number) % 97:02d}"
+    phone = "0" + str(rng.choice([1, 2, 3, 4, 5, 6, 7, 9])) + "".join(f"{rng.randint(0, 99):02d}" for _ in range(4))
+    return {
+        "nom": nom,
+        "prenom": prenom,
+        "email": f"{prenom.lower()}.{nom.lower()}{rng.randint(1, 999)}@example.fr",
+        "telephone": " ".join(phone[i:i + 2] for i in range(0, 10, 2)),
+        "numero_securite_sociale": f"{nir[0]} {nir[1:3]} {nir[3:5]} {nir[5:7]} {nir[7:10]} {nir[10:13]} {nir[13:]}",
+        "contrats": [{"type_contrat": rng.choice(_BENCHMARK_CONTRACTS)}]
+    }
+
+def load_benchmark_clients(n_clients: int, clients_path: Optional[str] = None,
+                           seed: int = 42) -> List[Dict[str, Any]]:
+    """
+    Charge les clients synthétiques du benchmark : fichier JSON produit par
+    data/generate_clients.py, ou génération reproductible avec make_benchmark_client().
+
+    Args:
+        n_clients: Nombre de clients à générer (sans fichier)
+        clients_path: Fichier clients_data.json (optionnel)
+        seed: Graine aléatoire de la génération
+
+    Returns:
+        Profils clients
+    """
+    if clients_path:
+        with open(clients_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    rng = random.Random(seed)
+    return [make_benchmark_client(rng) for _ in range(n_clients)]
+
+def build_benchmark_corpus(clients: List[Dict[str, Any]], responses_per_client: int = 20,
+                           seed: int = 42) -> List[Dict[str, Any]]:
+    """
+    Construit un corpus de réponses synthétiques, avec ou sans données personnelles.
+
+    Args:
+        clients: Profils clients
+        responses_per_client: Nombre de réponses par client
+        seed: Graine aléatoire
+
+    Returns:
+        Réponses avec leur contexte et la donnée personnelle insérée (None pour une réponse sans donnée)
+    """
+    rng = random.Random(seed)
+    clean_templates = [
+        "Bonjour {prenom} {nom}, votre remboursement de consultation a été effectué sous 48h.",
+        "Madame, Monsieur, votre contrat {contrat} couvre les frais d'optique à hauteur de 150%.",
+        "Bonjour {prenom}, nous avons bien reçu votre demande d'ajout de bénéficiaire. Elle sera traitée sous 5 jours ouvrés.",
+        "Votre réclamation est en cours d'examen par notre service. Nous revenons vers vous rapidement. Cordialement, AssurSanté",
+        "Le forfait hospitalier est pris en charge intégralement pour les contrats de niveau Confort et supérieurs.",
+        # Numéro public du service client : cas ambigu transmis au LLM (sauf s'il figure dans PII_ALLOWLIST)
+        "Pour toute question, notre service client est joignable au 09 69 32 10 10 du lundi au vendredi."
+    ]
+    leak_templates = [
+        ("nir", "Bonjour {prenom}, d'après votre numéro de sécurité sociale {value}, votre dossier est complet."),
+        ("email", "Nous vous avons envoyé le décompte à l'adresse {value}. Cordialement, AssurSanté"),
+        ("phone", "Un conseiller vous rappellera au {value} dans la journée."),
+        ("iban", "Le remboursement sera versé sur le compte {value} sous 3 jours.")
+    ]
+
+    corpus = []
+    for client in clients:
+        context = {"client": client}
+        contrat = (client.get('contrats') or [{}])[0].get('type_contrat', 'Santé')
+        for _ in range(responses_per_client):
+            if rng.random() < 0.8:
+                text = rng.choice(clean_templates).format(prenom=client.get('prenom', ''), nom=client.get('nom', ''),
+                                                          contrat=contrat)
+                corpus.append({"text": text, "context": context, "pii": None})
+                continue
+
+            kind, template = rng.choice(leak_templates)
+            value = {
+                "nir": client.get('numero_securite_sociale', ''),
+                "email": client.get('email', ''),
+                "phone": client.get('telephone', ''),
+                "iban": make_fr_iban(rng)
+            }[kind]
+            corpus.append({"text": template.format(prenom=client.get('prenom', ''), value=value),
+                           "context": context, "pii": kind})
+    return corpus
+
+def benchmark_pii_detector(n_clients: int = 1000, responses_per_client: int = 20,
+                           clients_path: Optional[str] = None, seed: int = 42) -> Dict[str, Any]:
+    """
+    Mesure le débit et la qualité du détecteur sur un corpus synthétique reproductible
+    (clients générés avec la graine, ou lus depuis un fichier de data/generate_clients.py).
+
+    Args:
+        n_clients: Nombre de clients générés (sans fichier)
+        responses_per_client: Nombre de réponses par client
+        clients_path: Fichier clients_data.json (optionnel)
+        seed: Graine aléatoire
+
+    Returns:
+        Débit (réponses/s, Mo/s), répartition des verdicts, taux de détection par type de donnée
+        et réponses sans donnée personnelle signalées comme ambiguës ou bloquées à tort
+    """
+    clients = load_benchmark_clients(n_clients, clients_path, seed)
+    corpus = build_benchmark_corpus(clients, responses_per_client, seed)
+    detector = PIIDetector(allowlist=[])
+    known = [detector.known_values(item["context"]) for item in corpus]
+
+    start = time.perf_counter()
+    verdicts = [detector.scan(item["text"], values)["verdict"] for item, values in zip(corpus, known)]
+    elapsed = time.perf_counter() - start
+
+    size = sum(len(item["text"].encode('utf-8')) for item in corpus)
+    counts = {VERDICT_LEAK: 0, VERDICT_SUSPECT: 0, VERDICT_CLEAN: 0}
+    detected: Dict[str, List[int]] = {}
+    clean_suspect = 0
+    clean_blocked = 0
+    for item, verdict in zip(corpus, verdicts):
+        counts[verdict] += 1
+        if item["pii"] is None:
+            clean_suspect += verdict == VERDICT_SUSPECT
+            clean_blocked += verdict == VERDICT_LEAK
+        else:
+            stats = detected.setdefault(item["pii"], [0, 0])
+            stats[0] += verdict == VERDICT_LEAK
+            stats[1] += 1
+
+    return {
+        "responses": len(corpus),
+        "elapsed": elapsed,
+        "throughput": len(corpus) / elapsed,
+        "megabytes_per_second": size / elapsed / 1e6,
+        "microseconds_per_response": elapsed / len(corpus) * 1e6,
+        "verdicts": counts,
+        # Seules les fuites certaines sont tranchées sans LLM
+        "llm_calls_avoided_rate": counts[VERDICT_LEAK] / len(corpus),
+        "leak_detection_rate": {kind: found / total for kind, (found, total) in detected.items()},
+        "clean_suspect": clean_suspect,
+        "clean_blocked": clean_blocked
+    }
+
+if __name__ == "__main__":
+    results = benchmark_pii_detector(clients_path=sys.argv[1] if len(sys.argv) > 1 else None)
+    print(f"Réponses analysées : {results['responses']} en {results['elapsed']:.3f}s")
+    print(f"Débit : {results['throughput']:.0f} réponses/s ({results['megabytes_per_second']:.1f} Mo/s, "
+          f"{results['microseconds_per_response']:.1f} µs/réponse)")
+    print(f"Verdicts : {results['verdicts']}")
+    print(f"Appels au LLM évités : {results['llm_calls_avoided_rate']:.1%}")
+    for kind, rate in results['leak_detection_rate'].items():
+        print(f"Fuites {kind} bloquées sans LLM : {rate:.1%}")
+    print(f"Réponses sans donnée personnelle jugées ambiguës : {results['clean_suspect']}, "
+          f"bloquées à tort : {results['clean_blocked']}")
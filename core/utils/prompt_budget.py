@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Module de gestion du budget de tokens des prompts pour le POC de chatbot IA AssurSanté.
+Ce module limite la taille de chaque section du prompt (système, intention, client,
+réclamation, connaissances, historique) et la taille totale, en fonction du modèle.
+"""
+
+from typing import Dict, List, Any, Optional, Tuple, Callable
+
+# Approximation usuelle : ~4 caractères par token
+CHARS_PER_TOKEN = 4
+
+# Marqueur ajouté aux sections tronquées
+TRUNCATION_MARKER = "\n[...]"
+
+# Budgets par modèle (en tokens) ; "total" exclut les tokens de génération
+MODEL_PROMPT_BUDGETS = {
+    "llama3-70b-8192": {
+        "total": 6000,
+        "system": 1200,
+        "intent": 400,
+        "client": 800,
+        "claim": 800,
+        "knowledge": 2000,
+        "history": 2000,
+        "summary": 500
+    },
+    "llama3-8b-8192": {
+        "total": 6000,
+        "system": 1200,
+        "intent": 400,
+        "client": 800,
+        "claim": 800,
+        "knowledge": 2000,
+        "history": 2000,
+        "summary": 500
+    },
+    "default": {
+        "total": 3000,
+        "system": 1000,
+        "intent": 300,
+        "client": 400,
+        "claim": 400,
+        "knowledge": 800,
+        "history": 800,
+        "summary": 300
+    }
+}
+
+# Ordre de réduction lorsque le budget total est dépassé
+TOTAL_BUDGET_REDUCTION_ORDER = ["knowledge", "history", "summary", "claim", "client", "intent"]
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estime le nombre de tokens d'un texte.
+
+    Args:
+        text: Texte à mesurer
+
+    Returns:
+        Nombre de tokens estimé
+    """
+    if not text:
+        return 0
+    return len(text) // CHARS_PER_TOKEN + 1
+
+def chars_to_tokens(chars: int) -> int:
+    """
+    Estime le nombre de tokens d'un texte à partir de sa longueur (même estimation qu'estimate_tokens).
+
+    Args:
+        chars: Nombre de caractères
+
+    Returns:
+        Nombre de tokens estimé
+    """
+    return chars // CHARS_PER_TOKEN + 1 if chars > 0 else 0
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Tronque un texte pour qu'il tienne dans un budget de tokens.
+
+    Args:
+        text: Texte à tronquer
+        max_tokens: Budget en tokens
+
+    Returns:
+        Texte éventuellement tronqué (suivi d'un marqueur)
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    max_chars = max(0, (max_tokens - 1) * CHARS_PER_TOKEN - len(TRUNCATION_MARKER))
+    if max_chars == 0:
+        return ""
+    return text[:max_chars] + TRUNCATION_MARKER
+
+class PromptBudgetManager:
+    """
+    Gestionnaire du budget de tokens pour l'assemblage des prompts du chatbot.
+    """
+
+    def __init__(self, model: str, budgets: Optional[Dict[str, int]] = None,
+                 max_history_messages: int = 10):
+        """
+        Initialise le gestionnaire de budget.
+
+        Args:
+            model: Modèle Groq utilisé
+            budgets: Budgets à appliquer (surcharge ceux du modèle)
+            max_history_messages: Nombre maximum de messages d'historique transmis
+        """
+        self.model = model
+        self.budgets = dict(MODEL_PROMPT_BUDGETS.get(model, MODEL_PROMPT_BUDGETS["default"]))
+        if budgets:
+            self.budgets.update(budgets)
+        self.max_history_messages = max_history_messages
+
+    @staticmethod
+    def rank_knowledge_items(knowledge_items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Classe les éléments de connaissances par score de pertinence décroissant (s'il est fourni).
+
+        Args:
+            knowledge_items: Éléments de la base de connaissances
+
+        Returns:
+            Éléments classés
+        """
+        return sorted(knowledge_items, key=lambda item: item.get('score', 0.0), reverse=True)
+
+    @staticmethod
+    def knowledge_item_sizes(knowledge_items: List[Dict[str, Any]],
+                             format_knowledge: Callable[[List[Dict[str, Any]]], str]) -> Tuple[int, List[int]]:
+        """
+        Mesure le rendu des éléments de connaissances sans formater chaque sous-ensemble :
+        taille de l'en-tête commun et taille propre à chaque élément.
+
+        Args:
+            knowledge_items: Éléments de la base de connaissances
+            format_knowledge: Fonction de formatage des éléments
+
+        Returns:
+            Tuple (taille de l'en-tête en caractères, taille de chaque élément en caractères)
+        """
+        if not knowledge_items:
+            return 0, []
+        single = [len(format_knowledge([item])) for item in knowledge_items]
+        # Le rendu d'un élément répété deux fois ne contient l'en-tête qu'une fois
+        first = knowledge_items[0]
+        header = max(0, 2 * single[0] - len(format_knowledge([first, first])))
+        return header, [size - header for size in single]
+
+    def select_knowledge_items(self, knowledge_items: List[Dict[str, Any]],
+                               format_knowledge: Callable[[List[Dict[str, Any]]], str],
+                               budget: int,
+                               rendered: Optional[str] = None) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Sélectionne les éléments de connaissances les plus pertinents tenant dans le budget.
+        Les éléments sont classés par score de pertinence décroissant (s'il est fourni).
+
+        Args:
+            knowledge_items: Éléments de la base de connaissances
+            format_knowledge: Fonction de formatage des éléments
+            budget: Budget en tokens
+            rendered: Rendu déjà calculé de l'ensemble des éléments classés (optionnel)
+
+        Returns:
+            Tuple (éléments retenus, éléments écartés)
+        """
+        ranked = self.rank_knowledge_items(knowledge_items)
+        if rendered is not None and estimate_tokens(rendered) <= budget:
+            return ranked, []
+
+        kept = []
+        dropped = []
+        # Taille cumulée du rendu des éléments retenus (sans reformater la sélection à chaque élément)
+        header, sizes = self.knowledge_item_sizes(ranked, format_knowledge)
+        used = header
+
+        for item, size in zip(ranked, sizes):
+            if chars_to_tokens(used + size) <= budget:
+                kept.append(item)
+                used += size
+                continue
+
+            if not kept:
+                # Le document le plus pertinent est conservé, tronqué au budget disponible
+                overhead = estimate_tokens(format_knowledge([dict(item, content="")]))
+                content = truncate_to_tokens(item.get('content', ''), max(0, budget - overhead))
+                if content:
+                    item = dict(item, content=content)
+                    kept.append(item)
+                    used += len(format_knowledge([item])) - header
+                    continue
+
+            dropped.append(item)
+
+        # Vérification sur le rendu réel (la numérotation des documents peut allonger le rendu)
+        while len(kept) > 1 and estimate_tokens(format_knowledge(kept)) > budget:
+            dropped.insert(0, kept.pop())
+
+        return kept, dropped
+
+    def select_history(self, history: List[Dict[str, str]], budget: int) -> Tuple[List[Dict[str, str]], int]:
+        """
+        Sélectionne les messages d'historique les plus récents tenant dans le budget.
+        Le dernier message (message utilisateur courant) est toujours conservé.
+
+        Args:
+            history: Historique de la conversation
+            budget: Budget en tokens
+
+        Returns:
+            Tuple (messages retenus, nombre de messages écartés)
+        """
+        recent = history[-self.max_history_messages:] if self.max_history_messages else list(history)
+        kept = []
+        used = 0
+
+        for message in reversed(recent):
+            tokens = estimate_tokens(message.get('content', ''))
+            if kept and used + tokens > budget:
+                break
+            kept.append(message)
+            used += tokens
+
+        kept.reverse()
+        return kept, len(history) - len(kept)
+
+    def assemble(self,
+                 system_prompt: str,
+                 intent_prompt: str,
+                 client_context: str,
+                 claim_context: str,
+                 knowledge_items: List[Dict[str, Any]],
+                 history: List[Dict[str, str]],
+                 format_knowledge: Callable[[List[Dict[str, Any]]], str],
+                 conversation_summary: str = "",
+                 knowledge_text: Optional[str] = None) -> Tuple[List[Dict[str, str]], Dict[str, Any]]:
+        """
+        Assemble les messages du prompt dans le respect des budgets.
+
+        Args:
+            system_prompt: Prompt système de base
+            intent_prompt: Prompt spécifique à l'intention (peut être vide)
+            client_context: Contexte client formaté (peut être vide)
+            claim_context: Contexte de réclamation formaté (peut être vide)
+            knowledge_items: Éléments de la base de connaissances
+            history: Historique de la conversation (dernier message = message courant)
+            format_knowledge: Fonction de formatage des éléments de connaissances
+            conversation_summary: Résumé glissant des échanges plus anciens (peut être vide)
+            knowledge_text: Rendu déjà calculé de knowledge_items classés par pertinence,
+                réutilisé tel quel si tous les éléments sont retenus (optionnel)
+
+        Returns:
+            Tuple (messages pour l'API, rapport de budget)
+        """
+        budgets = self.budgets
+        truncated = []
+
+        def _fit(name: str, text: str) -> str:
+            fitted = truncate_to_tokens(text, budgets[name])
+            if fitted != text:
+                truncated.append(name)
+            return fitted
+
+        sections = {
+            "system": _fit("system", system_prompt) if system_prompt else "",
+            "intent": _fit("intent", intent_prompt) if intent_prompt else "",
+            "client": _fit("client", client_context) if client_context else "",
+            "claim": _fit("claim", claim_context) if claim_context else "",
+            "summary": _fit("summary", conversation_summary) if conversation_summary else ""
+        }
+        tokens = {name: estimate_tokens(text) for name, text in sections.items()}
+
+        kept_items, dropped_items = self.select_knowledge_items(
+            knowledge_items, format_knowledge, budgets["knowledge"], knowledge_text) if knowledge_items else ([], [])
+        kept_history, dropped_history = self.select_history(history, budgets["history"])
+
+        # Le rendu fourni n'est valable que pour l'ensemble complet des éléments, non tronqués
+        reuse_rendered = knowledge_text is not None and estimate_tokens(knowledge_text) <= budgets["knowledge"]
+
+        def _render_knowledge() -> str:
+            if not kept_items:
+                return ""
+            if reuse_rendered and not dropped_items:
+                return knowledge_text
+            return format_knowledge(kept_items)
+
+        rendered_knowledge = _render_knowledge()
+        tokens["knowledge"] = estimate_tokens(rendered_knowledge)
+        tokens["history"] = sum(estimate_tokens(m.get('content', '')) for m in kept_history)
+
+        # Réduction des sections les moins prioritaires si le budget total est dépassé
+        for name in TOTAL_BUDGET_REDUCTION_ORDER:
+            excess = sum(tokens.values()) - budgets["total"]
+            if excess <= 0:
+                break
+
+            if name == "knowledge":
+                header, sizes = self.knowledge_item_sizes(kept_items, format_knowledge)
+                used = header + sum(sizes)
+                while kept_items and sum(tokens.values()) > budgets["total"]:
+                    dropped_items.append(kept_items.pop())
+                    used -= sizes.pop()
+                    tokens["knowledge"] = chars_to_tokens(used) if kept_items else 0
+                rendered_knowledge = _render_knowledge()
+                tokens["knowledge"] = estimate_tokens(rendered_knowledge)
+            elif name == "history":
+                while len(kept_history) > 1 and sum(tokens.values()) > budgets["total"]:
+                    removed = kept_history.pop(0)
+                    dropped_history += 1
+                    tokens["history"] -= estimate_tokens(removed.get('content', ''))
+            elif name == "intent":
+                # Les consignes d'intention ne sont pas tronquées : elles sont retirées
+                if sections[name]:
+                    sections[name] = ""
+                    tokens[name] = 0
+                    truncated.append(name)
+            elif sections[name]:
+                sections[name] = truncate_to_tokens(sections[name], max(0, tokens[name] - excess))
+                tokens[name] = estimate_tokens(sections[name])
+                if name not in truncated:
+                    truncated.append(name)
+
+        # Construction des messages (même structure que le prompt historique)
+        system_content = sections["system"]
+        if sections["intent"]:
+            system_content += f"\n\n{sections['intent']}"
+        messages = [{"role": "system", "content": system_content}]
+
+        context = sections["client"] + sections["claim"] + rendered_knowledge
+        if context:
+            messages.append({"role": "system", "content": f"CONTEXTE:\n{context}"})
+
+        if sections["summary"]:
+            messages.append({"role": "system", "content": f"RÉSUMÉ DES ÉCHANGES PRÉCÉDENTS:\n{sections['summary']}"})
+
+        messages.extend(kept_history)
+
+        report = {
+            "model": self.model,
+            "total_budget": budgets["total"],
+            "total_tokens": sum(tokens.values()),
+            "sections": {name: {"tokens": tokens[name], "budget": budgets.get(name)} for name in tokens},
+            "truncated_sections": truncated,
+            "dropped_knowledge_items": [item.get('title', 'Sans titre') for item in dropped_items],
+            "dropped_history_messages": dropped_history
+        }
+
+        return messages, report
@@ -3,34 +3,129 @@
 
 """
 Module d'implémentation du chaînage de prompts pour le POC de chatbot IA AssurSanté.
-Ce module permet de décomposer des requêtes complexes en sous-tâches et de les traiter séquentiellement.
+Ce module permet de décomposer des requêtes complexes en sous-tâches et de les traiter
+en parallèle dans le respect de leurs dépendances.
 """
 
+import os
 import json
+import time
+import heapq
 import logging
-from typing import Dict, List, Any, Optional, Tuple, Callable
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from typing import Dict, List, Any, Optional, Tuple, Callable, Generator, Iterator, Set
 from .groq_integration import GroqClient
 from .prompt_templates import PromptTemplates
+from .chain_planner import ChainPlanner
+from .prompt_budget import estimate_tokens, truncate_to_tokens
+from .subtask_cache import (SubtaskResultCache, CHAIN_SUBTASK_CACHE_ENABLED, get_subtask_result_cache,
+                            context_fingerprint, subtask_key, merge_duplicate_subtasks)
 
 # Configuration du logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Configuration de l'exécution des chaînes
+CHAIN_MAX_PARALLELISM = int(os.getenv('CHAIN_MAX_PARALLELISM', '4'))  # Sous-tâches exécutées simultanément
+CHAIN_SUBTASK_TIMEOUT = float(os.getenv('CHAIN_SUBTASK_TIMEOUT', '30'))  # Délai maximal par sous-tâche (secondes)
+CHAIN_PLANNER_ENABLED = os.getenv('CHAIN_PLANNER_ENABLED', 'true').lower() == 'true'  # Plans précompilés et cache de plans
+CHAIN_RESULT_COMPACT_TOKENS = int(os.getenv('CHAIN_RESULT_COMPACT_TOKENS', '400'))  # Taille d'un résultat déclenchant son résumé
+CHAIN_RESULT_SUMMARY_TOKENS = int(os.getenv('CHAIN_RESULT_SUMMARY_TOKENS', '200'))  # Taille maximale du résumé transmis
+
+RESULT_SUMMARY_PROMPT = """Vous êtes un assistant spécialisé dans l'assurance santé.
+Résumez le résultat intermédiaire ci-dessous pour qu'il serve d'entrée aux étapes suivantes du traitement.
+Conservez tous les faits utiles (garanties, taux, montants, plafonds, délais, conditions, démarches) et supprimez
+les formulations, répétitions et explications générales. Répondez par une courte liste à puces.
+
+Étape : {title}
+
+Résultat :
+{result}"""
+
+def response_tokens(response: Dict[str, Any], prompt_text: str, completion_text: str) -> Dict[str, int]:
+    """
+    Nombre de tokens d'un appel au LLM (usage retourné par l'API, estimation à défaut).
+    
+    Args:
+        response: Réponse de l'API
+        prompt_text: Texte envoyé
+        completion_text: Texte généré
+        
+    Returns:
+        Tokens du prompt et de la complétion
+    """
+    usage = response.get('usage') or {}
+    return {
+        "prompt": int(usage.get('prompt_tokens') or estimate_tokens(prompt_text)),
+        "completion": int(usage.get('completion_tokens') or estimate_tokens(completion_text))
+    }
+
+def critical_path_lengths(subtasks: List[Dict[str, Any]]) -> Dict[str, int]:
+    """
+    Calcule, pour chaque sous-tâche, la longueur du plus long chemin de dépendances
+    restant jusqu'à la fin de la chaîne (elle-même comprise).
+
+    Args:
+        subtasks: Sous-tâches avec leurs dépendances
+
+    Returns:
+        Longueur du chemin critique par identifiant de sous-tâche
+    """
+    dependents: Dict[str, List[str]] = {str(task.get('id')): [] for task in subtasks}
+    for task in subtasks:
+        for dependency in task.get('dependencies', []):
+            if str(dependency) in dependents:
+                dependents[str(dependency)].append(str(task.get('id')))
+
+    lengths: Dict[str, int] = {}
+
+    def _length(task_id: str, visiting: frozenset) -> int:
+        if task_id in lengths:
+            return lengths[task_id]
+        if task_id in visiting:
+            # Dépendance circulaire : signalée par l'ordonnanceur
+            return 0
+        length = 1 + max((_length(d, visiting | {task_id}) for d in dependents[task_id]), default=0)
+        lengths[task_id] = length
+        return length
+
+    for task_id in dependents:
+        _length(task_id, frozenset())
+    return lengths
+
 class PromptChaining:
     """
     Implémentation du pattern de chaînage de prompts pour le chatbot IA.
-    Permet de décomposer des requêtes complexes en sous-tâches et de les traiter séquentiellement.
+    Permet de décomposer des requêtes complexes en sous-tâches et de les traiter en parallèle.
     """
     
-    def __init__(self, groq_client: Optional[GroqClient] = None):
+    def __init__(self, groq_client: Optional[GroqClient] = None,
+                 max_parallelism: int = CHAIN_MAX_PARALLELISM,
+                 subtask_timeout: float = CHAIN_SUBTASK_TIMEOUT,
+                 planner: Optional[ChainPlanner] = None,
+                 compact_tokens: int = CHAIN_RESULT_COMPACT_TOKENS,
+                 summary_tokens: int = CHAIN_RESULT_SUMMARY_TOKENS,
+                 subtask_cache: Optional[SubtaskResultCache] = None):
         """
         Initialise le système de chaînage de prompts.
         
         Args:
             groq_client: Client Groq pour les appels API
+            max_parallelism: Nombre maximum de sous-tâches exécutées simultanément
+            subtask_timeout: Délai maximal d'exécution d'une sous-tâche (secondes)
+            planner: Planificateur évitant la décomposition par le LLM (créé si CHAIN_PLANNER_ENABLED)
+            compact_tokens: Taille (tokens) au-delà de laquelle un résultat est résumé avant d'être transmis
+            summary_tokens: Taille maximale (tokens) d'un résultat résumé
+            subtask_cache: Cache des résultats de sous-tâches (cache partagé du processus si CHAIN_SUBTASK_CACHE_ENABLED)
         """
         self.groq_client = groq_client or GroqClient()
         self.templates = PromptTemplates()
+        self.max_parallelism = max(1, max_parallelism)
+        self.subtask_timeout = subtask_timeout
+        self.planner = planner or (ChainPlanner() if CHAIN_PLANNER_ENABLED else None)
+        self.compact_tokens = compact_tokens
+        self.summary_tokens = summary_tokens
+        self.subtask_cache = subtask_cache or (get_subtask_result_cache() if CHAIN_SUBTASK_CACHE_ENABLED else None)
     
     def decompose_query(self, query: str) -> List[Dict[str, Any]]:
         """
@@ -122,13 +217,29 @@ Requête utilisateur à décomposer : """
                 "type": "analyse"
             }]
     
-    def execute_subtask(self, subtask: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]:
+    def plan_query(self, query: str) -> Tuple[List[Dict[str, Any]], str]:
+        """
+        Détermine les sous-tâches d'une requête, via le planificateur s'il est activé.
+        
+        Args:
+            query: Requête utilisateur
+            
+        Returns:
+            Tuple (sous-tâches, origine du plan : "simple", "library", "cache" ou "llm")
+        """
+        if self.planner is None:
+            return self.decompose_query(query), "llm"
+        return self.planner.plan(query, self.decompose_query)
+    
+    def execute_subtask(self, subtask: Dict[str, Any], context: Dict[str, Any],
+                        timeout: Optional[float] = None) -> Dict[str, Any]:
         """
         Exécute une sous-tâche spécifique.
         
         Args:
             subtask: Sous-tâche à exécuter
             context: Contexte d'exécution (résultats des sous-tâches précédentes, etc.)
+            timeout: Durée maximale de l'appel au LLM (secondes, sans limite si non spécifiée)
             
         Returns:
             Résultat de l'exécution de la sous-tâche
@@ -196,14 +307,18 @@ Utilisez les informations disponibles dans le contexte pour fournir une réponse
         ]
         
         try:
-            response = self.groq_client.chat_completion(messages, temperature=0.5)
+            response = self.groq_client.chat_completion(messages, temperature=0.5, timeout=timeout)
             result = response['choices'][0]['message']['content']
+            tokens = response_tokens(response, prompt + context_str + task_description, result)
+            logger.info(f"Sous-tâche {subtask.get('id')}: {tokens['prompt']} tokens de prompt "
+                        f"({estimate_tokens(context_str)} de contexte), {tokens['completion']} générés")
             
             return {
                 "subtask_id": subtask.get('id'),
                 "title": subtask.get('title'),
                 "result": result,
-                "status": "completed"
+                "status": "completed",
+                "tokens": tokens
             }
         
         except Exception as e:
@@ -216,6 +331,63 @@ Utilisez les informations disponibles dans le contexte pour fournir une réponse
                 "status": "failed"
             }
     
+    def compact_result(self, subtask: Dict[str, Any], result: Dict[str, Any],
+                       timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Résume un résultat volumineux avant sa transmission aux sous-tâches dépendantes
+        et à la synthèse (le résultat complet est conservé).
+        
+        Args:
+            subtask: Sous-tâche ayant produit le résultat
+            result: Résultat de la sous-tâche
+            timeout: Durée maximale de l'appel au LLM (secondes, sans limite si non spécifiée)
+            
+        Returns:
+            Résultat, complété du résumé transmis ("summary") s'il a été compacté
+        """
+        text = result.get('result', '')
+        if result.get('status') != 'completed' or estimate_tokens(text) <= self.compact_tokens:
+            return result
+        
+        prompt = RESULT_SUMMARY_PROMPT.format(title=subtask.get('title'), result=text)
+        try:
+            response = self.groq_client.chat_completion([{"role": "system", "content": prompt}],
+                                                        temperature=0.2, max_tokens=self.summary_tokens,
+                                                        timeout=timeout)
+            summary = response['choices'][0]['message']['content'].strip()
+            tokens = response_tokens(response, prompt, summary)
+        except Exception as e:
+            logger.warning(f"Résumé du résultat de la sous-tâche {subtask.get('id')} impossible, troncature: {e}")
+            summary = truncate_to_tokens(text, self.summary_tokens)
+            tokens = {"prompt": 0, "completion": 0}
+        
+        logger.info(f"Résultat de la sous-tâche {subtask.get('id')} compacté: "
+                    f"{estimate_tokens(text)} -> {estimate_tokens(summary)} tokens")
+        return dict(result, summary=summary, compaction_tokens=tokens)
+    
+    @staticmethod
+    def subtask_context(subtask: Dict[str, Any], context: Dict[str, Any],
+                        results: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Construit le contexte d'une sous-tâche : contexte de base et résultats de ses
+        seules dépendances déclarées.
+        
+        Args:
+            subtask: Sous-tâche à exécuter
+            context: Contexte de base de la chaîne (données client, requête...)
+            results: Résultats des sous-tâches terminées, par identifiant
+            
+        Returns:
+            Contexte de la sous-tâche
+        """
+        task_context = {key: value for key, value in context.items() if key != 'current_subtask'}
+        for dependency in subtask.get('dependencies', []):
+            result = results.get(str(dependency))
+            if result is not None:
+                task_context[f"result_{dependency}"] = result.get('summary') or result.get('result', '')
+        task_context['current_subtask'] = subtask
+        return task_context
+    
     def execute_chain(self, query: str, initial_context: Dict[str, Any] = None) -> Dict[str, Any]:
         """
         Exécute une chaîne complète de prompts pour une requête complexe.
@@ -225,71 +397,271 @@ Utilisez les informations disponibles dans le contexte pour fournir une réponse
             initial_context: Contexte initial (données client, etc.)
             
         Returns:
-            Résultat final de l'exécution de la chaîne
+            Résultat final de l'exécution de la chaîne, avec la chronologie des sous-tâches
         """
         # Initialisation du contexte
         context = initial_context or {}
         context['query'] = query
         
-        # Décomposition de la requête en sous-tâches
-        subtasks = self.decompose_query(query)
-        logger.info(f"Requête décomposée en {len(subtasks)} sous-tâches")
-        
-        # Stockage des résultats des sous-tâches
-        results = {}
+        # Décomposition de la requête en sous-tâches (sans appel au LLM si un plan est disponible)
+        subtasks, plan_source = self.plan_query(query)
+        logger.info(f"Requête décomposée en {len(subtasks)} sous-tâches (plan: {plan_source})")
         
         # Exécution des sous-tâches dans l'ordre des dépendances
-        remaining_tasks = subtasks.copy()
-        completed_task_ids = set()
-        
-        while remaining_tasks:
-            # Recherche des tâches prêtes à être exécutées (toutes les dépendances sont satisfaites)
-            ready_tasks = []
-            for task in remaining_tasks:
-                dependencies = set(task.get('dependencies', []))
-                if dependencies.issubset(completed_task_ids):
-                    ready_tasks.append(task)
+        results, timeline = self.run_subtasks(subtasks, context)
+        
+        for task_id, result in results.items():
+            context[f"result_{task_id}"] = result.get('summary') or result.get('result', '')
+        
+        # Synthèse des résultats
+        synthesis = self.synthesize_results(query, results, context)
+        synthesis['plan_source'] = plan_source
+        synthesis['timeline'] = timeline
+        synthesis['execution'] = self.summarize_timeline(timeline)
+        return synthesis
+    
+    def run_subtasks(self, subtasks: List[Dict[str, Any]],
+                     context: Dict[str, Any]) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        """
+        Exécute les sous-tâches en parallèle dans le respect de leurs dépendances.
+        
+        Args:
+            subtasks: Sous-tâches à exécuter
+            context: Contexte de base de la chaîne
             
-            if not ready_tasks:
-                # Si aucune tâche n'est prête, il y a un problème de dépendances circulaires
-                logger.error("Dépendances circulaires détectées, impossible de continuer")
-                break
+        Returns:
+            Tuple (résultats par identifiant de sous-tâche, chronologie des sous-tâches)
+        """
+        events = self.iter_subtasks(subtasks, context)
+        while True:
+            try:
+                next(events)
+            except StopIteration as done:
+                return done.value
+    
+    def iter_subtasks(self, subtasks: List[Dict[str, Any]],
+                      context: Dict[str, Any]) -> Generator[Dict[str, Any], None, Tuple[Dict[str, Any], List[Dict[str, Any]]]]:
+        """
+        Exécute les sous-tâches en parallèle dans le respect de leurs dépendances, en produisant
+        un événement au lancement et à la fin de chacune.
+        Chaque sous-tâche démarre dès que ses dépendances sont terminées ; parmi les
+        sous-tâches prêtes, celles du chemin critique le plus long sont lancées en premier.
+        Les appels au LLM d'une sous-tâche sont bornés par le temps qu'il lui reste, et un appel
+        abandonné occupe sa place dans la limite de parallélisme jusqu'à son expiration.
+        
+        Args:
+            subtasks: Sous-tâches à exécuter
+            context: Contexte de base de la chaîne
             
-            # Exécution des tâches prêtes
-            for task in ready_tasks:
-                logger.info(f"Exécution de la sous-tâche {task.get('id')}: {task.get('title')}")
+        Returns:
+            Générateur d'événements ("subtask_started", "subtask_finished"), dont la valeur de retour
+            est le tuple (résultats par identifiant de sous-tâche, chronologie des sous-tâches)
+        """
+        chain_start = time.monotonic()
+        # Les sous-tâches identiques du plan ne sont exécutées qu'une fois
+        subtasks, merged = merge_duplicate_subtasks(subtasks)
+        if merged:
+            logger.info(f"Sous-tâches fusionnées avec une sous-tâche identique: {merged}")
+        
+        tasks = {str(task.get('id')): task for task in subtasks}
+        order = {task_id: index for index, task_id in enumerate(tasks)}
+        # La requête est exclue de l'empreinte : une sous-tâche est définie par sa description,
+        # ce qui permet de réutiliser son résultat dans les chaînes d'autres requêtes
+        base_fingerprint = context_fingerprint({key: value for key, value in context.items()
+                                                if key not in ('query', 'current_subtask')})
+        priorities = critical_path_lengths(subtasks)
+        # Seuls les résultats transmis à d'autres sous-tâches sont compactés ;
+        # les résultats finaux parviennent entiers à la synthèse
+        depended_on = {str(d) for task in subtasks for d in task.get('dependencies', [])}
+        
+        pending = {task_id: {str(d) for d in task.get('dependencies', [])} for task_id, task in tasks.items()}
+        finished = set()
+        ready: List[Tuple[int, int, str]] = []
+        running: Dict[Future, Tuple[str, float]] = {}
+        # Sous-tâches abandonnées dont l'appel au LLM n'a pas encore expiré
+        abandoned: Set[Future] = set()
+        results: Dict[str, Any] = {}
+        timeline: Dict[str, Dict[str, Any]] = {
+            task_id: {"subtask_id": task_id, "status": "merged", "merged_into": kept_id}
+            for task_id, kept_id in merged.items()
+        }
+        
+        def _release_ready() -> None:
+            for task_id in [t for t, dependencies in pending.items() if dependencies <= finished]:
+                del pending[task_id]
+                heapq.heappush(ready, (-priorities.get(task_id, 1), order[task_id], task_id))
+                timeline[task_id] = {
+                    "subtask_id": task_id,
+                    "title": tasks[task_id].get('title'),
+                    "type": tasks[task_id].get('type'),
+                    "ready_at": time.monotonic() - chain_start
+                }
+        
+        def _run(task_id: str, task_context: Dict[str, Any], deadline: float) -> Dict[str, Any]:
+            timeline[task_id]["started_at"] = time.monotonic() - chain_start
+            task = tasks[task_id]
+            
+            def _remaining() -> float:
+                return max(0.0, deadline - time.monotonic())
+            
+            key = None
+            if self.subtask_cache is not None:
+                dependency_results = [task_context[f"result_{d}"] for d in task.get('dependencies', [])
+                                      if f"result_{d}" in task_context]
+                key = subtask_key(task, dependency_results, base_fingerprint)
+                cached = self.subtask_cache.get(key)
+                if cached is not None:
+                    logger.info(f"Sous-tâche {task_id}: résultat réutilisé depuis le cache")
+                    result = dict(cached, subtask_id=task.get('id'), title=task.get('title'), cached=True,
+                                  tokens={"prompt": 0, "completion": 0})
+                    if task_id in depended_on and 'summary' not in result:
+                        result = self.compact_result(task, result, timeout=_remaining())
+                    return result
+            
+            result = self.execute_subtask(task, task_context, timeout=_remaining())
+            if task_id in depended_on:
+                result = self.compact_result(task, result, timeout=_remaining())
+            if key is not None and result.get('status') == 'completed':
+                self.subtask_cache.set(key, result)
+            return result
+        
+        def _finish(task_id: str, result: Dict[str, Any]) -> Dict[str, Any]:
+            entry = timeline[task_id]
+            entry["finished_at"] = time.monotonic() - chain_start
+            entry["duration"] = entry["finished_at"] - entry.get("started_at", entry["finished_at"])
+            entry["status"] = result.get('status')
+            entry["tokens"] = result.get('tokens', {"prompt": 0, "completion": 0})
+            entry["compacted"] = 'summary' in result
+            entry["cached"] = result.get('cached', False)
+            results[task_id] = result
+            finished.add(task_id)
+            return {
+                "event": "subtask_finished",
+                "subtask_id": tasks[task_id].get('id'),
+                "title": tasks[task_id].get('title'),
+                "status": result.get('status'),
+                "result": result.get('result', ''),
+                "duration": entry["duration"],
+                "elapsed": entry["finished_at"]
+            }
+        
+        # Les appels abandonnés après expiration de leur délai ne bloquent pas la fin de la chaîne
+        executor = ThreadPoolExecutor(max_workers=self.max_parallelism, thread_name_prefix="subtask")
+        try:
+            _release_ready()
+            
+            while ready or running:
+                # Lancement des sous-tâches prêtes, dans la limite de parallélisme (appels abandonnés compris)
+                abandoned = {future for future in abandoned if not future.done()}
+                while ready and len(running) + len(abandoned) < self.max_parallelism:
+                    _, _, task_id = heapq.heappop(ready)
+                    logger.info(f"Exécution de la sous-tâche {task_id}: {tasks[task_id].get('title')}")
+                    task_context = self.subtask_context(tasks[task_id], context, results)
+                    started = time.monotonic()
+                    future = executor.submit(_run, task_id, task_context, started + self.subtask_timeout)
+                    running[future] = (task_id, started)
+                    yield {
+                        "event": "subtask_started",
+                        "subtask_id": tasks[task_id].get('id'),
+                        "title": tasks[task_id].get('title'),
+                        "type": tasks[task_id].get('type'),
+                        "elapsed": time.monotonic() - chain_start
+                    }
                 
-                # Mise à jour du contexte avec la sous-tâche courante
-                context['current_subtask'] = task
+                if not running:
+                    # Toutes les places sont occupées par des appels abandonnés, qui expirent d'eux-mêmes
+                    wait(list(abandoned), timeout=self.subtask_timeout, return_when=FIRST_COMPLETED)
+                    continue
                 
-                # Exécution de la sous-tâche
-                result = self.execute_subtask(task, context)
+                now = time.monotonic()
+                next_deadline = min(started + self.subtask_timeout for _, started in running.values())
+                done, _ = wait(list(running), timeout=max(0.0, next_deadline - now), return_when=FIRST_COMPLETED)
                 
-                # Stockage du résultat
-                task_id = task.get('id')
-                results[task_id] = result
+                for future in done:
+                    task_id, _ = running.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        logger.error(f"Erreur lors de l'exécution de la sous-tâche {task_id}: {e}")
+                        result = {
+                            "subtask_id": tasks[task_id].get('id'),
+                            "title": tasks[task_id].get('title'),
+                            "result": f"Erreur lors de l'exécution: {str(e)}",
+                            "status": "failed"
+                        }
+                    yield _finish(task_id, result)
                 
-                # Mise à jour du contexte avec le résultat
-                context[f"result_{task_id}"] = result.get('result', '')
+                # Sous-tâches ayant dépassé leur délai : abandonnées, leurs dépendantes continuent
+                now = time.monotonic()
+                for future, (task_id, started) in list(running.items()):
+                    if now - started >= self.subtask_timeout:
+                        del running[future]
+                        abandoned.add(future)
+                        logger.warning(f"Sous-tâche {task_id} abandonnée après {self.subtask_timeout:.1f}s")
+                        yield _finish(task_id, {
+                            "subtask_id": tasks[task_id].get('id'),
+                            "title": tasks[task_id].get('title'),
+                            "result": f"Délai d'exécution dépassé ({self.subtask_timeout:.0f}s)",
+                            "status": "timeout"
+                        })
                 
-                # Marquage de la tâche comme complétée
-                completed_task_ids.add(task_id)
-                remaining_tasks.remove(task)
+                _release_ready()
+            
+            if pending:
+                # Aucune tâche ne peut plus démarrer : dépendances circulaires ou inconnues
+                logger.error("Dépendances circulaires détectées, impossible de continuer")
+        finally:
+            # Arrêt anticipé (consommateur d'événements interrompu) : les appels en cours sont abandonnés
+            for future in running:
+                future.cancel()
+            executor.shutdown(wait=False)
         
-        # Synthèse des résultats
-        return self.synthesize_results(query, results, context)
+        ordered_results = {tasks[t].get('id'): results[t] for t in tasks if t in results}
+        ordered_timeline = sorted(timeline.values(), key=lambda entry: entry.get("started_at", float('inf')))
+        return ordered_results, ordered_timeline
     
-    def synthesize_results(self, query: str, subtask_results: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]:
+    @staticmethod
+    def summarize_timeline(timeline: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
-        Synthétise les résultats des sous-tâches en une réponse finale.
+        Résume la chronologie d'exécution des sous-tâches.
+        
+        Args:
+            timeline: Chronologie retournée par run_subtasks()
+            
+        Returns:
+            Durée totale, somme des durées (exécution séquentielle), gain obtenu, tokens consommés
+            et nombre de sous-tâches réutilisées (cache) ou fusionnées
+        """
+        executed = [entry for entry in timeline if "finished_at" in entry]
+        if not executed:
+            return {"subtasks": 0, "wall_time": 0.0, "sequential_time": 0.0, "speedup": 1.0,
+                    "prompt_tokens": 0, "completion_tokens": 0, "cached_subtasks": 0,
+                    "merged_subtasks": len(timeline)}
+        
+        wall_time = max(entry["finished_at"] for entry in executed)
+        sequential_time = sum(entry["duration"] for entry in executed)
+        return {
+            "subtasks": len(executed),
+            "wall_time": wall_time,
+            "sequential_time": sequential_time,
+            "speedup": sequential_time / wall_time if wall_time > 0 else 1.0,
+            "prompt_tokens": sum(entry.get("tokens", {}).get("prompt", 0) for entry in executed),
+            "completion_tokens": sum(entry.get("tokens", {}).get("completion", 0) for entry in executed),
+            "cached_subtasks": sum(1 for entry in executed if entry.get("cached")),
+            "merged_subtasks": sum(1 for entry in timeline if entry.get("status") == "merged")
+        }
+    
+    @staticmethod
+    def synthesis_messages(query: str, subtask_results: Dict[str, Any]) -> List[Dict[str, str]]:
+        """
+        Construit les messages de l'appel de synthèse.
         
         Args:
             query: Requête utilisateur originale
             subtask_results: Résultats des sous-tâches
-            context: Contexte d'exécution
             
         Returns:
-            Réponse finale synthétisée
+            Messages pour l'API Groq
         """
         # Construction du prompt de synthèse
         synthesis_prompt = """Vous êtes un assistant spécialisé dans la synthèse d'informations dans le contexte d'assurance santé.
@@ -303,29 +675,48 @@ La réponse doit être :
 
 Requête originale de l'utilisateur : """
         
-        # Construction du contexte des résultats
+        # Construction du contexte des résultats (résumés pour les résultats compactés)
         results_context = ""
         for task_id, result in subtask_results.items():
             results_context += f"\n--- Résultat de la sous-tâche {task_id}: {result.get('title')} ---\n"
-            results_context += result.get('result', 'Aucun résultat disponible')
+            results_context += result.get('summary') or result.get('result', 'Aucun résultat disponible')
             results_context += "\n"
         
-        # Appel à l'API Groq pour la synthèse
-        messages = [
+        return [
             {"role": "system", "content": synthesis_prompt},
             {"role": "system", "content": f"RÉSULTATS DES SOUS-TÂCHES:\n{results_context}"},
             {"role": "user", "content": query}
         ]
+    
+    def synthesize_results(self, query: str, subtask_results: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Synthétise les résultats des sous-tâches en une réponse finale.
+        
+        Args:
+            query: Requête utilisateur originale
+            subtask_results: Résultats des sous-tâches
+            context: Contexte d'exécution
+            
+        Returns:
+            Réponse finale synthétisée
+        """
+        # Appel à l'API Groq pour la synthèse
+        messages = self.synthesis_messages(query, subtask_results)
+        prompt_text = "".join(message["content"] for message in messages)
         
         try:
             response = self.groq_client.chat_completion(messages, temperature=0.7)
             synthesis = response['choices'][0]['message']['content']
+            tokens = response_tokens(response, prompt_text, synthesis)
+            logger.info(f"Synthèse: {tokens['prompt']} tokens de prompt "
+                        f"({estimate_tokens(messages[1]['content'])} de résultats), {tokens['completion']} générés")
             
             return {
                 "query": query,
                 "synthesis": synthesis,
                 "subtask_results": subtask_results,
-                "status": "completed"
+                "status": "completed",
+                "tokens": tokens
             }
         
         except Exception as e:
@@ -339,6 +730,81 @@ Requête originale de l'utilisateur : """
                 "status": "partial"
             }
 
+    def execute_chain_stream(self, query: str,
+                             initial_context: Dict[str, Any] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Exécute une chaîne de prompts en produisant des événements au fil de l'exécution :
+        plan établi, lancement et fin de chaque sous-tâche, puis tokens de la synthèse.
+        
+        Args:
+            query: Requête utilisateur complexe
+            initial_context: Contexte initial (données client, etc.)
+            
+        Returns:
+            Générateur d'événements ({"event": ..., "elapsed": secondes depuis le début de la chaîne}).
+            Le dernier événement ("done") porte le même résultat que execute_chain()
+        """
+        chain_start = time.monotonic()
+        context = initial_context or {}
+        context['query'] = query
+        
+        subtasks, plan_source = self.plan_query(query)
+        yield {
+            "event": "plan",
+            "plan_source": plan_source,
+            "subtasks": [{"id": task.get('id'), "title": task.get('title'), "type": task.get('type'),
+                          "dependencies": task.get('dependencies', [])} for task in subtasks],
+            "elapsed": time.monotonic() - chain_start
+        }
+        
+        # Les événements des sous-tâches sont relayés, les durées restant relatives au début de la chaîne
+        offset = time.monotonic() - chain_start
+        events = self.iter_subtasks(subtasks, context)
+        while True:
+            try:
+                event = next(events)
+            except StopIteration as done:
+                results, timeline = done.value
+                break
+            yield dict(event, elapsed=event["elapsed"] + offset)
+        
+        for task_id, result in results.items():
+            context[f"result_{task_id}"] = result.get('summary') or result.get('result', '')
+        
+        yield {"event": "synthesis_started", "elapsed": time.monotonic() - chain_start}
+        
+        messages = self.synthesis_messages(query, results)
+        synthesis = ""
+        first_token_at = None
+        status = "completed"
+        try:
+            for chunk in self.groq_client.chat_completion(messages, temperature=0.7, stream=True):
+                if 'choices' in chunk and len(chunk['choices']) > 0:
+                    content = chunk['choices'][0].get('delta', {}).get('content')
+                    if content:
+                        elapsed = time.monotonic() - chain_start
+                        if first_token_at is None:
+                            first_token_at = elapsed
+                        synthesis += content
+                        yield {"event": "synthesis_token", "content": content, "elapsed": elapsed}
+        except Exception as e:
+            logger.error(f"Erreur lors de la synthèse des résultats: {e}")
+            status = "partial"
+            if not synthesis:
+                synthesis = "Erreur lors de la synthèse des résultats. Voici les résultats bruts des sous-tâches."
+        
+        yield {
+            "event": "done",
+            "query": query,
+            "synthesis": synthesis,
+            "subtask_results": results,
+            "status": status,
+            "plan_source": plan_source,
+            "timeline": timeline,
+            "execution": dict(self.summarize_timeline(timeline), time_to_first_token=first_token_at),
+            "elapsed": time.monotonic() - chain_start
+        }
+
 # Exemple d'utilisation du chaînage de prompts
 def example_usage():
     """Exemple d'utilisation du chaînage de prompts."""
@@ -0,0 +1,414 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Module de limitation de débit côté client pour les appels à l'API Groq.
+Ce module combine des seaux à jetons (requêtes/min et tokens/min) et une limite de
+concurrence adaptative (AIMD) partagés par tous les clients Groq du processus.
+"""
+
+import os
+import time
+import random
+import asyncio
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Any, Optional, Iterator
+
+# Quotas du compte Groq (une valeur <= 0 désactive la limite correspondante ; désactivées par défaut,
+# à renseigner avec les quotas réels du compte)
+GROQ_REQUESTS_PER_MINUTE = int(os.getenv('GROQ_REQUESTS_PER_MINUTE', '0'))
+GROQ_TOKENS_PER_MINUTE = int(os.getenv('GROQ_TOKENS_PER_MINUTE', '0'))
+
+# Limite de concurrence adaptative
+GROQ_INITIAL_CONCURRENCY = int(os.getenv('GROQ_INITIAL_CONCURRENCY', '4'))
+GROQ_MIN_CONCURRENCY = int(os.getenv('GROQ_MIN_CONCURRENCY', '1'))
+GROQ_MAX_CONCURRENCY = int(os.getenv('GROQ_MAX_CONCURRENCY', '32'))
+
+# Nouvelles tentatives
+GROQ_MAX_RETRIES = int(os.getenv('GROQ_MAX_RETRIES', '3'))
+GROQ_RETRY_BASE_DELAY = float(os.getenv('GROQ_RETRY_BASE_DELAY', '0.5'))
+GROQ_RETRY_MAX_DELAY = float(os.getenv('GROQ_RETRY_MAX_DELAY', '20'))
+
+# Codes HTTP signalant une surcharge du fournisseur
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+def estimate_request_tokens(messages: List[Dict[str, str]], max_tokens: int) -> int:
+    """
+    Estime le nombre de tokens consommés par une requête (prompt + génération maximale).
+
+    Args:
+        messages: Messages de la requête
+        max_tokens: Nombre maximum de tokens à générer
+
+    Returns:
+        Estimation du nombre de tokens
+    """
+    # Approximation usuelle : ~4 caractères par token
+    prompt_chars = sum(len(message.get('content') or '') for message in messages)
+    return prompt_chars // 4 + len(messages) * 4 + max_tokens
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Convertit la valeur de l'en-tête Retry-After en secondes.
+
+    Args:
+        value: Valeur de l'en-tête (secondes ou date HTTP)
+
+    Returns:
+        Délai en secondes, ou None si l'en-tête est absent ou invalide
+    """
+    if not value:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        from email.utils import parsedate_to_datetime
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class RateLimitWaitClock:
+    """
+    Cumul du temps passé par une opération à attendre un créneau du limiteur,
+    lisible depuis un autre thread pendant l'attente.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._total = 0.0
+        self._since: Optional[float] = None
+
+    def start(self) -> None:
+        with self._lock:
+            if self._since is None:
+                self._since = time.monotonic()
+
+    def stop(self) -> None:
+        with self._lock:
+            if self._since is not None:
+                self._total += time.monotonic() - self._since
+                self._since = None
+
+    def elapsed(self) -> float:
+        """
+        Retourne le temps d'attente cumulé.
+
+        Returns:
+            Attente en secondes (y compris l'attente en cours)
+        """
+        with self._lock:
+            ongoing = time.monotonic() - self._since if self._since is not None else 0.0
+            return self._total + ongoing
+
+_wait_clock: ContextVar[Optional[RateLimitWaitClock]] = ContextVar('rate_limit_wait_clock', default=None)
+
+@contextmanager
+def measure_rate_limit_wait(clock: Optional[RateLimitWaitClock] = None) -> Iterator[RateLimitWaitClock]:
+    """
+    Mesure le temps passé à attendre le limiteur par les appels effectués dans le bloc
+    (dans le thread ou la tâche asyncio courante).
+
+    Args:
+        clock: Compteur à alimenter (créé si non spécifié)
+
+    Returns:
+        Compteur du temps d'attente
+    """
+    clock = clock or RateLimitWaitClock()
+    token = _wait_clock.set(clock)
+    try:
+        yield clock
+    finally:
+        _wait_clock.reset(token)
+
+class TokenBucket:
+    """
+    Seau à jetons rechargé en continu.
+    Non thread-safe : la synchronisation est assurée par GroqRateLimiter.
+    """
+
+    def __init__(self, per_minute: int):
+        """
+        Initialise le seau à jetons.
+
+        Args:
+            per_minute: Capacité rechargée par minute (<= 0 pour désactiver)
+        """
+        self.enabled = per_minute > 0
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.available = float(per_minute)
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.available = min(self.capacity, self.available + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """
+        Calcule l'attente nécessaire avant de pouvoir consommer une quantité.
+
+        Args:
+            amount: Quantité demandée
+            now: Horodatage monotone courant
+
+        Returns:
+            Attente en secondes (0 si la quantité est disponible)
+        """
+        if not self.enabled:
+            return 0.0
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.available >= amount:
+            return 0.0
+        return (amount - self.available) / self.rate
+
+    def consume(self, amount: float) -> None:
+        if self.enabled:
+            self.available -= min(amount, self.capacity)
+
+    def refund(self, amount: float) -> None:
+        if self.enabled:
+            self.available = min(self.capacity, self.available + amount)
+
+class GroqRateLimiter:
+    """
+    Limiteur de débit partagé pour les appels Groq.
+    Applique les quotas requêtes/min et tokens/min, une limite de concurrence AIMD
+    (augmentation additive sur succès, diminution multiplicative sur 429/5xx)
+    et respecte l'en-tête Retry-After pour tous les appelants.
+    """
+
+    def __init__(self,
+                 requests_per_minute: int = GROQ_REQUESTS_PER_MINUTE,
+                 tokens_per_minute: int = GROQ_TOKENS_PER_MINUTE,
+                 initial_concurrency: int = GROQ_INITIAL_CONCURRENCY,
+                 min_concurrency: int = GROQ_MIN_CONCURRENCY,
+                 max_concurrency: int = GROQ_MAX_CONCURRENCY,
+                 decrease_factor: float = 0.5,
+                 decrease_cooldown: float = 1.0,
+                 retry_base_delay: float = GROQ_RETRY_BASE_DELAY,
+                 retry_max_delay: float = GROQ_RETRY_MAX_DELAY):
+        """
+        Initialise le limiteur de débit.
+
+        Args:
+            requests_per_minute: Quota de requêtes par minute
+            tokens_per_minute: Quota de tokens par minute
+            initial_concurrency: Limite de concurrence initiale
+            min_concurrency: Limite de concurrence minimale
+            max_concurrency: Limite de concurrence maximale
+            decrease_factor: Facteur de réduction de la limite en cas de surcharge
+            decrease_cooldown: Délai minimal entre deux réductions (secondes)
+            retry_base_delay: Délai de base des nouvelles tentatives (secondes)
+            retry_max_delay: Délai maximal des nouvelles tentatives (secondes)
+        """
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+
+        self.min_concurrency = max(1, min_concurrency)
+        self.max_concurrency = max(self.min_concurrency, max_concurrency)
+        self.concurrency_limit = float(min(max(initial_concurrency, self.min_concurrency), self.max_concurrency))
+        self.decrease_factor = decrease_factor
+        self.decrease_cooldown = decrease_cooldown
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+
+        self.stats = {
+            "requests": 0,
+            "successes": 0,
+            "throttled": 0,
+            "server_errors": 0,
+            "wait_time": 0.0
+        }
+
+    def try_acquire(self, tokens: int) -> float:
+        """
+        Tente de réserver un créneau d'appel sans bloquer.
+
+        Args:
+            tokens: Nombre de tokens estimé pour la requête
+
+        Returns:
+            0 si le créneau est réservé, sinon l'attente estimée en secondes
+        """
+        with self._condition:
+            return self._try_acquire_locked(tokens)
+
+    def _try_acquire_locked(self, tokens: int) -> float:
+        now = time.monotonic()
+
+        if now < self.blocked_until:
+            return self.blocked_until - now
+
+        if self.in_flight >= int(self.concurrency_limit):
+            # Attente de la libération d'un créneau (notifiée par release)
+            return 0.05
+
+        wait = max(self.request_bucket.wait_time(1, now), self.token_bucket.wait_time(tokens, now))
+        if wait > 0:
+            return wait
+
+        self.request_bucket.consume(1)
+        self.token_bucket.consume(tokens)
+        self.in_flight += 1
+        self.stats["requests"] += 1
+        return 0.0
+
+    def acquire(self, tokens: int) -> None:
+        """
+        Réserve un créneau d'appel en bloquant le thread courant si nécessaire.
+
+        Args:
+            tokens: Nombre de tokens estimé pour la requête
+        """
+        started_at = time.monotonic()
+        clock = _wait_clock.get()
+        try:
+            with self._condition:
+                while True:
+                    wait = self._try_acquire_locked(tokens)
+                    if wait <= 0:
+                        break
+                    if clock is not None:
+                        clock.start()
+                    self._condition.wait(timeout=wait)
+                self.stats["wait_time"] += time.monotonic() - started_at
+        finally:
+            if clock is not None:
+                clock.stop()
+
+    async def acquire_async(self, tokens: int) -> None:
+        """
+        Réserve un créneau d'appel sans bloquer la boucle asyncio.
+
+        Args:
+            tokens: Nombre de tokens estimé pour la requête
+        """
+        started_at = time.monotonic()
+        clock = _wait_clock.get()
+        try:
+            while True:
+                wait = self.try_acquire(tokens)
+                if wait <= 0:
+                    break
+                if clock is not None:
+                    clock.start()
+                await asyncio.sleep(min(wait, 1.0))
+        finally:
+            if clock is not None:
+                clock.stop()
+        with self._condition:
+            self.stats["wait_time"] += time.monotonic() - started_at
+
+    def release(self,
+                status_code: Optional[int] = None,
+                retry_after: Optional[float] = None,
+                tokens_reserved: int = 0,
+                tokens_used: Optional[int] = None) -> None:
+        """
+        Libère un créneau d'appel et ajuste la limite de concurrence.
+
+        Args:
+            status_code: Code HTTP de la réponse (None si aucune réponse reçue)
+            retry_after: Délai Retry-After renvoyé par l'API (secondes)
+            tokens_reserved: Nombre de tokens réservé à l'acquisition
+            tokens_used: Nombre de tokens réellement consommés (si connu)
+        """
+        with self._condition:
+            self.in_flight = max(0, self.in_flight - 1)
+            now = time.monotonic()
+
+            if tokens_used is not None and tokens_used < tokens_reserved:
+                self.token_bucket.refund(tokens_reserved - tokens_used)
+
+            if status_code is not None and status_code in RETRYABLE_STATUS_CODES:
+                if status_code == 429:
+                    self.stats["throttled"] += 1
+                else:
+                    self.stats["server_errors"] += 1
+
+                if now - self._last_decrease >= self.decrease_cooldown:
+                    self.concurrency_limit = max(self.min_concurrency,
+                                                 self.concurrency_limit * self.decrease_factor)
+                    self._last_decrease = now
+
+                if retry_after:
+                    self.blocked_until = max(self.blocked_until, now + retry_after)
+
+            elif status_code is not None and status_code < 400:
+                self.stats["successes"] += 1
+                # Augmentation additive : +1 créneau par "fenêtre" de requêtes réussies
+                self.concurrency_limit = min(self.max_concurrency,
+                                             self.concurrency_limit + 1.0 / self.concurrency_limit)
+
+            self._condition.notify_all()
+
+    def retry_delay(self, attempt: int) -> float:
+        """
+        Calcule le délai avant une nouvelle tentative (backoff exponentiel avec jitter complet).
+        Le délai Retry-After est appliqué séparément par acquire().
+
+        Args:
+            attempt: Numéro de la tentative échouée (0 pour la première)
+
+        Returns:
+            Délai en secondes
+        """
+        return random.uniform(0, min(self.retry_max_delay, self.retry_base_delay * (2 ** attempt)))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Retourne les statistiques du limiteur.
+
+        Returns:
+            Statistiques (compteurs, limite de concurrence, appels en cours)
+        """
+        with self._condition:
+            stats = dict(self.stats)
+            stats["concurrency_limit"] = self.concurrency_limit
+            stats["in_flight"] = self.in_flight
+            return stats
+
+_shared_rate_limiter: Optional[GroqRateLimiter] = None
+_shared_rate_limiter_lock = threading.Lock()
+
+def get_groq_rate_limiter() -> GroqRateLimiter:
+    """
+    Retourne le limiteur de débit partagé par tous les clients Groq du processus.
+
+    Returns:
+        Limiteur de débit partagé
+    """
+    global _shared_rate_limiter
+    if _shared_rate_limiter is None:
+        with _shared_rate_limiter_lock:
+            if _shared_rate_limiter is None:
+                _shared_rate_limiter = GroqRateLimiter()
+    return _shared_rate_limiter
+
+def configure_groq_rate_limiter(**kwargs) -> GroqRateLimiter:
+    """
+    Remplace le limiteur de débit partagé (quotas, bornes de concurrence).
+
+    Args:
+        **kwargs: Paramètres transmis à GroqRateLimiter
+
+    Returns:
+        Nouveau limiteur de débit partagé
+    """
+    global _shared_rate_limiter
+    with _shared_rate_limiter_lock:
+        _shared_rate_limiter = GroqRateLimiter(**kwargs)
+    return _shared_rate_limiter
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Module de regroupement des requêtes LLM identiques (single-flight) pour le POC de chatbot IA AssurSanté.
+Les appelants simultanés d'une même requête non streamée partagent un seul appel en amont.
+"""
+
+import copy
+import threading
+from typing import Dict, Any, Optional, Callable
+
+class _InFlightCall:
+    """Appel non streamé en cours, partagé par plusieurs appelants."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+class SingleFlight:
+    """
+    Regroupement des requêtes identiques en cours d'exécution.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, _InFlightCall] = {}
+        self._lock = threading.Lock()
+        self.stats = {
+            "leaders": 0,
+            "coalesced": 0,
+            "timeouts": 0
+        }
+
+    def do(self, key: str, fn: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+        """
+        Exécute fn() une seule fois pour tous les appelants simultanés de la même clé.
+        Un appelant regroupé dont l'attente dépasse son timeout reçoit une TimeoutError,
+        l'appel en amont se poursuivant pour les autres.
+
+        Args:
+            key: Clé canonique de la requête
+            fn: Fonction effectuant l'appel en amont
+            timeout: Attente maximale d'un appelant regroupé (secondes, sans limite si non spécifiée)
+
+        Returns:
+            Résultat de l'appel (une copie pour les appelants regroupés)
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _InFlightCall()
+                self.stats["leaders"] += 1
+            else:
+                self.stats["coalesced"] += 1
+
+        if not leader:
+            if not call.done.wait(timeout):
+                with self._lock:
+                    self.stats["timeouts"] += 1
+                raise TimeoutError(f"Requête regroupée non terminée après {timeout:.1f}s")
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Retourne les statistiques de regroupement.
+
+        Returns:
+            Nombre d'appels en amont et d'appels regroupés
+        """
+        with self._lock:
+            stats = dict(self.stats)
+            stats["in_flight"] = len(self._calls)
+            return stats
+
+_shared_coalescer: Optional[SingleFlight] = None
+_shared_coalescer_lock = threading.Lock()
+
+def get_request_coalescer() -> SingleFlight:
+    """
+    Retourne le regroupeur de requêtes partagé par tous les clients Groq du processus.
+
+    Returns:
+        Regroupeur de requêtes partagé
+    """
+    global _shared_coalescer
+    if _shared_coalescer is None:
+        with _shared_coalescer_lock:
+            if _shared_coalescer is None:
+                _shared_coalescer = SingleFlight()
+    return _shared_coalescer
@@ -302,7 +302,7 @@ Fournissez votre évaluation au format JSON :
         ]
         
         try:
-            api_response = self.groq_client.chat_completion(messages, temperature=0.1)
+            api_response = self.groq_client.chat_completion(messages, temperature=0.1, cache=True)
             content = api_response['choices'][0]['message']['content']
             
             # Extraction du JSON de la réponse
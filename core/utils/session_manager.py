@@ -0,0 +1,598 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Module de gestion des sessions de conversation pour le POC de chatbot IA AssurSanté.
+L'état de chaque conversation est conservé sous une forme compacte dans un LRU borné ;
+les sessions inactives sont déchargées périodiquement vers Redis ou la memory-api et
+restaurées à la demande. Les tours sont traités par un petit pool d'orchestrateurs partagés,
+auxquels le résumé et le journal de la session sont rattachés le temps du tour.
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, List, Any, Optional, Callable, Iterator
+import requests
+from .chatbot_orchestrator import ChatbotOrchestrator
+from .conversation_summary import ConversationSummarizer
+from .conversation_journal import ConversationJournal
+from .llm_cache import REDIS_HOST, REDIS_PASSWORD
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Configuration des sessions
+SESSION_MAX_LIVE = int(os.getenv('SESSION_MAX_LIVE', '2000'))  # Sessions conservées en mémoire
+SESSION_IDLE_TIMEOUT = float(os.getenv('SESSION_IDLE_TIMEOUT', '900'))  # Secondes avant déchargement
+SESSION_STORE_TTL = int(os.getenv('SESSION_STORE_TTL', '86400'))  # Durée de conservation hors mémoire
+SESSION_WORKERS = int(os.getenv('SESSION_WORKERS', '8'))  # Tours traités simultanément
+SESSION_SWEEP_INTERVAL = float(os.getenv('SESSION_SWEEP_INTERVAL', '60'))  # Secondes entre deux déchargements (0 = désactivé)
+SESSION_JOURNAL_DIR = os.getenv('SESSION_JOURNAL_DIR', '')  # Répertoire des journaux de session (vide = désactivé)
+SESSION_STORE = os.getenv('SESSION_STORE', 'redis')  # 'redis' ou 'memory-api'
+MEMORY_API_URL = os.getenv('MEMORY_API_URL', 'http://memory-api:8000')
+MEMORY_API_TOKEN = os.getenv('MEMORY_API_TOKEN', '')
+
+class MessageRecord:
+    """Message de conversation compact (rôle interné, pas de dictionnaire par instance)."""
+
+    __slots__ = ("role", "content")
+
+    def __init__(self, role: str, content: str):
+        self.role = sys.intern(role)
+        self.content = content
+
+    def to_dict(self) -> Dict[str, str]:
+        return {"role": self.role, "content": self.content}
+
+    @classmethod
+    def from_dict(cls, message: Dict[str, str]) -> "MessageRecord":
+        return cls(message.get('role', 'user'), message.get('content', ''))
+
+def _deep_sizeof(value: Any) -> int:
+    """Taille mémoire approximative d'une structure JSON (octets)."""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(_deep_sizeof(k) + _deep_sizeof(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple)):
+        size += sum(_deep_sizeof(item) for item in value)
+    return size
+
+class SessionState:
+    """État compact d'une conversation."""
+
+    __slots__ = ("session_id", "messages", "summary", "client", "claim", "knowledge",
+                 "context_sections", "generation", "summarizer", "journal", "orchestrator",
+                 "last_access", "lock", "sync_lock")
+
+    def __init__(self, session_id: str,
+                 messages: Optional[List[MessageRecord]] = None,
+                 summary: str = "",
+                 client: Optional[Dict[str, Any]] = None,
+                 claim: Optional[Dict[str, Any]] = None,
+                 knowledge: Optional[List[Dict[str, Any]]] = None):
+        self.session_id = session_id
+        self.messages = messages or []
+        self.summary = summary
+        self.client = client
+        self.claim = claim
+        self.knowledge = knowledge or []
+        # Rendus de contexte mis en cache par l'orchestrateur (non persistés)
+        self.context_sections: Dict[str, Any] = {}
+        # Génération de l'historique (incrémentée à chaque effacement) et ressources
+        # propres à la session, rattachées à l'orchestrateur qui traite le tour
+        self.generation = 0
+        self.summarizer: Optional[ConversationSummarizer] = None
+        self.journal: Optional[ConversationJournal] = None
+        self.orchestrator: Optional[ChatbotOrchestrator] = None
+        self.last_access = time.monotonic()
+        # lock : tour en cours ; sync_lock : accès courts à l'état (restauration, export, résumés)
+        self.lock = threading.Lock()
+        self.sync_lock = threading.Lock()
+
+    def history(self) -> List[Dict[str, str]]:
+        return [message.to_dict() for message in self.messages]
+
+    def update_from(self, state: Dict[str, Any]) -> None:
+        """Reprend l'état exporté par ChatbotOrchestrator.export_session_state()."""
+        self.messages = [MessageRecord.from_dict(message) for message in state["history"]]
+        self.summary = state["summary"]
+        self.client = state["client"]
+        self.claim = state["claim"]
+        self.knowledge = state["knowledge"]
+        self.context_sections = state["context_sections"]
+        self.generation = state.get("generation", self.generation)
+
+    def apply_summary(self, generation: int, folded: List[Dict[str, str]], summary: str) -> None:
+        """
+        Remplace les messages résumés par le nouveau résumé (session hors tour, sous sync_lock).
+
+        Args:
+            generation: Génération de l'historique au moment de la planification
+            folded: Messages intégrés au résumé
+            summary: Nouveau résumé
+        """
+        count = len(folded)
+        if generation != self.generation or [m.to_dict() for m in self.messages[:count]] != folded:
+            logger.info(f"Résumé ignoré pour la session {self.session_id} : historique modifié entre-temps")
+            return
+        del self.messages[:count]
+        self.summary = summary
+        if self.journal is not None:
+            self.journal.record_summary(summary, len(self.messages))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "messages": self.history(),
+            "summary": self.summary,
+            "client": self.client,
+            "claim": self.claim,
+            "knowledge": self.knowledge
+        }
+
+    @classmethod
+    def from_dict(cls, session_id: str, data: Dict[str, Any]) -> "SessionState":
+        return cls(session_id,
+                   messages=[MessageRecord.from_dict(m) for m in data.get("messages", [])],
+                   summary=data.get("summary", ""),
+                   client=data.get("client"),
+                   claim=data.get("claim"),
+                   knowledge=data.get("knowledge"))
+
+    def memory_usage(self) -> int:
+        """
+        Estime la mémoire occupée par la session.
+
+        Returns:
+            Taille approximative (octets)
+        """
+        size = sys.getsizeof(self) + sys.getsizeof(self.messages)
+        for message in self.messages:
+            # Les rôles internés sont partagés entre toutes les sessions
+            size += sys.getsizeof(message) + sys.getsizeof(message.content)
+        size += _deep_sizeof(self.summary) + _deep_sizeof(self.client) + _deep_sizeof(self.claim)
+        size += _deep_sizeof(self.knowledge) + _deep_sizeof(self.context_sections)
+        return size
+
+class RedisSessionStore:
+    """Stockage des sessions déchargées dans Redis, avec expiration."""
+
+    def __init__(self, redis_client: Any, ttl: int = SESSION_STORE_TTL, prefix: str = "chatbot_session:"):
+        """
+        Initialise le stockage.
+
+        Args:
+            redis_client: Client Redis
+            ttl: Durée de conservation des sessions (secondes)
+            prefix: Préfixe des clés Redis
+        """
+        self.redis_client = redis_client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def save(self, session_id: str, data: Dict[str, Any]) -> None:
+        self.redis_client.setex(self.prefix + session_id, self.ttl, json.dumps(data, ensure_ascii=False))
+
+    def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        value = self.redis_client.get(self.prefix + session_id)
+        return json.loads(value) if value else None
+
+    def delete(self, session_id: str) -> None:
+        self.redis_client.delete(self.prefix + session_id)
+
+class MemoryApiSessionStore:
+    """Stockage des sessions déchargées via les endpoints /context de la memory-api."""
+
+    def __init__(self, access_token: str, base_url: str = MEMORY_API_URL,
+                 ttl: int = SESSION_STORE_TTL, timeout: float = 2.0):
+        """
+        Initialise le stockage.
+
+        Args:
+            access_token: Token d'accès Keycloak du service
+            base_url: URL de base de la memory-api
+            ttl: Durée de conservation des sessions (secondes)
+            timeout: Timeout des requêtes (secondes)
+        """
+        self.base_url = base_url.rstrip('/')
+        self.ttl = ttl
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers["Authorization"] = f"Bearer {access_token}"
+
+    def save(self, session_id: str, data: Dict[str, Any]) -> None:
+        response = self.session.post(f"{self.base_url}/context",
+                                     json={"key": f"session:{session_id}", "value": data, "ttl": self.ttl},
+                                     timeout=self.timeout)
+        response.raise_for_status()
+
+    def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        response = self.session.get(f"{self.base_url}/context/session:{session_id}", timeout=self.timeout)
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return response.json().get("value")
+
+    def delete(self, session_id: str) -> None:
+        response = self.session.delete(f"{self.base_url}/context/session:{session_id}", timeout=self.timeout)
+        if response.status_code != 404:
+            response.raise_for_status()
+
+def create_session_store() -> Optional[Any]:
+    """
+    Crée le stockage des sessions déchargées à partir de la configuration d'environnement.
+
+    Returns:
+        Stockage des sessions, ou None si aucun n'est disponible
+    """
+    if SESSION_STORE == 'memory-api' and MEMORY_API_TOKEN:
+        return MemoryApiSessionStore(MEMORY_API_TOKEN)
+
+    try:
+        import redis
+        client = redis.Redis(host=REDIS_HOST, port=6379, password=REDIS_PASSWORD,
+                             decode_responses=True, socket_timeout=0.5)
+        client.ping()
+        return RedisSessionStore(client)
+    except Exception as e:
+        logger.warning(f"Stockage des sessions indisponible, les sessions déchargées seront perdues: {e}")
+        return None
+
+class SessionManager:
+    """
+    Gestionnaire des conversations simultanées : états compacts dans un LRU borné,
+    déchargement des sessions inactives et pool d'orchestrateurs pour traiter les tours.
+    """
+
+    def __init__(self, store: Optional[Any] = None,
+                 max_sessions: int = SESSION_MAX_LIVE,
+                 idle_timeout: float = SESSION_IDLE_TIMEOUT,
+                 workers: int = SESSION_WORKERS,
+                 orchestrator_factory: Optional[Callable[[], ChatbotOrchestrator]] = None,
+                 sweep_interval: float = SESSION_SWEEP_INTERVAL,
+                 journal_dir: str = SESSION_JOURNAL_DIR):
+        """
+        Initialise le gestionnaire de sessions.
+
+        Args:
+            store: Stockage des sessions déchargées (RedisSessionStore ou MemoryApiSessionStore)
+            max_sessions: Nombre maximum de sessions conservées en mémoire
+            idle_timeout: Durée d'inactivité avant déchargement d'une session (secondes)
+            workers: Nombre d'orchestrateurs du pool (tours traités simultanément)
+            orchestrator_factory: Fonction créant un orchestrateur (ChatbotOrchestrator() par défaut)
+            sweep_interval: Intervalle du déchargement périodique des sessions inactives (secondes, 0 = désactivé)
+            journal_dir: Répertoire des journaux JSONL des sessions (vide pour ne pas journaliser)
+        """
+        self.store = store
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self._sessions: "OrderedDict[str, SessionState]" = OrderedDict()
+        # Sessions en cours d'enregistrement dans le stockage (encore restaurables sans lecture)
+        self._evicting: Dict[str, SessionState] = {}
+        self._lock = threading.Lock()
+
+        self.journal_dir = journal_dir
+
+        factory = orchestrator_factory or ChatbotOrchestrator
+        self._orchestrators: "queue.Queue[ChatbotOrchestrator]" = queue.Queue()
+        for _ in range(workers):
+            self._orchestrators.put(factory())
+        # Résumés de toutes les sessions calculés par un exécuteur partagé
+        self._summary_executor = ThreadPoolExecutor(max_workers=max(1, workers),
+                                                    thread_name_prefix="session-summarizer")
+
+        # Déchargement périodique : les sessions inactives sont libérées même sans nouvelle requête
+        self._closed = threading.Event()
+        self._sweeper: Optional[threading.Thread] = None
+        if sweep_interval > 0:
+            self._sweeper = threading.Thread(target=self._sweep, args=(sweep_interval,),
+                                             name="session-sweeper", daemon=True)
+            self._sweeper.start()
+
+        self.stats = {
+            "created": 0,
+            "restored": 0,
+            "evicted": 0,
+            "dropped": 0
+        }
+
+    def get_session(self, session_id: str) -> SessionState:
+        """
+        Retourne l'état d'une session, restauré depuis le stockage si nécessaire.
+
+        Args:
+            session_id: Identifiant de la session
+
+        Returns:
+            État de la session
+        """
+        with self._lock:
+            state = self._sessions.get(session_id) or self._evicting.get(session_id)
+            if state is not None:
+                self._sessions[session_id] = state
+                self._sessions.move_to_end(session_id)
+                state.last_access = time.monotonic()
+                return state
+
+        data = None
+        if self.store is not None:
+            try:
+                data = self.store.load(session_id)
+            except Exception as e:
+                logger.error(f"Erreur lors de la restauration de la session {session_id}: {e}")
+
+        restored = SessionState.from_dict(session_id, data) if data else SessionState(session_id)
+
+        with self._lock:
+            # Une restauration concurrente de la même session a pu aboutir entre-temps
+            state = self._sessions.setdefault(session_id, restored)
+            if state is restored:
+                self.stats["restored" if data else "created"] += 1
+            self._sessions.move_to_end(session_id)
+            state.last_access = time.monotonic()
+            over_capacity = len(self._sessions) > self.max_sessions
+
+        # Les sessions inactives sont déchargées par le thread périodique ; seul le
+        # dépassement de capacité est traité ici
+        if over_capacity:
+            self._evict(self._select_victims(time.monotonic(), include_idle=False))
+        return state
+
+    def _sweep(self, interval: float) -> None:
+        """Boucle du déchargement périodique des sessions inactives."""
+        while not self._closed.wait(interval):
+            try:
+                self.evict_idle()
+            except Exception as e:
+                logger.error(f"Erreur lors du déchargement périodique des sessions: {e}")
+
+    def _select_victims(self, now: float, include_idle: bool = True) -> List[SessionState]:
+        """Retire du LRU les sessions excédentaires et, si demandé, inactives (hors sessions en cours de tour)."""
+        victims = []
+        with self._lock:
+            for session_id, state in list(self._sessions.items()):
+                over_capacity = len(self._sessions) > self.max_sessions
+                if not over_capacity and (not include_idle or now - state.last_access < self.idle_timeout):
+                    # Les sessions suivantes sont plus récentes (ordre LRU)
+                    break
+                if state.lock.locked():
+                    continue
+                del self._sessions[session_id]
+                self._evicting[session_id] = state
+                victims.append(state)
+        return victims
+
+    def evict_idle(self) -> int:
+        """
+        Décharge vers le stockage les sessions inactives et celles dépassant la capacité.
+
+        Returns:
+            Nombre de sessions déchargées
+        """
+        return self._evict(self._select_victims(time.monotonic()))
+
+    def _evict(self, victims: List[SessionState]) -> int:
+        """Libère les ressources des sessions retirées du LRU et les enregistre dans le stockage."""
+        for state in victims:
+            with state.lock:
+                with self._lock:
+                    closed = self._evicting.get(state.session_id) is not state
+                if closed:
+                    # Session terminée par close_session entre-temps : ni enregistrement ni libération
+                    continue
+                try:
+                    self._release_session_resources(state)
+                    if self.store is None:
+                        self.stats["dropped"] += 1
+                        continue
+                    with state.sync_lock:
+                        data = state.to_dict()
+                    self.store.save(state.session_id, data)
+                    self.stats["evicted"] += 1
+                except Exception as e:
+                    self.stats["dropped"] += 1
+                    logger.error(f"Erreur lors du déchargement de la session {state.session_id}: {e}")
+                finally:
+                    with self._lock:
+                        if self._evicting.get(state.session_id) is state:
+                            del self._evicting[state.session_id]
+
+        return len(victims)
+
+    def _release_session_resources(self, state: SessionState) -> None:
+        """Attend le résumé en cours de la session et ferme son journal."""
+        if state.summarizer is not None:
+            try:
+                state.summarizer.wait(timeout=30)
+            except Exception as e:
+                logger.warning(f"Résumé de la session {state.session_id} abandonné: {e}")
+            state.summarizer = None
+        if state.journal is not None:
+            state.journal.close()
+            state.journal = None
+
+    def _session_summarizer(self, state: SessionState,
+                            orchestrator: ChatbotOrchestrator) -> Optional[ConversationSummarizer]:
+        """Résumé propre à la session, configuré comme celui de l'orchestrateur du pool."""
+        template = orchestrator.summarizer
+        if state.summarizer is None and template is not None:
+            state.summarizer = ConversationSummarizer(template.groq_client,
+                                                      threshold=template.threshold,
+                                                      keep_recent=template.keep_recent,
+                                                      max_summary_tokens=template.max_summary_tokens,
+                                                      executor=self._summary_executor)
+        return state.summarizer
+
+    def _session_journal(self, state: SessionState,
+                         orchestrator: ChatbotOrchestrator) -> Optional[ConversationJournal]:
+        """Journal propre à la session (ouvert au premier tour si journal_dir est configuré)."""
+        if state.journal is None and self.journal_dir:
+            os.makedirs(self.journal_dir, exist_ok=True)
+            state.journal = orchestrator.create_journal(os.path.join(self.journal_dir, f"{state.session_id}.jsonl"))
+        return state.journal
+
+    @staticmethod
+    def _apply_session_summary(state: SessionState, generation: int,
+                               folded: List[Dict[str, str]], summary: str) -> None:
+        """Applique un résumé calculé en arrière-plan à la session, qu'un tour soit en cours ou non."""
+        with state.sync_lock:
+            if state.orchestrator is not None:
+                state.orchestrator.apply_summary(generation, folded, summary)
+            else:
+                state.apply_summary(generation, folded, summary)
+
+    @contextmanager
+    def orchestrator_for(self, session_id: str) -> Iterator[ChatbotOrchestrator]:
+        """
+        Prête un orchestrateur du pool chargé avec l'état de la session, son résumé et son
+        journal ; l'état modifié est recopié dans la session à la sortie du bloc.
+
+        Args:
+            session_id: Identifiant de la session
+
+        Returns:
+            Orchestrateur chargé avec la session
+        """
+        state = self.get_session(session_id)
+        with state.lock:
+            orchestrator = self._orchestrators.get()
+            default_summarizer = orchestrator.summarizer
+            completed = False
+            try:
+                summarizer = self._session_summarizer(state, orchestrator)
+                journal = self._session_journal(state, orchestrator)
+                with state.sync_lock:
+                    orchestrator.restore_session_state(state.history(), state.summary, state.client,
+                                                       state.claim, state.knowledge, state.context_sections,
+                                                       generation=state.generation)
+                    orchestrator.summarizer = summarizer
+                    orchestrator.journal = journal
+                    orchestrator.summary_sink = lambda generation, folded, summary: \
+                        self._apply_session_summary(state, generation, folded, summary)
+                    state.orchestrator = orchestrator
+                yield orchestrator
+                completed = True
+            finally:
+                with state.sync_lock:
+                    if state.orchestrator is orchestrator:
+                        if completed:
+                            state.update_from(orchestrator.export_session_state())
+                        state.orchestrator = None
+                    orchestrator.summarizer = default_summarizer
+                    orchestrator.journal = None
+                    orchestrator.summary_sink = None
+                state.last_access = time.monotonic()
+                self._orchestrators.put(orchestrator)
+
+    def process_message(self, session_id: str, user_message: str, temperature: float = 0.7) -> str:
+        """
+        Traite un message utilisateur dans le contexte de sa session.
+
+        Args:
+            session_id: Identifiant de la session
+            user_message: Message de l'utilisateur
+            temperature: Température pour le sampling (0.0 à 1.0)
+
+        Returns:
+            Réponse générée
+        """
+        with self.orchestrator_for(session_id) as orchestrator:
+            return orchestrator.process_message(user_message, temperature=temperature)
+
+    def set_context(self, session_id: str,
+                    client: Optional[Dict[str, Any]] = None,
+                    claim: Optional[Dict[str, Any]] = None,
+                    knowledge: Optional[List[Dict[str, Any]]] = None) -> None:
+        """
+        Met à jour le contexte d'une session (les valeurs None sont ignorées).
+
+        Args:
+            session_id: Identifiant de la session
+            client: Données du client
+            claim: Données de la réclamation
+            knowledge: Éléments de la base de connaissances
+        """
+        state = self.get_session(session_id)
+        with state.lock:
+            if client is not None:
+                state.client = client
+            if claim is not None:
+                state.claim = claim
+            if knowledge is not None:
+                state.knowledge = knowledge
+            state.last_access = time.monotonic()
+
+    def close_session(self, session_id: str) -> None:
+        """
+        Termine une session et supprime son état (mémoire et stockage).
+
+        Args:
+            session_id: Identifiant de la session
+        """
+        with self._lock:
+            state = self._sessions.pop(session_id, None)
+            # Une session en cours de déchargement est retirée de l'ensemble : son déchargement
+            # s'interrompt s'il n'a pas commencé, sinon le verrou de la session attend sa fin
+            evicting = self._evicting.pop(session_id, None)
+            state = state or evicting
+        if state is not None:
+            with state.lock:
+                self._release_session_resources(state)
+        if self.store is not None:
+            try:
+                self.store.delete(session_id)
+            except Exception as e:
+                logger.warning(f"Erreur lors de la suppression de la session {session_id}: {e}")
+
+    def close(self) -> None:
+        """Arrête le déchargement périodique et décharge toutes les sessions en mémoire."""
+        self._closed.set()
+        if self._sweeper is not None:
+            self._sweeper.join()
+        idle_timeout, self.idle_timeout = self.idle_timeout, 0
+        try:
+            self.evict_idle()
+        finally:
+            self.idle_timeout = idle_timeout
+        self._summary_executor.shutdown(wait=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Retourne les statistiques des sessions.
+
+        Returns:
+            Nombre de sessions en mémoire, messages, mémoire estimée et compteurs
+        """
+        with self._lock:
+            sessions = list(self._sessions.values())
+
+        stats = dict(self.stats)
+        stats.update({
+            "live_sessions": len(sessions),
+            "max_sessions": self.max_sessions,
+            "messages": sum(len(state.messages) for state in sessions),
+            "memory_bytes": sum(state.memory_usage() for state in sessions)
+        })
+        return stats
+
+# Exemple d'utilisation
+def example_usage():
+    """Exemple de traitement de plusieurs conversations avec le gestionnaire de sessions."""
+    manager = SessionManager(store=create_session_store(), workers=2)
+
+    manager.set_context("appel-1", client={"id": 42, "nom": "Dupont", "prenom": "Jean", "contrats": []})
+    print(manager.process_message("appel-1", "Bonjour, quelles sont mes garanties optique ?"))
+    print(manager.process_message("appel-2", "Comment résilier mon contrat ?"))
+
+    print(json.dumps(manager.get_stats(), indent=2))
+
+if __name__ == "__main__":
+    example_usage()
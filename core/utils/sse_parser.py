@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Module d'analyse incrémentale des streams SSE de l'API Groq pour le POC de chatbot IA AssurSanté.
+Le parseur travaille directement sur les octets reçus, gère les événements coupés entre
+deux lectures réseau et mesure la latence du premier token et entre tokens.
+"""
+
+import re
+import json
+import time
+import logging
+import threading
+from typing import Dict, List, Any, Optional, Iterator, Iterable, Callable
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Chunk de contenu simple : un seul delta ne contenant que le texte, génération non terminée
+_FAST_DELTA = re.compile(rb'"delta":\{"content":"((?:[^"\\]|\\.)*)"\}')
+_FINISH_NULL = b'"finish_reason":null'
+_DATA_PREFIX = b'data:'
+_DONE = b'[DONE]'
+
+class StreamMetrics:
+    """Mesures de latence d'une réponse en streaming."""
+
+    def __init__(self, started_at: Optional[float] = None):
+        """
+        Initialise les mesures.
+
+        Args:
+            started_at: Horodatage monotone de l'envoi de la requête (maintenant si non spécifié)
+        """
+        self.started_at = started_at if started_at is not None else time.monotonic()
+        self.first_token_at: Optional[float] = None
+        self.last_token_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.token_count = 0
+        self.inter_token_latencies: List[float] = []
+
+    def record_token(self, now: float) -> None:
+        if self.first_token_at is None:
+            self.first_token_at = now
+        else:
+            self.inter_token_latencies.append(now - self.last_token_at)
+        self.last_token_at = now
+        self.token_count += 1
+
+    @property
+    def time_to_first_token(self) -> Optional[float]:
+        """Délai entre l'envoi de la requête et le premier token (secondes)."""
+        if self.first_token_at is None:
+            return None
+        return self.first_token_at - self.started_at
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Retourne un résumé des mesures.
+
+        Returns:
+            TTFT, latences inter-tokens moyenne et p95, nombre de chunks et durée totale
+        """
+        latencies = sorted(self.inter_token_latencies)
+        end = self.finished_at or self.last_token_at
+        return {
+            "time_to_first_token": self.time_to_first_token,
+            "mean_inter_token_latency": sum(latencies) / len(latencies) if latencies else None,
+            "p95_inter_token_latency": latencies[int(0.95 * (len(latencies) - 1))] if latencies else None,
+            "token_chunks": self.token_count,
+            "total_time": end - self.started_at if end is not None else None
+        }
+
+def summarize_stream_metrics(history: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Agrège les mesures de plusieurs streams.
+
+    Args:
+        history: Résumés StreamMetrics.to_dict() des derniers streams
+
+    Returns:
+        Nombre de streams mesurés, TTFT médian et p95, latence inter-tokens moyenne
+    """
+    history = list(history)
+    ttfts = sorted(m["time_to_first_token"] for m in history if m["time_to_first_token"] is not None)
+    itls = [m["mean_inter_token_latency"] for m in history if m["mean_inter_token_latency"] is not None]
+
+    return {
+        "streams": len(history),
+        "p50_time_to_first_token": ttfts[len(ttfts) // 2] if ttfts else None,
+        "p95_time_to_first_token": ttfts[int(0.95 * (len(ttfts) - 1))] if ttfts else None,
+        "mean_inter_token_latency": sum(itls) / len(itls) if itls else None
+    }
+
+class SSEStreamParser:
+    """
+    Parseur SSE incrémental alimenté par des blocs d'octets.
+    Sur le chemin rapide, seul le champ delta.content est décodé ; les autres
+    événements (rôle, fin de génération, usage) sont décodés intégralement.
+    """
+
+    def __init__(self, metrics: Optional[StreamMetrics] = None, fast_path: bool = True):
+        """
+        Initialise le parseur.
+
+        Args:
+            metrics: Mesures de latence à alimenter (créées si non spécifiées)
+            fast_path: Si True, les chunks de contenu simples sont réduits à leur delta
+        """
+        self.metrics = metrics or StreamMetrics()
+        self.fast_path = fast_path
+        self.done = False
+        self.decode_errors = 0
+        self._buffer = bytearray()
+        self._scan_from = 0
+
+    def feed(self, data: bytes) -> List[Dict[str, Any]]:
+        """
+        Ajoute des octets reçus et retourne les chunks complets qu'ils terminent.
+
+        Args:
+            data: Octets reçus du réseau
+
+        Returns:
+            Chunks JSON décodés
+        """
+        if self.done or not data:
+            return []
+
+        buffer = self._buffer
+        buffer += data
+        now = time.monotonic()
+        chunks = []
+        start = 0
+
+        while True:
+            end = buffer.find(b'\n', self._scan_from)
+            if end < 0:
+                # Événement incomplet : la suite arrivera avec la prochaine lecture
+                self._scan_from = len(buffer)
+                break
+            line = bytes(buffer[start:end]).rstrip(b'\r')
+            start = self._scan_from = end + 1
+
+            if not line.startswith(_DATA_PREFIX):
+                # Ligne vide (fin d'événement), commentaire ou autre champ SSE
+                continue
+
+            payload = line[5:].lstrip(b' ')
+            if payload.startswith(_DONE):
+                self.done = True
+                break
+
+            chunk = self._decode(payload)
+            if chunk is None:
+                continue
+
+            if self._has_content(chunk):
+                self.metrics.record_token(now)
+            chunks.append(chunk)
+
+        del buffer[:start]
+        self._scan_from -= start
+        if self.done:
+            self.metrics.finished_at = now
+        return chunks
+
+    def _decode(self, payload: bytes) -> Optional[Dict[str, Any]]:
+        if self.fast_path and _FINISH_NULL in payload and payload.count(b'"delta"') == 1:
+            match = _FAST_DELTA.search(payload)
+            if match:
+                raw = match.group(1)
+                if b'\\' in raw:
+                    content = json.loads(b'"' + raw + b'"')
+                else:
+                    content = raw.decode('utf-8')
+                return {"choices": [{"index": 0, "delta": {"content": content}, "finish_reason": None}]}
+
+        try:
+            return json.loads(payload)
+        except ValueError:
+            self.decode_errors += 1
+            logger.debug(f"Erreur de décodage JSON du chunk SSE: {payload[:200]!r}")
+            return None
+
+    @staticmethod
+    def _has_content(chunk: Dict[str, Any]) -> bool:
+        choices = chunk.get('choices')
+        return bool(choices) and bool(choices[0].get('delta', {}).get('content'))
+
+class CompletionStream:
+    """
+    Itérateur des chunks d'une complétion en streaming, exposant ses mesures de latence.
+    Les ressources du stream (connexion, créneau du limiteur) sont libérées une seule fois :
+    à la fin du stream, à sa fermeture ou à sa destruction, même s'il n'a jamais été parcouru.
+    """
+
+    _released = True  # Rien à libérer tant que l'initialisation n'est pas terminée
+
+    def __init__(self, chunks: Iterator[Dict[str, Any]], metrics: StreamMetrics,
+                 on_close: Optional[Callable[[], None]] = None):
+        """
+        Initialise l'itérateur.
+
+        Args:
+            chunks: Générateur des chunks décodés
+            metrics: Mesures de latence du stream
+            on_close: Libération des ressources du stream
+        """
+        self._chunks = chunks
+        self.metrics = metrics
+        self._on_close = on_close
+        self._lock = threading.Lock()
+        self._released = False
+
+    def _release(self) -> None:
+        with self._lock:
+            if self._released:
+                return
+            self._released = True
+        if self._on_close is not None:
+            self._on_close()
+
+    def __iter__(self) -> "CompletionStream":
+        return self
+
+    def __next__(self) -> Dict[str, Any]:
+        try:
+            return next(self._chunks)
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self) -> None:
+        """Interrompt le stream et libère la connexion."""
+        try:
+            self._chunks.close()
+        finally:
+            self._release()
+
+    def __enter__(self) -> "CompletionStream":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def __del__(self):
+        # Stream abandonné sans être fermé : la connexion et le créneau ne doivent pas rester réservés
+        if not self._released:
+            self.close()
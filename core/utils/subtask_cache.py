@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Module de mémoïsation des sous-tâches de chaînage de prompts pour le POC de chatbot IA AssurSanté.
+Les résultats des sous-tâches sont partagés entre les chaînes du processus (donc entre requêtes et
+utilisateurs), indexés par type de tâche, description normalisée, résultats des dépendances et
+contexte de base, avec une durée de vie et un nombre d'entrées bornés.
+"""
+
+import os
+import copy
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Tuple
+from .chain_planner import normalize_query
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Configuration du cache
+CHAIN_SUBTASK_CACHE_ENABLED = os.getenv('CHAIN_SUBTASK_CACHE_ENABLED', 'true').lower() == 'true'
+CHAIN_SUBTASK_CACHE_SIZE = int(os.getenv('CHAIN_SUBTASK_CACHE_SIZE', '1024'))
+CHAIN_SUBTASK_CACHE_TTL = float(os.getenv('CHAIN_SUBTASK_CACHE_TTL', '900'))
+
+def context_fingerprint(context: Dict[str, Any]) -> str:
+    """
+    Calcule l'empreinte d'un contexte de base.
+
+    Args:
+        context: Contexte de base (données client, etc.)
+
+    Returns:
+        Empreinte SHA-256 du contexte
+    """
+    canonical = json.dumps(context, ensure_ascii=False, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+def subtask_key(subtask: Dict[str, Any], dependency_results: List[str], base_fingerprint: str) -> str:
+    """
+    Calcule la clé de mémoïsation d'une sous-tâche.
+
+    Args:
+        subtask: Sous-tâche
+        dependency_results: Résultats transmis par ses dépendances
+        base_fingerprint: Empreinte du contexte de base (context_fingerprint())
+
+    Returns:
+        Empreinte SHA-256 de la sous-tâche
+    """
+    canonical = json.dumps(
+        {
+            "type": str(subtask.get('type', '')).lower(),
+            "description": normalize_query(subtask.get('description', '')),
+            "dependencies": sorted(hashlib.sha256(r.encode('utf-8')).hexdigest() for r in dependency_results),
+            "context": base_fingerprint
+        },
+        sort_keys=True, separators=(',', ':')
+    )
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+def merge_duplicate_subtasks(subtasks: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Dict[str, str]]:
+    """
+    Fusionne les sous-tâches identiques d'un plan (même type, même description normalisée
+    et mêmes dépendances) ; les dépendances vers une sous-tâche fusionnée sont reportées
+    sur la sous-tâche conservée.
+
+    Args:
+        subtasks: Plan à dédoublonner
+
+    Returns:
+        Tuple (plan dédoublonné, identifiant conservé par identifiant fusionné)
+    """
+    merged: Dict[str, str] = {}
+    changed = True
+    while changed:
+        changed = False
+        seen: Dict[Tuple, str] = {}
+        kept = []
+        for task in subtasks:
+            task_id = str(task.get('id'))
+            dependencies = sorted({merged.get(str(d), str(d)) for d in task.get('dependencies', [])})
+            signature = (str(task.get('type', '')).lower(), normalize_query(task.get('description', '')),
+                         tuple(dependencies))
+            if signature in seen:
+                merged[task_id] = seen[signature]
+                changed = True
+                continue
+            seen[signature] = task_id
+            kept.append(dict(task, dependencies=dependencies))
+        subtasks = kept
+
+    # Fusions en chaîne (a -> b -> c) ramenées à l'identifiant finalement conservé
+    for task_id in merged:
+        while merged[task_id] in merged:
+            merged[task_id] = merged[merged[task_id]]
+    return subtasks, merged
+
+class SubtaskResultCache:
+    """Cache LRU thread-safe des résultats de sous-tâches, avec expiration."""
+
+    def __init__(self, max_entries: int = CHAIN_SUBTASK_CACHE_SIZE, ttl: float = CHAIN_SUBTASK_CACHE_TTL):
+        """
+        Initialise le cache.
+
+        Args:
+            max_entries: Nombre maximum de résultats conservés
+            ttl: Durée de vie d'un résultat (secondes)
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "stores": 0}
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Recherche le résultat d'une sous-tâche.
+
+        Args:
+            key: Clé de la sous-tâche (subtask_key())
+
+        Returns:
+            Copie du résultat en cache, ou None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                del self._entries[key]
+                self.stats["expired"] += 1
+                entry = None
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return copy.deepcopy(entry[1])
+
+    def set(self, key: str, result: Dict[str, Any]) -> None:
+        """
+        Enregistre le résultat d'une sous-tâche.
+
+        Args:
+            key: Clé de la sous-tâche (subtask_key())
+            result: Résultat de la sous-tâche
+        """
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, copy.deepcopy(result))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self.stats["stores"] += 1
+
+    def clear(self) -> None:
+        """Vide le cache."""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Retourne les statistiques du cache.
+
+        Returns:
+            Compteurs de hits/misses, taux de hit et nombre d'entrées
+        """
+        with self._lock:
+            stats = dict(self.stats)
+            stats["entries"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+_shared_cache: Optional[SubtaskResultCache] = None
+_shared_cache_lock = threading.Lock()
+
+def get_subtask_result_cache() -> SubtaskResultCache:
+    """
+    Retourne le cache des résultats de sous-tâches partagé par toutes les chaînes du processus.
+
+    Returns:
+        Cache partagé
+    """
+    global _shared_cache
+    if _shared_cache is None:
+        with _shared_cache_lock:
+            if _shared_cache is None:
+                _shared_cache = SubtaskResultCache()
+    return _shared_cache
+
+def configure_subtask_result_cache(**kwargs) -> SubtaskResultCache:
+    """
+    Remplace le cache partagé par un cache configuré.
+
+    Args:
+        **kwargs: Paramètres de SubtaskResultCache (max_entries, ttl)
+
+    Returns:
+        Nouveau cache partagé
+    """
+    global _shared_cache
+    with _shared_cache_lock:
+        _shared_cache = SubtaskResultCache(**kwargs)
+    return _shared_cache
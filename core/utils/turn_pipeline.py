@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Module de traitement asynchrone d'un tour de conversation pour le POC de chatbot IA AssurSanté.
+Les données client, réclamation et connaissances sont récupérées en parallèle auprès de la
+look-api, chacune avec son propre délai maximal, avant l'appel au LLM : la latence avant
+l'appel au LLM est celle de la recherche la plus lente, et non leur somme.
+"""
+
+import os
+import time
+import asyncio
+import logging
+from typing import Dict, List, Any, Optional, Awaitable
+import httpx
+from .chatbot_orchestrator import ChatbotOrchestrator
+from .async_groq_client import AsyncGroqClient
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Configuration de la look-api
+LOOK_API_URL = os.getenv('LOOK_API_URL', 'http://look-api:8000')
+LOOK_API_CLIENT_DEADLINE = float(os.getenv('LOOK_API_CLIENT_DEADLINE', '0.5'))
+LOOK_API_CLAIM_DEADLINE = float(os.getenv('LOOK_API_CLAIM_DEADLINE', '0.5'))
+LOOK_API_KNOWLEDGE_DEADLINE = float(os.getenv('LOOK_API_KNOWLEDGE_DEADLINE', '0.8'))
+
+class LookApiClient:
+    """Client asynchrone des endpoints de recherche de la look-api."""
+
+    def __init__(self, access_token: str, base_url: str = LOOK_API_URL,
+                 http_client: Optional[httpx.AsyncClient] = None):
+        """
+        Initialise le client.
+
+        Args:
+            access_token: Token d'accès Keycloak de l'agent
+            base_url: URL de base de la look-api
+            http_client: Client HTTP asynchrone à réutiliser (créé si non spécifié)
+        """
+        self.base_url = base_url.rstrip('/')
+        self.headers = {"Authorization": f"Bearer {access_token}"}
+        self._owns_http_client = http_client is None
+        self.http_client = http_client or httpx.AsyncClient(
+            timeout=httpx.Timeout(5.0, connect=1.0),
+            limits=httpx.Limits(max_keepalive_connections=8)
+        )
+
+    async def aclose(self) -> None:
+        """Ferme le client HTTP s'il a été créé par ce client."""
+        if self._owns_http_client:
+            await self.http_client.aclose()
+
+    async def _search(self, path: str, payload: Dict[str, Any],
+                      params: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        response = await self.http_client.post(f"{self.base_url}{path}", headers=self.headers,
+                                               json=payload, params=params)
+        response.raise_for_status()
+        return response.json().get('results', [])
+
+    async def search_client(self, criteria: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Recherche un client (endpoint /clients/search).
+
+        Args:
+            criteria: Critères de recherche (nom, prenom, email, numero_contrat...)
+
+        Returns:
+            Premier client trouvé, ou None
+        """
+        results = await self._search("/clients/search", criteria, params={"page_size": 1})
+        return results[0] if results else None
+
+    async def search_claim(self, criteria: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Recherche une réclamation (endpoint /reclamations/search).
+
+        Args:
+            criteria: Critères de recherche (client_id, numero_reclamation, statut...)
+
+        Returns:
+            Première réclamation trouvée, ou None
+        """
+        results = await self._search("/reclamations/search", criteria, params={"page_size": 1})
+        return results[0] if results else None
+
+    async def search_knowledge(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
+        """
+        Recherche dans la base de connaissances (endpoint /knowledge/search).
+
+        Args:
+            query: Requête en langage naturel
+            top_k: Nombre maximum de documents
+
+        Returns:
+            Documents trouvés, avec leur similarité comme score de pertinence
+        """
+        results = await self._search("/knowledge/search", {"query": query, "top_k": top_k})
+        return [dict(item, score=item.get('score', item.get('similarity', 0.0))) for item in results]
+
+async def run_with_deadline(name: str, call: Optional[Awaitable], deadline: float,
+                            timings: Dict[str, Any]) -> Any:
+    """
+    Exécute une récupération de contexte avec un délai maximal et enregistre sa durée.
+
+    Args:
+        name: Nom de la récupération
+        call: Coroutine de récupération (None si la récupération n'est pas demandée)
+        deadline: Délai maximal (secondes)
+        timings: Dictionnaire recevant la durée et le statut de la récupération
+
+    Returns:
+        Résultat de la récupération, ou None (non demandée, délai dépassé ou erreur)
+    """
+    if call is None:
+        timings[name] = {"status": "skipped", "duration": 0.0}
+        return None
+
+    started_at = time.monotonic()
+    status = "ok"
+    result = None
+    try:
+        result = await asyncio.wait_for(call, timeout=deadline)
+    except asyncio.TimeoutError:
+        status = "timeout"
+        logger.warning(f"Récupération '{name}' abandonnée après {deadline:.2f}s")
+    except (httpx.HTTPError, ValueError) as e:
+        status = "error"
+        logger.error(f"Erreur lors de la récupération '{name}': {e}")
+
+    timings[name] = {"status": status, "duration": time.monotonic() - started_at}
+    return result
+
+class AsyncTurnPipeline:
+    """
+    Traitement asynchrone complet d'un tour de conversation : récupération parallèle
+    du contexte, assemblage du prompt par l'orchestrateur, puis appel au LLM.
+    Les étapes synchrones de l'orchestrateur (journal, rattrapage du résumé par le LLM)
+    s'exécutent dans un thread pour ne pas bloquer la boucle d'événements.
+    """
+
+    def __init__(self, orchestrator: ChatbotOrchestrator,
+                 look_api: LookApiClient,
+                 groq_client: Optional[AsyncGroqClient] = None,
+                 client_deadline: float = LOOK_API_CLIENT_DEADLINE,
+                 claim_deadline: float = LOOK_API_CLAIM_DEADLINE,
+                 knowledge_deadline: float = LOOK_API_KNOWLEDGE_DEADLINE,
+                 knowledge_top_k: int = 5):
+        """
+        Initialise le pipeline.
+
+        Args:
+            orchestrator: Orchestrateur portant l'historique et le contexte de la conversation
+            look_api: Client de la look-api
+            groq_client: Client Groq asynchrone (créé avec le modèle de l'orchestrateur si non spécifié)
+            client_deadline: Délai maximal de la recherche client (secondes)
+            claim_deadline: Délai maximal de la recherche de réclamation (secondes)
+            knowledge_deadline: Délai maximal de la recherche de connaissances (secondes)
+            knowledge_top_k: Nombre maximum de documents de connaissances
+        """
+        self.orchestrator = orchestrator
+        self.look_api = look_api
+        self.groq_client = groq_client or AsyncGroqClient(
+            api_key=orchestrator.groq_client.api_key, model=orchestrator.groq_client.model)
+        self.deadlines = {
+            "client": client_deadline,
+            "claim": claim_deadline,
+            "knowledge": knowledge_deadline
+        }
+        self.knowledge_top_k = knowledge_top_k
+
+    async def fetch_context(self, client_criteria: Optional[Dict[str, Any]] = None,
+                            claim_criteria: Optional[Dict[str, Any]] = None,
+                            knowledge_query: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Récupère en parallèle le contexte du tour et le transmet à l'orchestrateur.
+        Un contexte non reçu à temps conserve sa valeur du tour précédent.
+
+        Args:
+            client_criteria: Critères de recherche du client (pas de recherche si None)
+            claim_criteria: Critères de recherche de la réclamation (pas de recherche si None)
+            knowledge_query: Requête de la base de connaissances (pas de recherche si None)
+
+        Returns:
+            Durée et statut de chaque récupération
+        """
+        timings: Dict[str, Any] = {}
+
+        client, claim, knowledge = await asyncio.gather(
+            run_with_deadline("client", self.look_api.search_client(client_criteria)
+                              if client_criteria else None, self.deadlines["client"], timings),
+            run_with_deadline("claim", self.look_api.search_claim(claim_criteria)
+                              if claim_criteria else None, self.deadlines["claim"], timings),
+            run_with_deadline("knowledge", self.look_api.search_knowledge(knowledge_query, self.knowledge_top_k)
+                              if knowledge_query else None, self.deadlines["knowledge"], timings)
+        )
+
+        # Les sections inchangées ne sont pas reformatées par l'orchestrateur
+        if timings["client"]["status"] == "ok" and client is not None:
+            self.orchestrator.set_client_context(client)
+        if timings["claim"]["status"] == "ok" and claim is not None:
+            self.orchestrator.set_claim_context(claim)
+        if timings["knowledge"]["status"] == "ok":
+            self.orchestrator.set_knowledge_context(knowledge or [])
+
+        return timings
+
+    async def process_turn(self, user_message: str,
+                           client_criteria: Optional[Dict[str, Any]] = None,
+                           claim_criteria: Optional[Dict[str, Any]] = None,
+                           search_knowledge: bool = True,
+                           temperature: float = 0.7,
+                           max_tokens: int = 1024) -> Dict[str, Any]:
+        """
+        Traite un message utilisateur de bout en bout.
+
+        Args:
+            user_message: Message de l'utilisateur
+            client_criteria: Critères de recherche du client (pas de recherche si None)
+            claim_criteria: Critères de recherche de la réclamation (pas de recherche si None)
+            search_knowledge: Si True, la base de connaissances est interrogée avec le message
+            temperature: Température pour le sampling (0.0 à 1.0)
+            max_tokens: Nombre maximum de tokens à générer
+
+        Returns:
+            Réponse générée et durée de chaque étape (secondes)
+        """
+        started_at = time.monotonic()
+
+        fetches = await self.fetch_context(client_criteria, claim_criteria,
+                                           user_message if search_knowledge else None)
+        retrieval_done = time.monotonic()
+
+        messages = await asyncio.to_thread(self.orchestrator.build_messages, user_message)
+        prompt_done = time.monotonic()
+
+        response = await self.groq_client.chat_completion(messages, temperature=temperature,
+                                                          max_tokens=max_tokens)
+        assistant_message = response['choices'][0]['message']['content']
+        await asyncio.to_thread(self.orchestrator.add_assistant_message, assistant_message)
+        llm_done = time.monotonic()
+
+        return {
+            "response": assistant_message,
+            "timings": {
+                "fetches": fetches,
+                "retrieval": retrieval_done - started_at,
+                "prompt": prompt_done - retrieval_done,
+                "llm": llm_done - prompt_done,
+                "total": llm_done - started_at
+            },
+            "budget_report": self.orchestrator.last_budget_report
+        }
+
+    async def aclose(self) -> None:
+        """Ferme les clients HTTP du pipeline."""
+        await self.look_api.aclose()
+        await self.groq_client.aclose()
+
+# Exemple d'utilisation
+async def example_usage():
+    """Exemple de traitement asynchrone d'un tour de conversation."""
+    orchestrator = ChatbotOrchestrator()
+    pipeline = AsyncTurnPipeline(orchestrator, LookApiClient(os.getenv('LOOK_API_TOKEN', '')))
+
+    try:
+        result = await pipeline.process_turn(
+            "Quand vais-je être remboursé de ma consultation chez le cardiologue ?",
+            client_criteria={"nom": "Dupont", "prenom": "Jean"},
+            claim_criteria={"statut": "En cours"}
+        )
+        print(result["response"])
+        for name, fetch in result["timings"]["fetches"].items():
+            print(f"{name}: {fetch['status']} en {fetch['duration']:.3f}s")
+        print(f"Récupération du contexte: {result['timings']['retrieval']:.3f}s, "
+              f"LLM: {result['timings']['llm']:.3f}s, total: {result['timings']['total']:.3f}s")
+    finally:
+        await pipeline.aclose()
+
+if __name__ == "__main__":
+    asyncio.run(example_usage())
@@ -0,0 +1,104 @@
+import gc
+import asyncio
+
+import httpx
+import pytest
+
+from core.utils.async_groq_client import AsyncGroqClient
+from core.utils.rate_limiting import GroqRateLimiter
+
+SSE_BODY = (b'data: {"choices":[{"index":0,"delta":{"content":"Bon"},"finish_reason":null}]}\n\n'
+            b'data: {"choices":[{"index":0,"delta":{"content":"jour"},"finish_reason":null}]}\n\n'
+            b'data: [DONE]\n\n')
+
+MESSAGES = [{"role": "user", "content": "Bonjour"}]
+
+def make_client(rate_limiter):
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, content=SSE_BODY))
+    return AsyncGroqClient(api_key="test-key", max_concurrency=1, rate_limiter=rate_limiter,
+                           http_client=httpx.AsyncClient(transport=transport))
+
+def test_stream_consumed_releases_slots():
+    limiter = GroqRateLimiter(requests_per_minute=0, tokens_per_minute=0)
+
+    async def scenario():
+        client = make_client(limiter)
+        stream = await client.chat_completion(MESSAGES, stream=True)
+        contents = [chunk["choices"][0]["delta"]["content"] async for chunk in stream]
+        assert contents == ["Bon", "jour"]
+        assert limiter.in_flight == 0
+        # Le créneau de concurrence est disponible pour l'appel suivant
+        await asyncio.wait_for(client.chat_completion(MESSAGES, stream=True), timeout=1)
+
+    asyncio.run(scenario())
+
+def test_stream_closed_without_iteration_releases_slots():
+    limiter = GroqRateLimiter(requests_per_minute=0, tokens_per_minute=0)
+
+    async def scenario():
+        client = make_client(limiter)
+        stream = await client.chat_completion(MESSAGES, stream=True)
+        assert limiter.in_flight == 1
+        await stream.aclose()
+        await stream.aclose()
+        assert limiter.in_flight == 0
+        await asyncio.wait_for(client.chat_completion(MESSAGES, stream=True), timeout=1)
+
+    asyncio.run(scenario())
+
+def test_abandoned_stream_releases_slots():
+    limiter = GroqRateLimiter(requests_per_minute=0, tokens_per_minute=0)
+
+    async def scenario():
+        client = make_client(limiter)
+        await client.chat_completion(MESSAGES, stream=True)
+        gc.collect()
+        assert limiter.in_flight == 0
+        await asyncio.wait_for(client.chat_completion(MESSAGES, stream=True), timeout=1)
+
+    asyncio.run(scenario())
+
+class TrackedStream(httpx.AsyncByteStream):
+    """Corps de réponse de test signalant sa fermeture."""
+
+    def __init__(self):
+        self.closed = False
+
+    async def __aiter__(self):
+        yield SSE_BODY
+
+    async def aclose(self):
+        self.closed = True
+
+def make_tracked_client(limiter, body):
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, stream=body))
+    return AsyncGroqClient(api_key="test-key", max_concurrency=1, rate_limiter=limiter,
+                           http_client=httpx.AsyncClient(transport=transport))
+
+def test_abandoned_stream_closes_its_response():
+    limiter = GroqRateLimiter(requests_per_minute=0, tokens_per_minute=0)
+    body = TrackedStream()
+
+    async def scenario():
+        client = make_tracked_client(limiter, body)
+        await client.chat_completion(MESSAGES, stream=True)
+        gc.collect()
+        for _ in range(3):
+            await asyncio.sleep(0)
+        assert body.closed
+
+    asyncio.run(scenario())
+
+def test_stream_abandoned_after_its_loop_warns():
+    limiter = GroqRateLimiter(requests_per_minute=0, tokens_per_minute=0)
+    body = TrackedStream()
+
+    async def scenario():
+        client = make_tracked_client(limiter, body)
+        return await client.chat_completion(MESSAGES, stream=True)
+
+    stream = asyncio.run(scenario())
+    with pytest.warns(ResourceWarning):
+        del stream
+        gc.collect()
+    assert limiter.in_flight == 0
@@ -0,0 +1,69 @@
+from core.utils.chain_planner import ChainPlanner, PlanCache, SINGLE_TASK_TITLE, single_task_plan
+from core.utils.embeddings import EmbeddingBackend
+
+LLM_PLAN = [
+    {"id": "1", "title": "Lire le courrier", "description": "Lire le courrier", "dependencies": [], "type": "analyse"},
+    {"id": "2", "title": "Répondre", "description": "Répondre", "dependencies": ["1"], "type": "génération"},
+]
+
+class CountingDecomposer:
+    def __init__(self, plan):
+        self.plan = plan
+        self.queries = []
+
+    def __call__(self, query):
+        self.queries.append(query)
+        return [dict(step) for step in self.plan]
+
+class WordBackend(EmbeddingBackend):
+    """Backend de test : un axe par mot connu."""
+
+    VOCABULARY = ["courrier", "recu", "hier", "avant", "semaine", "derniere"]
+
+    def _embed_batch(self, texts):
+        return [[float(word in text.split()) for word in self.VOCABULARY] for text in texts]
+
+def test_simple_query_is_a_single_task():
+    planner = ChainPlanner()
+    plan, source = planner.plan("Quel est le remboursement de mes lunettes ?", CountingDecomposer(LLM_PLAN))
+
+    assert source == "simple"
+    assert [step["title"] for step in plan] == [SINGLE_TASK_TITLE]
+
+def test_known_intent_combination_uses_the_library():
+    planner = ChainPlanner()
+    decomposer = CountingDecomposer(LLM_PLAN)
+    query = "Quel est le remboursement de mes lunettes et quelles garanties a mon contrat ?"
+
+    plan, source = planner.plan(query, decomposer)
+
+    assert source == "library"
+    assert decomposer.queries == []
+    assert plan[-1]["dependencies"] == [step["id"] for step in plan[:-1]]
+    assert all(query in step["description"] for step in plan)
+
+def test_llm_plans_are_cached_but_fallbacks_are_not():
+    planner = ChainPlanner()
+    query = "J'ai reçu un courrier hier et je ne comprends pas ce qu'il faut faire ensuite"
+    decomposer = CountingDecomposer(LLM_PLAN)
+
+    assert planner.plan(query, decomposer) == (LLM_PLAN, "llm")
+    assert planner.plan(query, decomposer) == (LLM_PLAN, "cache")
+    assert len(decomposer.queries) == 1
+
+    other = "Mon courrier est arrivé hier et puis je ne sais pas quoi en faire"
+    fallback = CountingDecomposer(single_task_plan(other))
+    planner.plan(other, fallback)
+    planner.plan(other, fallback)
+    assert len(fallback.queries) == 2
+    assert planner.get_stats()["llm_calls_saved_rate"] == 1 / 4
+
+def test_similar_queries_share_a_cached_plan():
+    cache = PlanCache(embedding_backend=WordBackend(), similarity_threshold=0.9)
+    cache.set("courrier recu hier", LLM_PLAN)
+
+    assert cache.get("courrier recu hier avant") is None
+    assert cache.get("hier courrier recu") == LLM_PLAN
+    # Le plan retourné est une copie
+    cache.get("courrier recu hier")[0]["title"] = "modifié"
+    assert cache.get("courrier recu hier") == LLM_PLAN
@@ -0,0 +1,100 @@
+import threading
+
+import pytest
+
+from core.utils import chatbot_orchestrator
+from core.utils.chatbot_orchestrator import ChatbotOrchestrator
+
+class FakeGroqClient:
+    """Client Groq de test : chaque résumé compte les messages qu'il intègre."""
+
+    def __init__(self, api_key=None, model=None):
+        self.model = "llama3-70b-8192"
+        self.fail = False
+        self.release = threading.Event()
+        self.release.set()
+        self.summarized = 0
+
+    def chat_completion(self, messages, **kwargs):
+        self.release.wait(5)
+        if self.fail:
+            raise RuntimeError("Groq indisponible")
+        prompt = messages[0]["content"]
+        exchanges = prompt.split("Nouveaux échanges :")[1]
+        self.summarized += exchanges.count("Agent :") + exchanges.count("Assistant :")
+        return {"choices": [{"message": {"content": f"résumé de {self.summarized} messages"}}]}
+
+@pytest.fixture
+def orchestrator(monkeypatch):
+    monkeypatch.setattr(chatbot_orchestrator, "GroqClient", FakeGroqClient)
+    monkeypatch.setattr(chatbot_orchestrator, "warm_up_groq_transport", lambda client=None: False)
+    return ChatbotOrchestrator(summarize_history=True, summary_threshold=4, max_history_size=6)
+
+def add_turn(orchestrator, index):
+    orchestrator.conversation_history.append({"role": "user", "content": f"question {index}"})
+    orchestrator.add_assistant_message(f"réponse {index}")
+
+def test_overflow_is_summarized_instead_of_dropped(orchestrator):
+    # Résumé en arrière-plan bloqué : l'historique dépasse le plafond
+    orchestrator.groq_client.release.clear()
+    for index in range(3):
+        add_turn(orchestrator, index)
+    orchestrator.groq_client.release.set()
+    for index in range(3, 6):
+        add_turn(orchestrator, index)
+    orchestrator.summarizer.wait(5)
+
+    kept = len(orchestrator.conversation_history)
+    assert kept <= orchestrator.max_history_size
+    # Aucun message n'est perdu : chacun est soit résumé, soit conservé
+    assert orchestrator.groq_client.summarized + kept == 12
+    assert orchestrator.conversation_history[-1] == {"role": "assistant", "content": "réponse 5"}
+
+def test_overflow_is_dropped_when_summary_fails(orchestrator):
+    orchestrator.groq_client.fail = True
+    for index in range(5):
+        add_turn(orchestrator, index)
+    orchestrator.summarizer.wait(5)
+
+    assert len(orchestrator.conversation_history) == orchestrator.max_history_size
+    assert orchestrator.conversation_summary == ""
+
+def test_summary_survives_export_and_restore(orchestrator):
+    orchestrator.groq_client.release.clear()
+    for index in range(3):
+        add_turn(orchestrator, index)
+
+    # Sauvegarde puis restauration pendant le calcul du résumé
+    state = orchestrator.export_session_state()
+    orchestrator.restore_session_state(**state)
+    orchestrator.groq_client.release.set()
+    orchestrator.summarizer.wait(5)
+
+    assert orchestrator.conversation_summary.startswith("résumé de")
+    assert len(orchestrator.conversation_history) == orchestrator.summarizer.keep_recent
+
+def test_summary_is_discarded_after_clear(orchestrator):
+    orchestrator.groq_client.release.clear()
+    for index in range(3):
+        add_turn(orchestrator, index)
+    orchestrator.clear_conversation_history()
+    orchestrator.groq_client.release.set()
+    orchestrator.summarizer.wait(5)
+
+    assert orchestrator.conversation_history == []
+    assert orchestrator.conversation_summary == ""
+
+def test_summarized_conversation_is_reloaded_without_covered_messages(orchestrator, tmp_path):
+    path = str(tmp_path / "appel.jsonl")
+    orchestrator.save_conversation(path)
+    for index in range(4):
+        orchestrator.build_messages(f"question {index}")
+        orchestrator.add_assistant_message(f"réponse {index}")
+    orchestrator.summarizer.wait(5)
+    assert orchestrator.conversation_summary
+
+    reloaded = ChatbotOrchestrator(summarize_history=True, summary_threshold=4, max_history_size=6)
+    assert reloaded.load_conversation(path)
+
+    assert reloaded.conversation_history == orchestrator.conversation_history
+    assert reloaded.conversation_summary == orchestrator.conversation_summary
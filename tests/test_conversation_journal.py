@@ -0,0 +1,48 @@
+import os
+
+from core.utils.conversation_journal import ConversationJournal
+
+def test_compaction_keeps_last_messages_and_summary(tmp_path):
+    path = str(tmp_path / "appel.jsonl")
+    journal = ConversationJournal(path, fsync_interval=0, compact_bytes=4096, retain_messages=4)
+
+    for index in range(200):
+        journal.append({"role": "user", "content": f"message {index} " + "x" * 40})
+        if index % 50 == 49:
+            journal.record_summary(f"résumé jusqu'au message {index - 4}", retained=4)
+
+    assert os.path.getsize(path) < 4096
+    assert journal.read_summary() == "résumé jusqu'au message 195"
+    assert journal.read_last(2)[-1]["content"].startswith("message 199 ")
+
+    journal.compact()
+    journal.close()
+    with open(path, encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    assert len(lines) == 5
+    assert '"type":"summary"' in lines[0]
+
+def test_messages_covered_by_the_summary_are_not_read_back(tmp_path):
+    journal = ConversationJournal(str(tmp_path / "appel.jsonl"), fsync_interval=0, retain_messages=0)
+    journal.extend([{"role": "user", "content": f"q{index}"} for index in range(4)])
+    journal.record_summary("résumé de q0 et q1", retained=2)
+    journal.append({"role": "user", "content": "q4"})
+
+    assert [m["content"] for m in journal.read_last()] == ["q2", "q3", "q4"]
+    assert [m["content"] for m in journal.read_last(2)] == ["q3", "q4"]
+
+    journal.compact()
+    assert [m["content"] for m in journal.read_last()] == ["q2", "q3", "q4"]
+    assert journal.read_summary() == "résumé de q0 et q1"
+    journal.close()
+
+def test_reset_discards_messages_and_summary(tmp_path):
+    journal = ConversationJournal(str(tmp_path / "appel.jsonl"), fsync_interval=0, retain_messages=0)
+    journal.append({"role": "user", "content": "avant"})
+    journal.record_summary("ancien résumé")
+    journal.reset()
+    journal.append({"role": "user", "content": "après"})
+
+    assert journal.read_last() == [{"role": "user", "content": "après"}]
+    assert journal.read_summary() == ""
+    journal.close()
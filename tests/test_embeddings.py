@@ -0,0 +1,33 @@
+import pytest
+
+from core.utils import embeddings
+from core.utils.embeddings import EmbeddingBackend, GroqEmbeddingBackend, SentenceTransformerBackend
+
+class FakeBackend(EmbeddingBackend):
+    def __init__(self):
+        super().__init__(cache_size=16)
+        self.batches = []
+
+    def _embed_batch(self, texts):
+        self.batches.append(list(texts))
+        return [[float(len(text))] for text in texts]
+
+def test_embedding_backend_is_abstract():
+    with pytest.raises(TypeError):
+        EmbeddingBackend()
+
+def test_missing_texts_are_encoded_once():
+    backend = FakeBackend()
+    assert backend.get_embeddings(["a", "bb", "a"]) == [[1.0], [2.0], [1.0]]
+    assert backend.get_embeddings(["bb", "ccc"]) == [[2.0], [3.0]]
+    assert backend.batches == [["a", "bb"], ["ccc"]]
+
+def test_groq_backend_requires_a_client():
+    with pytest.raises(ValueError):
+        GroqEmbeddingBackend(None)
+
+def test_groq_default_without_client_falls_back_to_local(monkeypatch):
+    monkeypatch.setattr(embeddings, "EMBEDDING_BACKEND", "groq")
+    client = object()
+    assert isinstance(embeddings.get_default_embedding_backend(), SentenceTransformerBackend)
+    assert embeddings.get_default_embedding_backend(client).groq_client is client
@@ -0,0 +1,106 @@
+import json
+import threading
+import time
+
+import requests
+
+from core.utils.gating_system import GatingSystem
+from core.utils.rate_limiting import GroqRateLimiter
+
+RESPONSE = "Bonjour Madame, votre contrat rembourse les lunettes à hauteur de 150 euros par an. Cordialement"
+QUERY = "Quel est le remboursement des lunettes ?"
+
+def evaluation_content(passed=True, score=0.9):
+    return json.dumps({"passed": passed, "score": score, "reason": "", "issues": []})
+
+class FakeGroqClient:
+    """Client Groq de test : réponse fixe, durée d'appel configurable."""
+
+    def __init__(self, delay=0.0, rate_limiter=None, passed=True):
+        self.delay = delay
+        self.rate_limiter = rate_limiter
+        self.passed = passed
+        self.calls = 0
+
+    def chat_completion(self, messages, **kwargs):
+        self.calls += 1
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire(1)
+        try:
+            time.sleep(self.delay)
+        finally:
+            if self.rate_limiter is not None:
+                self.rate_limiter.release(200)
+        return {"choices": [{"message": {"content": evaluation_content(self.passed)}}]}
+
+def test_rate_limiter_wait_is_not_counted_against_deadline():
+    # Un seul appel à la fois : les règles attendent leur tour dans le limiteur
+    limiter = GroqRateLimiter(requests_per_minute=0, tokens_per_minute=0,
+                              initial_concurrency=1, max_concurrency=1)
+    gating = GatingSystem(FakeGroqClient(delay=0.1, rate_limiter=limiter), deadline=0.3)
+
+    evaluation = gating.evaluate_response(RESPONSE, QUERY, {})
+
+    assert evaluation["timed_out_rules"] == []
+    assert evaluation["passed"]
+    assert evaluation["gating_time"] > 0.3
+
+class SlowGroqClient:
+    """Client Groq de test qui respecte le timeout reçu, comme le transport HTTP."""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.timeouts = []
+        self.active = 0
+        self._lock = threading.Lock()
+
+    def chat_completion(self, messages, timeout=None, **kwargs):
+        with self._lock:
+            self.timeouts.append(timeout)
+            self.active += 1
+        try:
+            if timeout is not None and timeout < self.delay:
+                time.sleep(timeout)
+                raise requests.exceptions.Timeout("timeout")
+            time.sleep(self.delay)
+            return {"choices": [{"message": {"content": evaluation_content()}}]}
+        finally:
+            with self._lock:
+                self.active -= 1
+
+def enable_only(gating, *rule_names):
+    for rule_name, rule in gating.compliance_rules.items():
+        rule["enabled"] = rule_name in rule_names
+
+def test_timed_out_checks_release_their_threads():
+    client = SlowGroqClient(delay=2.0)
+    gating = GatingSystem(client, deadline=0.2, pii_detector=None)
+    enable_only(gating, "medical_advice", "legal_compliance", "tone_politeness")
+
+    evaluation = gating.evaluate_response(RESPONSE, QUERY, {})
+    durations = dict(evaluation["rule_durations"])
+
+    assert sorted(evaluation["timed_out_rules"]) == ["legal_compliance", "medical_advice", "tone_politeness"]
+    assert all(timeout is not None and 0 < timeout <= 0.2 for timeout in client.timeouts)
+
+    # Les appels expirent d'eux-mêmes peu après l'échéance, sans modifier les durées retournées
+    deadline = time.monotonic() + 1.0
+    while client.active and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert client.active == 0
+    assert evaluation["rule_durations"] == durations
+
+def test_timeout_fails_closed_only_for_blocking_severities():
+    gating = GatingSystem(SlowGroqClient(delay=2.0), deadline=0.1, pii_detector=None,
+                          fail_closed_severities={"high"})
+
+    enable_only(gating, "tone_politeness")
+    evaluation = gating.evaluate_response(RESPONSE, QUERY, {})
+    assert evaluation["timed_out_rules"] == ["tone_politeness"]
+    assert evaluation["passed"]
+
+    enable_only(gating, "medical_advice")
+    evaluation = gating.evaluate_response(RESPONSE, QUERY, {})
+    assert evaluation["timed_out_rules"] == ["medical_advice"]
+    assert not evaluation["passed"]
+    assert evaluation["high_severity_issues"] == ["Vérification de conformité non effectuée dans le délai"]
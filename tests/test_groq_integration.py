@@ -0,0 +1,129 @@
+import gc
+import time
+import threading
+
+import pytest
+import requests
+
+from core.utils.groq_integration import GroqClient
+from core.utils.rate_limiting import GroqRateLimiter
+from core.utils.request_coalescing import SingleFlight
+
+MESSAGES = [{"role": "user", "content": "Bonjour"}]
+
+SSE_BODY = (b'data: {"choices":[{"index":0,"delta":{"content":"Bon"},"finish_reason":null}]}\n\n'
+            b'data: [DONE]\n\n')
+
+class FakeResponse:
+    def __init__(self, stream):
+        self.status_code = 200
+        self.headers = {}
+        self.stream = stream
+        self.closed = False
+
+    def json(self):
+        return {"choices": [{"message": {"content": "Bonjour"}}], "usage": {"total_tokens": 10}}
+
+    def iter_content(self, chunk_size=None):
+        yield SSE_BODY
+
+    def close(self):
+        self.closed = True
+
+class FakeTransport:
+    """Transport de test : chaque requête dure `delay` secondes."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.posts = 0
+        self.responses = []
+        self._lock = threading.Lock()
+
+    def post(self, url, headers, payload, stream=False, timeout=None):
+        with self._lock:
+            self.posts += 1
+        time.sleep(self.delay)
+        response = FakeResponse(stream)
+        self.responses.append(response)
+        return response
+
+def make_client(transport, rate_limiter=None):
+    return GroqClient(api_key="test-key", transport=transport,
+                      rate_limiter=rate_limiter or GroqRateLimiter(requests_per_minute=0, tokens_per_minute=0),
+                      coalescer=SingleFlight(), embedding_backend=object())
+
+def run_concurrently(fn, count=4):
+    threads = [threading.Thread(target=fn) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+def test_identical_calls_are_not_coalesced_by_default():
+    transport = FakeTransport(delay=0.1)
+    client = make_client(transport)
+    run_concurrently(lambda: client.chat_completion(MESSAGES))
+    assert transport.posts == 4
+
+def test_identical_calls_are_coalesced_on_request():
+    transport = FakeTransport(delay=0.1)
+    client = make_client(transport)
+    run_concurrently(lambda: client.chat_completion(MESSAGES, coalesce=True))
+    assert transport.posts == 1
+
+def test_coalesced_caller_gives_up_at_its_timeout():
+    transport = FakeTransport(delay=0.5)
+    client = make_client(transport)
+    leader = threading.Thread(target=lambda: client.chat_completion(MESSAGES, coalesce=True))
+    leader.start()
+    time.sleep(0.05)
+
+    started_at = time.monotonic()
+    with pytest.raises(requests.exceptions.Timeout):
+        client.chat_completion(MESSAGES, coalesce=True, timeout=0.1)
+    assert time.monotonic() - started_at < 0.3
+    leader.join()
+    assert transport.posts == 1
+    assert client.coalescer.get_stats()["timeouts"] == 1
+
+def test_streams_are_never_coalesced():
+    transport = FakeTransport(delay=0.1)
+    client = make_client(transport)
+    run_concurrently(lambda: list(client.chat_completion(MESSAGES, stream=True, coalesce=True)))
+    assert transport.posts == 4
+
+def test_stream_consumed_releases_slot():
+    transport = FakeTransport()
+    limiter = GroqRateLimiter(requests_per_minute=0, tokens_per_minute=0)
+    client = make_client(transport, limiter)
+
+    chunks = list(client.chat_completion(MESSAGES, stream=True))
+
+    assert [chunk["choices"][0]["delta"]["content"] for chunk in chunks] == ["Bon"]
+    assert limiter.in_flight == 0
+    assert transport.responses[0].closed
+
+def test_stream_closed_before_iteration_releases_slot():
+    transport = FakeTransport()
+    limiter = GroqRateLimiter(requests_per_minute=0, tokens_per_minute=0)
+    client = make_client(transport, limiter)
+
+    stream = client.chat_completion(MESSAGES, stream=True)
+    assert limiter.in_flight == 1
+    stream.close()
+    stream.close()
+
+    assert limiter.in_flight == 0
+    assert transport.responses[0].closed
+    assert len(client.stream_metrics_history) == 1
+
+def test_abandoned_stream_releases_slot():
+    transport = FakeTransport()
+    limiter = GroqRateLimiter(requests_per_minute=0, tokens_per_minute=0)
+    client = make_client(transport, limiter)
+
+    client.chat_completion(MESSAGES, stream=True)
+    gc.collect()
+
+    assert limiter.in_flight == 0
+    assert transport.responses[0].closed
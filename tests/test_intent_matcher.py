@@ -0,0 +1,33 @@
+import pytest
+
+from core.utils.chain_planner import ChainPlanner, normalize_query
+from core.utils.intent_matcher import IntentMatcher, _legacy_detect_intent
+
+INFLECTED_MESSAGES = [
+    "Ma facture de dentiste n'est pas remboursée",
+    "Les garanties optionnelles",
+    "Mes factures d'optique et mes frais de transport",
+    "J'ai contesté les erreurs de mon décompte",
+    "Les couvertures et niveaux de ma formule",
+    "une tarte aux fraises",
+]
+
+@pytest.mark.parametrize("message", INFLECTED_MESSAGES)
+def test_inflected_forms_match_like_the_legacy_detector(message):
+    assert IntentMatcher().match(message) == _legacy_detect_intent(message)
+
+def test_matching_ignores_accents_and_case():
+    matcher = IntentMatcher()
+
+    assert matcher.match("JE VEUX RESILIER ET METTRE FIN À MON CONTRAT") == _legacy_detect_intent(
+        "je veux résilier et mettre fin à mon contrat")
+    assert matcher.scores("la prise en charge de mes FRAIS")["remboursement"] == 2 / 7
+    assert matcher.match_batch(["Bonjour", "j'ai une reclamation, et une plainte"]) == [
+        ("general", 0.0), ("reclamation", 2 / 6)
+    ]
+
+def test_planner_detects_inflected_intents():
+    planner = ChainPlanner()
+
+    intents = planner.detect_intents(normalize_query("Les garanties optionnelles et ma facture remboursée"))
+    assert intents == ["remboursement", "contrat"]
@@ -0,0 +1,61 @@
+import json
+import random
+
+from core.utils.gating_system import GatingSystem
+from core.utils.pii_detector import (PIIDetector, VERDICT_CLEAN, VERDICT_LEAK, VERDICT_SUSPECT,
+                                     benchmark_pii_detector, make_benchmark_client, nir_key_valid)
+
+CLEAN_RESPONSE = "Votre contrat rembourse les lunettes à hauteur de 150 euros par an."
+LEAK_RESPONSE = "Votre numéro de sécurité sociale est le 1 85 05 78 006 084 91."
+SUSPECT_RESPONSE = "Vous pouvez joindre votre conseiller au 06 12 34 56 78."
+
+class RecordingGroqClient:
+    """Client Groq de test : enregistre les règles soumises au LLM."""
+
+    def __init__(self):
+        self.prompts = []
+
+    def chat_completion(self, messages, **kwargs):
+        self.prompts.append(messages[-1]["content"])
+        content = json.dumps({"passed": True, "score": 0.9, "reason": "", "issues": []})
+        return {"choices": [{"message": {"content": content}}]}
+
+def make_gating(client):
+    gating = GatingSystem(client, pii_detector=PIIDetector())
+    for rule_name, rule in gating.compliance_rules.items():
+        rule["enabled"] = rule_name == "personal_data"
+    return gating
+
+def test_detector_verdicts():
+    detector = PIIDetector()
+
+    assert detector.scan(CLEAN_RESPONSE)["verdict"] == VERDICT_CLEAN
+    assert detector.scan(LEAK_RESPONSE)["verdict"] == VERDICT_LEAK
+    assert detector.scan(SUSPECT_RESPONSE)["verdict"] == VERDICT_SUSPECT
+    # Le téléphone du client, connu par le contexte, devient une fuite certaine
+    known = detector.known_values({"client": {"telephone": "06 12 34 56 78"}})
+    assert detector.scan(SUSPECT_RESPONSE, known)["verdict"] == VERDICT_LEAK
+
+def test_only_certain_leaks_skip_the_llm():
+    client = RecordingGroqClient()
+    gating = make_gating(client)
+
+    result = gating.check_personal_data(LEAK_RESPONSE, {})
+    assert not result["passed"]
+    assert result["detector"] == "deterministic"
+    assert client.prompts == []
+
+    for response in (CLEAN_RESPONSE, SUSPECT_RESPONSE):
+        result = gating.check_personal_data(response, {})
+        assert result["passed"]
+        assert "detector" not in result
+    assert len(client.prompts) == 2
+
+def test_benchmark_is_reproducible_without_client_data():
+    first = make_benchmark_client(random.Random(7))
+    assert first == make_benchmark_client(random.Random(7))
+    assert nir_key_valid(first["numero_securite_sociale"])
+
+    results = benchmark_pii_detector(n_clients=20, responses_per_client=5, seed=7)
+    assert results["verdicts"] == benchmark_pii_detector(n_clients=20, responses_per_client=5, seed=7)["verdicts"]
+    assert results["clean_blocked"] == 0
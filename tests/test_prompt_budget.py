@@ -0,0 +1,46 @@
+from core.utils.groq_integration import InsurancePromptSystem
+from core.utils.prompt_budget import PromptBudgetManager, estimate_tokens
+
+format_knowledge = InsurancePromptSystem.format_knowledge_context
+
+def knowledge(count, size=400):
+    return [{"title": f"Document {i}", "category": "Remboursement", "content": "x" * size, "score": 1.0 - i / 100}
+            for i in range(count)]
+
+def test_system_prompt_is_truncated_to_its_budget():
+    manager = PromptBudgetManager("default", {"system": 50})
+    messages, report = manager.assemble("consigne " * 200, "", "", "", [], [{"role": "user", "content": "Bonjour"}],
+                                        format_knowledge)
+    assert estimate_tokens(messages[0]["content"]) <= 50
+    assert "system" in report["truncated_sections"]
+
+def test_knowledge_selection_matches_rendered_size():
+    manager = PromptBudgetManager("default")
+    items = knowledge(30)
+    kept, dropped = manager.select_knowledge_items(items, format_knowledge, 800)
+
+    assert estimate_tokens(format_knowledge(kept)) <= 800
+    assert estimate_tokens(format_knowledge(kept + [dropped[0]])) > 800
+    assert kept == items[:len(kept)]
+    assert len(kept) + len(dropped) == len(items)
+
+def test_knowledge_selection_formats_a_linear_number_of_times():
+    calls = []
+
+    def counting_format(items):
+        calls.append(len(items))
+        return format_knowledge(items)
+
+    PromptBudgetManager("default").select_knowledge_items(knowledge(200), counting_format, 800)
+    assert len(calls) <= 200 + 3
+    assert sum(calls) < 1000
+
+def test_total_budget_drops_least_relevant_knowledge():
+    manager = PromptBudgetManager("default", {"total": 900, "knowledge": 800})
+    messages, report = manager.assemble("Système", "", "", "", knowledge(10),
+                                        [{"role": "user", "content": "y" * 2000}], format_knowledge)
+    assert report["total_tokens"] <= 900
+    assert report["dropped_knowledge_items"]
+    kept = [item for item in knowledge(10) if item["title"] not in report["dropped_knowledge_items"]]
+    assert kept
+    assert report["sections"]["knowledge"]["tokens"] == estimate_tokens(format_knowledge(kept))
@@ -0,0 +1,142 @@
+import threading
+import time
+
+import requests
+
+from core.utils.prompt_chaining import PromptChaining
+from core.utils.subtask_cache import SubtaskResultCache
+
+class FakeGroqClient:
+    """
+    Client Groq de test : chaque sous-tâche répond "résultat de <description>" après un délai
+    configurable ; un timeout reçu interrompt l'appel peu après son expiration, comme le transport HTTP.
+    """
+
+    def __init__(self, delays=None, results=None):
+        self.delays = delays or {}
+        self.results = results or {}
+        self.calls = []
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def chat_completion(self, messages, temperature=0.7, max_tokens=1024, stream=False, timeout=None, **kwargs):
+        if stream:
+            return iter([{"choices": [{"delta": {"content": "Synthèse "}}]},
+                         {"choices": [{"delta": {"content": "finale"}}]}])
+        if messages[0]["content"].startswith("Vous êtes un assistant spécialisé dans l'assurance santé.\nRésumez"):
+            return {"choices": [{"message": {"content": "résumé"}}]}
+
+        description = messages[-1]["content"]
+        with self._lock:
+            self.calls.append({"description": description, "context": messages[1]["content"], "timeout": timeout})
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            delay = self.delays.get(description, 0.02)
+            if timeout is not None and timeout < delay:
+                time.sleep(timeout + 0.1)
+                raise requests.exceptions.Timeout("timeout")
+            time.sleep(delay)
+            content = self.results.get(description, f"résultat de {description}")
+            return {"choices": [{"message": {"content": content}}]}
+        finally:
+            with self._lock:
+                self.active -= 1
+
+def task(task_id, description, dependencies=()):
+    return {"id": task_id, "title": description, "description": description,
+            "dependencies": list(dependencies), "type": "analyse"}
+
+def make_chaining(client, **kwargs):
+    kwargs.setdefault("subtask_cache", SubtaskResultCache())
+    chaining = PromptChaining(client, **kwargs)
+    # Décomposition par le LLM uniquement
+    chaining.planner = None
+    return chaining
+
+def test_subtasks_follow_dependencies_within_parallelism():
+    client = FakeGroqClient()
+    chaining = make_chaining(client, max_parallelism=2)
+    plan = [task("1", "tarifs"), task("2", "garanties"), task("3", "délais"),
+            task("4", "réponse", ["1", "2", "3"])]
+
+    results, timeline = chaining.run_subtasks(plan, {})
+
+    entries = {entry["subtask_id"]: entry for entry in timeline}
+    assert all(result["status"] == "completed" for result in results.values())
+    assert client.max_active == 2
+    assert entries["4"]["started_at"] >= max(entries[t]["finished_at"] for t in ("1", "2", "3"))
+
+def test_timed_out_subtask_call_is_bounded_and_keeps_its_slot():
+    client = FakeGroqClient(delays={"lent": 2.0})
+    chaining = make_chaining(client, max_parallelism=1, subtask_timeout=0.2)
+    plan = [task("1", "lent"), task("2", "rapide"), task("3", "suite", ["1"])]
+
+    started_at = time.monotonic()
+    results, _ = chaining.run_subtasks(plan, {})
+
+    assert results["1"]["status"] == "timeout"
+    assert results["2"]["status"] == "completed"
+    assert results["3"]["status"] == "completed"
+    assert time.monotonic() - started_at < 1.0
+    # L'appel abandonné a reçu le temps restant et a occupé sa place jusqu'à son expiration
+    assert 0 < client.calls[0]["timeout"] <= 0.2
+    assert client.max_active == 1
+
+def test_subtask_context_holds_only_compacted_dependency_results():
+    long_result = "Le contrat rembourse les lunettes. " * 40
+    client = FakeGroqClient(results={"garanties": long_result})
+    chaining = make_chaining(client, compact_tokens=50)
+    plan = [task("1", "garanties"), task("2", "tarifs"), task("3", "réponse", ["1"])]
+
+    results, timeline = chaining.run_subtasks(plan, {"client": "Dupont"})
+
+    context = next(call["context"] for call in client.calls if call["description"] == "réponse")
+    assert "Dupont" in context
+    assert "résumé" in context and long_result not in context
+    assert "résultat de tarifs" not in context
+    assert results["1"]["result"] == long_result
+    assert [entry["compacted"] for entry in timeline if entry["subtask_id"] == "1"] == [True]
+
+def test_subtask_results_are_memoized_and_duplicates_merged():
+    client = FakeGroqClient()
+    cache = SubtaskResultCache()
+    chaining = make_chaining(client, subtask_cache=cache)
+    plan = [task("1", "garanties"), task("2", "Garanties !"), task("3", "réponse", ["1", "2"])]
+
+    first, timeline = chaining.run_subtasks(plan, {"client": "Dupont"})
+    assert len(client.calls) == 2
+    assert [entry["merged_into"] for entry in timeline if entry["status"] == "merged"] == ["1"]
+
+    second, timeline = chaining.run_subtasks(plan, {"client": "Dupont", "query": "autre requête"})
+    assert len(client.calls) == 2
+    assert all(entry.get("cached") for entry in timeline if entry.get("status") != "merged")
+    assert second["3"]["result"] == first["3"]["result"]
+
+    # Un autre contexte client n'utilise pas les résultats mémorisés
+    chaining.run_subtasks(plan, {"client": "Martin"})
+    assert len(client.calls) == 4
+
+def test_stream_reports_progress_then_synthesis():
+    client = FakeGroqClient()
+    chaining = make_chaining(client)
+    chaining.decompose_query = lambda query: [task("1", "tarifs"), task("2", "garanties"),
+                                              task("3", "réponse", ["1", "2"])]
+
+    events = list(chaining.execute_chain_stream("Tarifs et garanties ?"))
+    names = [event["event"] for event in events]
+
+    assert names[0] == "plan" and names[-1] == "done"
+    assert names.count("subtask_started") == names.count("subtask_finished") == 3
+    started = {e["subtask_id"]: i for i, e in enumerate(events) if e["event"] == "subtask_started"}
+    finished = {e["subtask_id"]: i for i, e in enumerate(events) if e["event"] == "subtask_finished"}
+    assert all(started[t] < finished[t] for t in started)
+    assert started["3"] > max(finished["1"], finished["2"])
+    assert names.index("synthesis_started") > max(finished.values())
+    assert [e["elapsed"] for e in events] == sorted(e["elapsed"] for e in events)
+
+    done = events[-1]
+    assert done["status"] == "completed"
+    assert done["synthesis"] == "".join(e["content"] for e in events if e["event"] == "synthesis_token")
+    assert done["execution"]["subtasks"] == 3
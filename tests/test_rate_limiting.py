@@ -0,0 +1,30 @@
+import time
+import threading
+
+from core.utils.rate_limiting import GroqRateLimiter, measure_rate_limit_wait
+from core.utils import rate_limiting
+
+def test_account_quotas_disabled_by_default():
+    assert rate_limiting.GROQ_REQUESTS_PER_MINUTE <= 0
+    assert rate_limiting.GROQ_TOKENS_PER_MINUTE <= 0
+    limiter = GroqRateLimiter()
+    assert not limiter.request_bucket.enabled
+    assert not limiter.token_bucket.enabled
+
+def test_wait_clock_measures_only_limiter_wait():
+    limiter = GroqRateLimiter(requests_per_minute=0, tokens_per_minute=0,
+                              initial_concurrency=1, max_concurrency=1)
+    limiter.acquire(10)
+    threading.Timer(0.2, limiter.release).start()
+
+    with measure_rate_limit_wait() as clock:
+        limiter.acquire(10)
+    limiter.release()
+
+    assert 0.15 <= clock.elapsed() < 1.0
+
+    with measure_rate_limit_wait() as clock:
+        limiter.acquire(10)
+        time.sleep(0.05)
+    limiter.release()
+    assert clock.elapsed() < 0.05
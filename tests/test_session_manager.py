@@ -0,0 +1,126 @@
+import threading
+import time
+
+import pytest
+
+from core.utils import chatbot_orchestrator
+from core.utils.chatbot_orchestrator import ChatbotOrchestrator
+from core.utils.session_manager import SessionManager
+
+class FakeGroqClient:
+    """Client Groq de test : réponse fixe aux tours, résumé bloquable."""
+
+    def __init__(self, api_key=None, model=None):
+        self.model = "llama3-70b-8192"
+        self.release = threading.Event()
+        self.release.set()
+
+    def chat_completion(self, messages, **kwargs):
+        prompt = messages[0]["content"]
+        if "Nouveaux échanges :" not in prompt:
+            return {"choices": [{"message": {"content": "réponse"}}]}
+        self.release.wait(5)
+        exchanges = prompt.split("Nouveaux échanges :")[1].split("Résumé mis à jour :")[0]
+        return {"choices": [{"message": {"content": exchanges.strip()}}]}
+
+class MemoryStore:
+    def __init__(self):
+        self.saved = {}
+
+    def save(self, session_id, data):
+        self.saved[session_id] = data
+
+    def load(self, session_id):
+        return self.saved.get(session_id)
+
+    def delete(self, session_id):
+        self.saved.pop(session_id, None)
+
+@pytest.fixture
+def groq_client(monkeypatch):
+    client = FakeGroqClient()
+    monkeypatch.setattr(chatbot_orchestrator, "GroqClient", lambda api_key=None, model=None: client)
+    monkeypatch.setattr(chatbot_orchestrator, "warm_up_groq_transport", lambda client=None: False)
+    return client
+
+def make_manager(**kwargs):
+    kwargs.setdefault("sweep_interval", 0)
+    return SessionManager(workers=1, orchestrator_factory=lambda: ChatbotOrchestrator(
+        summarize_history=True, summary_threshold=4, max_history_size=8), **kwargs)
+
+def test_pending_summary_is_applied_to_its_session(groq_client):
+    manager = make_manager()
+    groq_client.release.clear()
+    for index in range(3):
+        manager.process_message("appel-1", f"question {index}")
+
+    # Le même orchestrateur traite une autre session pendant le calcul du résumé
+    manager.process_message("appel-2", "Bonjour")
+    groq_client.release.set()
+    manager.get_session("appel-1").summarizer.wait(5)
+
+    first = manager.get_session("appel-1")
+    second = manager.get_session("appel-2")
+    assert "question 0" in first.summary
+    assert [m.content for m in first.messages] == ["question 1", "réponse", "question 2", "réponse"]
+    assert second.summary == ""
+    assert len(second.messages) == 2
+    manager.close()
+
+def test_journal_follows_the_session(groq_client, tmp_path):
+    manager = make_manager(journal_dir=str(tmp_path))
+    manager.process_message("appel-1", "question A")
+    manager.process_message("appel-2", "question B")
+    manager.process_message("appel-1", "question C")
+    manager.close()
+
+    first = (tmp_path / "appel-1.jsonl").read_text(encoding="utf-8")
+    second = (tmp_path / "appel-2.jsonl").read_text(encoding="utf-8")
+    assert "question A" in first and "question C" in first and "question B" not in first
+    assert "question B" in second and "question A" not in second
+
+def test_idle_sessions_are_evicted_without_new_requests(groq_client):
+    store = MemoryStore()
+    manager = make_manager(store=store, idle_timeout=0.05, sweep_interval=0.05)
+    manager.process_message("appel-1", "Bonjour")
+
+    deadline = time.monotonic() + 2
+    while "appel-1" not in store.saved and time.monotonic() < deadline:
+        time.sleep(0.02)
+
+    assert store.saved["appel-1"]["messages"][0]["content"] == "Bonjour"
+    assert manager.get_stats()["evicted"] == 1
+    manager.close()
+
+def test_lookup_does_not_evict_idle_sessions(groq_client):
+    store = MemoryStore()
+    manager = make_manager(store=store, idle_timeout=0)
+    manager.process_message("appel-1", "Bonjour")
+    manager.get_session("appel-2")
+
+    assert store.saved == {}
+    assert manager.get_stats()["evicted"] == 0
+    manager.close()
+
+def test_lookup_evicts_sessions_over_capacity(groq_client):
+    store = MemoryStore()
+    manager = make_manager(store=store, max_sessions=1)
+    manager.process_message("appel-1", "Bonjour")
+    manager.get_session("appel-2")
+
+    assert list(store.saved) == ["appel-1"]
+    manager.close()
+
+def test_closing_a_session_being_evicted_skips_its_eviction(groq_client):
+    store = MemoryStore()
+    manager = make_manager(store=store, idle_timeout=0)
+    manager.process_message("appel-1", "Bonjour")
+
+    # Sélectionnée pour le déchargement, puis terminée avant son enregistrement
+    victims = manager._select_victims(time.monotonic())
+    manager.close_session("appel-1")
+    assert manager._evict(victims) == 1
+
+    assert store.saved == {}
+    assert manager.get_stats()["evicted"] == 0
+    manager.close()
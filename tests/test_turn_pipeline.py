@@ -0,0 +1,137 @@
+import asyncio
+import json
+import time
+
+import httpx
+
+from core.utils.turn_pipeline import AsyncTurnPipeline, LookApiClient, run_with_deadline
+
+class FakeOrchestrator:
+    """Orchestrateur de test : contexte reçu et étapes synchrones lentes."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.current_client = None
+        self.current_claim = None
+        self.knowledge_context = None
+        self.history = []
+        self.last_budget_report = {}
+
+    def set_client_context(self, client_data):
+        self.current_client = client_data
+
+    def set_claim_context(self, claim_data):
+        self.current_claim = claim_data
+
+    def set_knowledge_context(self, knowledge_items):
+        self.knowledge_context = knowledge_items
+
+    def build_messages(self, user_message):
+        time.sleep(self.delay)
+        self.history.append(user_message)
+        return [{"role": "user", "content": user_message}]
+
+    def add_assistant_message(self, content):
+        time.sleep(self.delay)
+        self.history.append(content)
+
+class FakeAsyncGroqClient:
+    async def chat_completion(self, messages, **kwargs):
+        return {"choices": [{"message": {"content": "réponse"}}]}
+
+    async def aclose(self):
+        pass
+
+def make_look_api(handler):
+    return LookApiClient("token", base_url="http://look-api",
+                         http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+
+def test_run_with_deadline_records_status():
+    async def scenario():
+        timings = {}
+
+        async def slow():
+            await asyncio.sleep(1)
+            return "trop tard"
+
+        async def fast():
+            return "ok"
+
+        async def failing():
+            raise httpx.ConnectError("look-api indisponible")
+
+        assert await run_with_deadline("fast", fast(), 0.5, timings) == "ok"
+        assert await run_with_deadline("slow", slow(), 0.05, timings) is None
+        assert await run_with_deadline("failing", failing(), 0.5, timings) is None
+        assert await run_with_deadline("skipped", None, 0.5, timings) is None
+        return timings
+
+    timings = asyncio.run(scenario())
+
+    assert {name: timing["status"] for name, timing in timings.items()} == {
+        "fast": "ok", "slow": "timeout", "failing": "error", "skipped": "skipped"
+    }
+    assert timings["slow"]["duration"] < 0.5
+
+def test_fetch_context_keeps_previous_context_on_timeout_and_error():
+    state = {"slow": False}
+
+    async def handler(request):
+        path = request.url.path
+        if path == "/clients/search":
+            if state["slow"]:
+                await asyncio.sleep(1)
+            return httpx.Response(200, json={"results": [{"nom": "Dupont"}]})
+        if path == "/reclamations/search":
+            if state["slow"]:
+                return httpx.Response(500)
+            return httpx.Response(200, json={"results": [{"numero_reclamation": "R-1"}]})
+        query = json.loads(request.content)["query"]
+        return httpx.Response(200, json={"results": [{"content": query, "similarity": 0.8}]})
+
+    orchestrator = FakeOrchestrator()
+    pipeline = AsyncTurnPipeline(orchestrator, make_look_api(handler), groq_client=FakeAsyncGroqClient(),
+                                 client_deadline=0.1)
+
+    async def scenario():
+        first = await pipeline.fetch_context({"nom": "Dupont"}, {"client_id": 1}, "lunettes")
+        state["slow"] = True
+        second = await pipeline.fetch_context({"nom": "Dupont"}, {"client_id": 1}, "dentaire")
+        await pipeline.aclose()
+        return first, second
+
+    first, second = asyncio.run(scenario())
+
+    assert all(timing["status"] == "ok" for timing in first.values())
+    assert second["client"]["status"] == "timeout"
+    assert second["claim"]["status"] == "error"
+    assert orchestrator.current_client == {"nom": "Dupont"}
+    assert orchestrator.current_claim == {"numero_reclamation": "R-1"}
+    assert orchestrator.knowledge_context == [{"content": "dentaire", "similarity": 0.8, "score": 0.8}]
+
+def test_process_turn_does_not_block_the_event_loop():
+    orchestrator = FakeOrchestrator(delay=0.2)
+    pipeline = AsyncTurnPipeline(orchestrator, make_look_api(lambda request: httpx.Response(404)),
+                                 groq_client=FakeAsyncGroqClient())
+
+    async def scenario():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        result = await pipeline.process_turn("Bonjour", search_knowledge=False)
+        task.cancel()
+        await pipeline.aclose()
+        return result, ticks
+
+    result, ticks = asyncio.run(scenario())
+
+    assert result["response"] == "réponse"
+    assert orchestrator.history == ["Bonjour", "réponse"]
+    # La boucle a continué de tourner pendant les 0,4 s d'étapes synchrones
+    assert ticks >= 10